@@ -52,10 +52,12 @@ AUTH_USER_MODEL = 'core.Usuario'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # <--- AQUI É O LUGAR CERTO (2ª Posição)
+    'core.middleware.InstrumentacaoMiddleware',  # Mede o request inteiro (sessão, auth, view); estáticos não passam aqui; não depende de request.user
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.TenantMiddleware',  # Loja do usuário no contexto das queries (precisa vir depois do Auth)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.SaasSecurityMiddleware', # <--- Seu middleware de bloqueio fica no final
@@ -149,6 +151,73 @@ LOGIN_REDIRECT_URL = 'rota_inicial'
 # Quando ele sair, manda ele de volta pro login:
 LOGOUT_REDIRECT_URL = 'login'
 
+# --- CACHE ---
+# Contadores e versões (estoque baixo, previsão, relatórios) precisam ser os mesmos em todos
+# os processos: em produção use REDIS_URL. Sem ela, cache em memória (bom para desenvolvimento).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    }
+
+EMPRESA_ACESSO_CACHE_SEGUNDOS = 600  # Estado da loja (ativa/vencimento/plano) usado pelo SaasSecurityMiddleware
+
+# --- EMISSÃO FISCAL (NFC-e) ---
+# O PDV só coloca a nota na fila; quem emite é o worker (Procfile: worker: python manage.py worker_fiscal)
+FISCAL_PROVEDOR = os.environ.get('FISCAL_PROVEDOR', 'core.fiscal.ProvedorFake')
+FISCAL_MAX_TENTATIVAS = 8
+FISCAL_BACKOFF_SEGUNDOS = 30
+FISCAL_BACKOFF_MAXIMO = 3600
+FISCAL_CONCORRENCIA_POR_EMPRESA = 2  # Emissões simultâneas por loja
+FISCAL_TAMANHO_LOTE = 20
+FISCAL_THREADS = 4
+
+# --- PREVISÃO DE ESTOQUE (painel_estoque) ---
+ESTOQUE_PRAZO_REPOSICAO_DIAS = 7  # Dias entre o pedido ao fornecedor e a chegada
+ESTOQUE_PREVISAO_CACHE_SEGUNDOS = 3600  # Além da invalidação por movimento, renova ao menos a cada hora
+ESTOQUE_BAIXO_CACHE_SEGUNDOS = 3600  # Contador de estoque baixo é reconferido no banco ao menos a cada hora
+
+# --- CACHE DOS RELATÓRIOS (core/cache_relatorios.py) ---
+# Cada invalidação troca a versão da chave e a entrada antiga nunca mais é lida: o prazo faz ela sair do cache
+RELATORIOS_CACHE_SEGUNDOS = 60 * 60 * 24 * 7
+
+# --- FOLHA DE ETIQUETAS (core/etiquetas.py) ---
+ETIQUETAS_PROCESSOS = int(os.environ.get('ETIQUETAS_PROCESSOS', 2))  # Processos que desenham os códigos
+ETIQUETAS_MINIMO_PARALELO = 100  # Abaixo disso desenha no próprio processo (não compensa o pool)
+ETIQUETAS_CACHE_SEGUNDOS = 60 * 60 * 24 * 7  # SVG de cada etiqueta, pela chave do conteúdo
+
+# --- PDF (core/pdf.py) ---
+PDF_PROCESSOS = int(os.environ.get('PDF_PROCESSOS', 1))  # Processos do WeasyPrint por worker web (0 = no próprio request)
+PDF_TIMEOUT_SEGUNDOS = 20  # Depois disso o request responde 503 e o PDF termina em segundo plano
+
+# --- INSTRUMENTAÇÃO (core.middleware.InstrumentacaoMiddleware) ---
+# Requests acima de qualquer limite geram uma linha no log 'core.instrumentacao'
+INSTRUMENTACAO_ATIVA = os.environ.get('INSTRUMENTACAO_ATIVA', 'True') == 'True'
+INSTRUMENTACAO_LIMITE_MS = int(os.environ.get('INSTRUMENTACAO_LIMITE_MS', 500))
+INSTRUMENTACAO_LIMITE_QUERIES = int(os.environ.get('INSTRUMENTACAO_LIMITE_QUERIES', 30))
+INSTRUMENTACAO_LIMITE_REPETIDAS = 10  # Mesmo SQL executado várias vezes no request (cheiro de N+1)
+INSTRUMENTACAO_SERVER_TIMING = os.environ.get('INSTRUMENTACAO_SERVER_TIMING', 'False') == 'True'  # Tempos no DevTools do navegador
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simples': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simples'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': os.environ.get('LOG_LEVEL', 'INFO'), 'propagate': False},
+    },
+}
+
 # --- CONFIGURAÇÕES DE UPLOAD DE ARQUIVOS (IMAGENS, PDFS, ETC) ---
 # Onde os arquivos de mídia serão salvos no seu projeto
 MEDIA_URL = '/media/'
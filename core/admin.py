@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     Empresa, Usuario, Categoria, Produto, Cliente, 
     Venda, ItemVenda, Lancamento, Fornecedor, 
-    FormaPagamento, Caixa, MovimentoCaixa
+    FormaPagamento, Caixa, MovimentoCaixa, EmissaoFiscal, FechamentoComissao
 )
 
 # 1. Usuário (Com o novo cargo visível)
@@ -54,6 +54,17 @@ class VendaAdmin(admin.ModelAdmin):
             return "Salvo"
         return "-"
 
+# 5. Fila de NFC-e
+class EmissaoFiscalAdmin(admin.ModelAdmin):
+    list_display = ('venda', 'empresa', 'status', 'tentativas', 'proxima_tentativa', 'data_emissao')
+    list_filter = ('status', 'empresa')
+    readonly_fields = ('ultimo_erro',)
+
+# 6. Fechamento de comissões
+class FechamentoComissaoAdmin(admin.ModelAdmin):
+    list_display = ('competencia', 'vendedor', 'empresa', 'total_vendido', 'total_comissao', 'data_fechamento')
+    list_filter = ('competencia', 'empresa')
+
 # --- REGISTRO DAS TABELAS ---
 admin.site.register(Empresa)
 admin.site.register(Usuario, UsuarioAdmin)
@@ -67,4 +78,6 @@ admin.site.register(FormaPagamento, FormaPagamentoAdmin)
 admin.site.register(Caixa, CaixaAdmin)
 admin.site.register(MovimentoCaixa, MovimentoCaixaAdmin)
 admin.site.register(Produto, ProdutoAdmin)
-admin.site.register(Venda, VendaAdmin)
\ No newline at end of file
+admin.site.register(Venda, VendaAdmin)
+admin.site.register(EmissaoFiscal, EmissaoFiscalAdmin)
+admin.site.register(FechamentoComissao, FechamentoComissaoAdmin)
\ No newline at end of file
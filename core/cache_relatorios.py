@@ -0,0 +1,97 @@
+# =========================================================
+#  CACHE DOS RELATÓRIOS
+#  Dias que já passaram não mudam: a parte histórica de um relatório fica em
+#  cache, e só o dia de hoje é calculado a cada acesso.
+#  Cada loja tem uma versão por mês; fechar/cancelar venda ou mexer num
+#  lançamento com data passada troca a versão daquele mês, e só os relatórios
+#  que cobrem esse mês são recalculados. A entrada da versão antiga não é mais
+#  lida e sai do cache pelo prazo (RELATORIOS_CACHE_SEGUNDOS).
+# =========================================================
+import hashlib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+CONTADORES = ('relatorios:cache:hits', 'relatorios:cache:misses')
+
+
+def _meses(data_ini, data_fim):
+    mes = data_ini.replace(day=1)
+    while mes <= data_fim:
+        yield mes.strftime('%Y-%m')
+        mes = (mes + timedelta(days=32)).replace(day=1)
+
+
+def _chave_versao(empresa_id, mes):
+    return f'relatorios:versao:{empresa_id}:{mes}'
+
+
+def _contar(chave):
+    cache.add(chave, 0, None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # Expirou entre o add e o incr (cache cheio); recomeça a contagem
+        cache.set(chave, 1, None)
+
+
+def invalidar_relatorios(empresa_id, datas):
+    # Chamado pelos models quando um evento cai em dias já fechados.
+    # Eventos de hoje não invalidam nada: hoje é sempre calculado na hora.
+    hoje = timezone.localdate()
+    # Datas podem chegar como texto (ex.: lançamento criado direto do POST)
+    datas = [parse_date(data) if isinstance(data, str) else data for data in datas]
+    meses = {data.strftime('%Y-%m') for data in datas if data and data < hoje}
+    if meses:
+        transaction.on_commit(lambda: cache.set_many({_chave_versao(empresa_id, mes): uuid.uuid4().hex for mes in meses}, None))
+
+
+def relatorio_em_cache(empresa_id, relatorio, data_ini, data_fim, calcular, combinar):
+    # calcular(ini, fim) devolve o resultado de um intervalo de datas;
+    # combinar([parcial_historico, parcial_hoje]) junta os dois pedaços.
+    hoje = timezone.localdate()
+    partes = []
+
+    if data_ini < hoje:
+        fim_historico = min(data_fim, hoje - timedelta(days=1))
+        meses = list(_meses(data_ini, fim_historico))
+        versoes = cache.get_many([_chave_versao(empresa_id, mes) for mes in meses])
+        assinatura = hashlib.md5('|'.join(versoes.get(_chave_versao(empresa_id, mes), '') for mes in meses).encode()).hexdigest()
+        chave = f'relatorios:{empresa_id}:{relatorio}:{data_ini}:{fim_historico}:{assinatura}'
+
+        historico = cache.get(chave)
+        if historico is None:
+            _contar(CONTADORES[1])
+            historico = calcular(data_ini, fim_historico)
+            cache.set(chave, historico, settings.RELATORIOS_CACHE_SEGUNDOS)
+        else:
+            _contar(CONTADORES[0])
+        partes.append(historico)
+
+    if data_fim >= hoje:
+        partes.append(calcular(max(data_ini, hoje), data_fim))
+
+    return combinar(partes)
+
+
+def somar_parciais(partes):
+    # Junta resultados parciais somando número com número e dicionário com dicionário
+    resultado = {}
+    for parte in partes:
+        for chave, valor in parte.items():
+            if isinstance(valor, dict):
+                resultado[chave] = somar_parciais([resultado.get(chave, {}), valor])
+            else:
+                resultado[chave] = resultado.get(chave, 0) + valor
+    return resultado
+
+
+def estatisticas():
+    hits, misses = (cache.get(chave, 0) for chave in CONTADORES)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'taxa_acerto': (hits * 100 / total) if total else 0}
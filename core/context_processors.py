@@ -1,11 +1,9 @@
 from .models import Produto
-from django.db.models import F
 
 def notificacoes_estoque(request):
-    if request.user.is_authenticated and hasattr(request.user, 'empresa') and request.user.empresa:
-        count = Produto.objects.filter(
-            empresa=request.user.empresa, 
-            estoque_atual__lte=F('estoque_minimo')
-        ).count()
-        return {'notificacao_estoque_baixo': count}
-    return {}
\ No newline at end of file
+    # Roda em todo template renderizado: usa só o empresa_id do usuário já carregado
+    # e o contador em cache (Produto.contar_estoque_baixo), sem query no caminho normal.
+    empresa_id = getattr(request.user, 'empresa_id', None) if request.user.is_authenticated else None
+    if empresa_id:
+        return {'notificacao_estoque_baixo': Produto.contar_estoque_baixo(empresa_id)}
+    return {}
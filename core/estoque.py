@@ -0,0 +1,101 @@
+# =========================================================
+#  PREVISÃO DE ESTOQUE (PAINEL DE ESTOQUE)
+#  Vendas de 30/60/90 dias de todos os produtos saem de uma única query
+#  agrupada; velocidade, dias de cobertura e ponto de pedido são calculados
+#  com NumPy sobre o catálogo inteiro. O resultado fica em cache por loja e
+#  é descartado quando o estoque da loja muda (Produto.estoque_alterado).
+# =========================================================
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import ItemVenda, Produto
+
+SEM_GIRO = 999  # Dias de cobertura de produto que não vendeu nada em 90 dias
+
+# Peso de cada janela na velocidade: o mês mais recente pesa mais
+PESOS_JANELAS = ((30, 0.5), (60, 0.3), (90, 0.2))
+
+
+def vendas_por_produto(empresa_id):
+    # {produto_id: (vendidos_30d, vendidos_60d, vendidos_90d)} num único GROUP BY
+    agora = timezone.now()
+    janelas = {
+        f'd{dias}': Sum('quantidade', filter=Q(venda__data_venda__gte=agora - timedelta(days=dias)))
+        for dias, _ in PESOS_JANELAS
+    }
+    linhas = (
+        ItemVenda.objects.filter(
+            venda__empresa_id=empresa_id, venda__status='FECHADA',
+            venda__data_venda__gte=agora - timedelta(days=PESOS_JANELAS[-1][0]),
+        )
+        .values('produto_id').annotate(**janelas).order_by()
+        .values_list('produto_id', *janelas)
+    )
+    return {produto_id: tuple(q or 0 for q in qtds) for produto_id, *qtds in linhas}
+
+
+def calcular_previsao(empresa_id, limite=10):
+    produtos = list(
+        Produto.objects.filter(empresa_id=empresa_id).order_by('id')
+        .values_list('id', 'nome', 'estoque_atual', 'estoque_minimo', 'preco_custo', 'preco_venda')
+    )
+    vendidos = vendas_por_produto(empresa_id)
+
+    ids = np.fromiter((p[0] for p in produtos), dtype=np.int64, count=len(produtos))
+    estoque = np.fromiter((p[2] for p in produtos), dtype=np.float64, count=len(produtos))
+    minimo = np.fromiter((p[3] for p in produtos), dtype=np.float64, count=len(produtos))
+    custo = np.fromiter((p[4] or 0 for p in produtos), dtype=np.float64, count=len(produtos))
+    preco = np.fromiter((p[5] or 0 for p in produtos), dtype=np.float64, count=len(produtos))
+
+    # Matriz produtos x janelas alinhada pela posição do id (ids já vêm ordenados)
+    qtds = np.zeros((len(produtos), len(PESOS_JANELAS)))
+    if vendidos:
+        com_venda = np.fromiter(vendidos.keys(), dtype=np.int64, count=len(vendidos))
+        posicoes = np.searchsorted(ids, com_venda)
+        qtds[posicoes] = np.array(list(vendidos.values()), dtype=np.float64)
+
+    dias = np.array([d for d, _ in PESOS_JANELAS], dtype=np.float64)
+    pesos = np.array([p for _, p in PESOS_JANELAS])
+    velocidade = (qtds / dias) @ pesos  # unidades por dia
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cobertura = np.where(velocidade > 0, np.floor(np.clip(estoque, 0, None) / velocidade), SEM_GIRO)
+    cobertura = np.minimum(cobertura, SEM_GIRO).astype(np.int64)
+    ponto_pedido = np.ceil(velocidade * settings.ESTOQUE_PRAZO_REPOSICAO_DIAS + minimo).astype(np.int64)
+
+    total_custo = float(estoque @ custo)
+    total_venda = float(estoque @ preco)
+    ruptura = [
+        {
+            'nome': produtos[i][1],
+            'atual': produtos[i][2],
+            'vendidos_30d': int(qtds[i, 0]),
+            'dias_restantes': int(cobertura[i]),
+            'ponto_pedido': int(ponto_pedido[i]),
+        }
+        for i in np.argsort(cobertura, kind='stable')[:limite]
+    ]
+    return {
+        'total_produtos': len(produtos),
+        'baixo_estoque_count': int(np.count_nonzero(estoque <= minimo)),
+        'repor_count': int(np.count_nonzero(estoque <= ponto_pedido)),
+        'total_custo': total_custo,
+        'total_venda': total_venda,
+        'lucro_potencial': total_venda - total_custo,
+        'lista_inteligente': ruptura,
+    }
+
+
+def previsao_estoque(empresa_id):
+    # Cache por loja; a versão do estoque na chave faz qualquer movimento invalidar
+    chave = f'estoque:previsao:{empresa_id}:{Produto.versao_estoque(empresa_id)}'
+    previsao = cache.get(chave)
+    if previsao is None:
+        previsao = calcular_previsao(empresa_id)
+        cache.set(chave, previsao, settings.ESTOQUE_PREVISAO_CACHE_SEGUNDOS)
+    return previsao
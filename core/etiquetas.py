@@ -0,0 +1,214 @@
+# =========================================================
+#  FOLHA DE ETIQUETAS (QR CODE / EAN-13)
+#  Em vez de uma imagem por produto (uma requisição para cada), a folha traz
+#  as etiquetas com o código desenhado em SVG dentro do próprio HTML.
+#  Os SVGs são gerados em processos separados (ProcessPoolExecutor) e ficam
+#  no cache com a chave igual ao hash do conteúdo: só etiquetas de produtos
+#  novos ou com nome/preço/código alterados são desenhadas de novo.
+#  A folha é enviada página por página (StreamingHttpResponse).
+# =========================================================
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import qrcode
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+from .qrcodes import conteudo_qr
+
+ETIQUETAS_POR_PAGINA = 24  # 3 colunas x 8 linhas numa folha A4
+PAGINAS_POR_LOTE = 10  # Páginas desenhadas por vez antes de enviar ao navegador
+
+# ---------------------------------------------------------
+#  EAN-13
+# ---------------------------------------------------------
+EAN_L = ('0001101', '0011001', '0010011', '0111101', '0100011',
+         '0110001', '0101111', '0111011', '0110111', '0001011')
+EAN_G = tuple(codigo.translate(str.maketrans('01', '10'))[::-1] for codigo in EAN_L)
+EAN_R = tuple(codigo.translate(str.maketrans('01', '10')) for codigo in EAN_L)
+# Qual tabela (L ou G) cada dígito da esquerda usa, conforme o primeiro dígito
+EAN_PARIDADE = ('LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG',
+                'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL')
+
+
+def digito_ean13(doze_digitos):
+    soma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(doze_digitos))
+    return str((10 - soma % 10) % 10)
+
+
+def codigo_ean13(codigo):
+    # '7891234567895' se o código for um EAN-13 válido (ou 12 dígitos, completando o verificador), senão None
+    codigo = (codigo or '').strip()
+    if not codigo.isdigit():
+        return None
+    if len(codigo) == 12:
+        return codigo + digito_ean13(codigo)
+    if len(codigo) == 13 and digito_ean13(codigo[:12]) == codigo[12]:
+        return codigo
+    return None
+
+
+def svg_ean13(codigo):
+    primeiro, esquerda, direita = int(codigo[0]), codigo[1:7], codigo[7:]
+    tabelas = {'L': EAN_L, 'G': EAN_G}
+    modulos = '101'
+    modulos += ''.join(tabelas[t][int(d)] for t, d in zip(EAN_PARIDADE[primeiro], esquerda))
+    modulos += '01010'
+    modulos += ''.join(EAN_R[int(d)] for d in direita)
+    modulos += '101'
+
+    # Barras de guarda (início, meio e fim) descem um pouco mais, como no padrão
+    guardas = set(range(0, 3)) | set(range(45, 50)) | set(range(92, 95))
+    margem = 11
+    barras = []
+    for posicao, modulo in enumerate(modulos):
+        if modulo == '1':
+            altura = 55 if posicao in guardas else 50
+            barras.append(f'<rect x="{margem + posicao}" y="0" width="1" height="{altura}"/>')
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {95 + 2 * margem} 64" class="codigo-svg">'
+        f'{"".join(barras)}'
+        f'<text x="{margem + 47.5}" y="63" font-size="9" text-anchor="middle" font-family="monospace">{codigo}</text>'
+        '</svg>'
+    )
+
+
+def svg_qr(conteudo):
+    # Um único <path> com um retângulo por sequência de módulos escuros de cada linha
+    qr = qrcode.QRCode(border=2)
+    qr.add_data(conteudo)
+    qr.make(fit=True)
+    matriz = qr.get_matrix()
+    tracos = []
+    for y, linha in enumerate(matriz):
+        x = 0
+        while x < len(linha):
+            if linha[x]:
+                inicio = x
+                while x < len(linha) and linha[x]:
+                    x += 1
+                tracos.append(f'M{inicio} {y}h{x - inicio}v1h-{x - inicio}z')
+            x += 1
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {len(matriz)} {len(matriz)}" '
+        f'shape-rendering="crispEdges" class="codigo-svg"><path d="{"".join(tracos)}"/></svg>'
+    )
+
+
+def desenhar(item):
+    # Roda nos processos filhos: recebe (chave, tipo, conteúdo) e devolve (chave, svg)
+    chave, tipo, conteudo = item
+    return chave, svg_ean13(conteudo) if tipo == 'ean13' else svg_qr(conteudo)
+
+
+# ---------------------------------------------------------
+#  POOL DE PROCESSOS
+# ---------------------------------------------------------
+_pool = None
+
+
+def obter_pool():
+    # Criado na primeira folha e reaproveitado pelas próximas (subir processos custa caro)
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.ETIQUETAS_PROCESSOS)
+    return _pool
+
+
+def desenhar_todos(itens):
+    global _pool
+    if len(itens) < settings.ETIQUETAS_MINIMO_PARALELO or settings.ETIQUETAS_PROCESSOS <= 1:
+        return dict(map(desenhar, itens))
+    try:
+        return dict(obter_pool().map(desenhar, itens, chunksize=50))
+    except BrokenProcessPool:
+        # Um processo filho morreu (falta de memória, kill): desenha aqui e recria o pool na próxima
+        _pool = None
+        return dict(map(desenhar, itens))
+
+
+# ---------------------------------------------------------
+#  MONTAGEM DA FOLHA
+# ---------------------------------------------------------
+def codigo_da_etiqueta(produto, tipo):
+    # EAN-13 só para produtos com código de barras válido; os demais saem com QR Code
+    ean = codigo_ean13(produto.codigo_barras) if tipo == 'ean13' else None
+    if ean:
+        return 'ean13', ean
+    return 'qr', conteudo_qr(produto)
+
+
+def svgs_das_etiquetas(produtos, tipo):
+    itens = []
+    for produto in produtos:
+        tipo_codigo, conteudo = codigo_da_etiqueta(produto, tipo)
+        chave = 'etiqueta:' + hashlib.sha256(f'{tipo_codigo}|{conteudo}'.encode('utf-8')).hexdigest()
+        itens.append((chave, tipo_codigo, conteudo))
+
+    svgs = cache.get_many([chave for chave, _, _ in itens])
+    faltando = [item for item in itens if item[0] not in svgs]
+    if faltando:
+        novos = desenhar_todos(faltando)
+        cache.set_many(novos, settings.ETIQUETAS_CACHE_SEGUNDOS)
+        svgs.update(novos)
+    return [svgs[chave] for chave, _, _ in itens]
+
+
+CABECALHO = """<!DOCTYPE html>
+<html lang="pt-br">
+<head>
+<meta charset="UTF-8">
+<title>Etiquetas</title>
+<style>
+    @page { size: A4; margin: 8mm; }
+    body { margin: 0; font-family: Arial, sans-serif; background: #eee; }
+    .pagina { width: 194mm; min-height: 281mm; margin: 10px auto; padding: 0; background: #fff;
+              display: grid; grid-template-columns: repeat(3, 1fr); grid-auto-rows: 35mm; gap: 0;
+              page-break-after: always; }
+    .etiqueta { border: 1px dashed #ccc; padding: 2mm; text-align: center; overflow: hidden;
+                display: flex; flex-direction: column; align-items: center; justify-content: space-between; }
+    .nome { font-size: 9pt; font-weight: bold; text-transform: uppercase; white-space: nowrap; overflow: hidden;
+            text-overflow: ellipsis; max-width: 100%; }
+    .codigo-svg { height: 20mm; max-width: 100%; }
+    .preco { font-size: 12pt; font-weight: bold; }
+    .no-print { text-align: center; padding: 10px; }
+    @media print {
+        body { background: #fff; }
+        .pagina { margin: 0; }
+        .etiqueta { border: 1px solid #000; }
+        .no-print { display: none; }
+    }
+</style>
+</head>
+<body>
+<div class="no-print"><button onclick="window.print()">Imprimir</button></div>
+"""
+
+RODAPE = "</body>\n</html>\n"
+
+
+def pagina_html(produtos, svgs):
+    etiquetas = format_html_join(
+        '\n', '<div class="etiqueta"><div class="nome">{}</div>{}<div class="preco">R$ {}</div></div>',
+        ((produto.nome, mark_safe(svg), produto.preco_venda) for produto, svg in zip(produtos, svgs)),
+    )
+    return format_html('<div class="pagina">\n{}\n</div>\n', etiquetas)
+
+
+def folha_de_etiquetas(produtos, tipo='qr'):
+    # Gerador de HTML para StreamingHttpResponse; `produtos` pode ser um .iterator()
+    yield CABECALHO
+    produtos = iter(produtos)
+    while True:
+        lote = list(islice(produtos, ETIQUETAS_POR_PAGINA * PAGINAS_POR_LOTE))
+        if not lote:
+            break
+        svgs = svgs_das_etiquetas(lote, tipo)
+        for inicio in range(0, len(lote), ETIQUETAS_POR_PAGINA):
+            fim = inicio + ETIQUETAS_POR_PAGINA
+            yield pagina_html(lote[inicio:fim], svgs[inicio:fim])
+    yield RODAPE
@@ -0,0 +1,116 @@
+# =========================================================
+#  EXPORTAÇÃO DOS RELATÓRIOS (CSV / XLSX)
+#  As linhas saem do banco em blocos (.iterator) e vão direto para a resposta:
+#  o CSV é enviado enquanto a consulta ainda está sendo lida, e o XLSX é
+#  montado em modo write-only num arquivo temporário. Em nenhum dos dois
+#  casos o período inteiro fica na memória, então exportar um ano é seguro.
+# =========================================================
+import csv
+import tempfile
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .models import ItemVenda, Lancamento, Venda, limites_do_periodo
+
+TAMANHO_BLOCO = 2000
+
+
+def linhas_vendas(empresa, data_ini, data_fim):
+    yield ['Data/Hora', 'Venda', 'Vendedor', 'Cliente', 'Pagamento', 'Itens', 'Total']
+    inicio, fim = limites_do_periodo(data_ini, data_fim)
+    vendas = (
+        Venda.objects.filter(empresa=empresa, status='FECHADA', data_venda__gte=inicio, data_venda__lt=fim)
+        .order_by('data_venda', 'id')
+        .values_list('data_venda', 'id', 'vendedor__username', 'cliente__nome', 'forma_pagamento__nome', 'qtd_itens', 'valor_total')
+    )
+    for data_venda, venda_id, vendedor, cliente, pagamento, qtd_itens, total in vendas.iterator(chunk_size=TAMANHO_BLOCO):
+        yield [timezone.localtime(data_venda).replace(tzinfo=None), venda_id, vendedor, cliente or 'Balcão', pagamento or '', qtd_itens, total]
+
+
+def linhas_financeiro(empresa, data_ini, data_fim):
+    yield ['Vencimento', 'Pagamento', 'Descrição', 'Tipo', 'Valor', 'Venda']
+    lancamentos = (
+        Lancamento.objects.filter(empresa=empresa, data_pagamento__range=[data_ini, data_fim], pago=True)
+        .order_by('data_pagamento', 'id')
+        .values_list('data_vencimento', 'data_pagamento', 'titulo', 'tipo', 'valor', 'venda_origem_id')
+    )
+    for vencimento, pagamento, titulo, tipo, valor, venda_id in lancamentos.iterator(chunk_size=TAMANHO_BLOCO):
+        yield [vencimento, pagamento, titulo, 'Entrada' if tipo == 'RECEITA' else 'Saída', valor, venda_id or '']
+
+
+def linhas_produtos(empresa, data_ini, data_fim):
+    yield ['Produto', 'Código de Barras', 'Qtd Vendida', 'Faturamento', 'Estoque Atual']
+    inicio, fim = limites_do_periodo(data_ini, data_fim)
+    ranking = (
+        ItemVenda.objects.filter(venda__empresa=empresa, venda__status='FECHADA', venda__data_venda__gte=inicio, venda__data_venda__lt=fim)
+        .values('produto_id')
+        .annotate(qtd_vendida=Sum('quantidade'), total_vendido=Sum(ExpressionWrapper(F('quantidade') * F('preco_unitario'), output_field=DecimalField(max_digits=14, decimal_places=2))))
+        .order_by('-qtd_vendida')
+        .values_list('produto__nome', 'produto__codigo_barras', 'qtd_vendida', 'total_vendido', 'produto__estoque_atual')
+    )
+    for nome, codigo, qtd, total, estoque in ranking.iterator(chunk_size=TAMANHO_BLOCO):
+        yield [nome, codigo or '', qtd, total, estoque]
+
+
+RELATORIOS = {
+    'vendas': linhas_vendas,
+    'financeiro': linhas_financeiro,
+    'produtos': linhas_produtos,
+}
+
+
+class _Eco:
+    # "Arquivo" do csv.writer que só devolve a linha escrita, para o StreamingHttpResponse
+    def write(self, valor):
+        return valor
+
+
+def _celula_csv(valor):
+    # Planilha brasileira: vírgula decimal e datas dd/mm/aaaa
+    if hasattr(valor, 'hour'):
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if hasattr(valor, 'day'):
+        return valor.strftime('%d/%m/%Y')
+    if hasattr(valor, 'quantize'):
+        return str(valor).replace('.', ',')
+    return valor
+
+
+def exportar_csv(linhas, nome_arquivo):
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def gerar():
+        yield '\ufeff'  # BOM: o Excel reconhece o arquivo como UTF-8
+        for linha in linhas:
+            yield escritor.writerow([_celula_csv(valor) for valor in linha])
+
+    resposta = StreamingHttpResponse(gerar(), content_type='text/csv; charset=utf-8')
+    resposta['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.csv"'
+    return resposta
+
+
+def exportar_xlsx(linhas, nome_arquivo, titulo):
+    # write_only grava cada linha no disco assim que é adicionada; o arquivo
+    # temporário é apagado quando a resposta termina de ser enviada
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet(title=titulo[:31])
+    for linha in linhas:
+        aba.append(linha)
+    arquivo = tempfile.TemporaryFile()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+    return FileResponse(
+        arquivo, as_attachment=True, filename=f'{nome_arquivo}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def exportar_relatorio(empresa, tipo, data_ini, data_fim, formato):
+    linhas = RELATORIOS[tipo](empresa, data_ini, data_fim)
+    nome_arquivo = f'relatorio_{tipo}_{data_ini}_{data_fim}'
+    if formato == 'xlsx':
+        return exportar_xlsx(linhas, nome_arquivo, tipo.capitalize())
+    return exportar_csv(linhas, nome_arquivo)
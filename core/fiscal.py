@@ -0,0 +1,181 @@
+# =========================================================
+#  EMISSÃO FISCAL (NFC-e) FORA DO CAIXA
+#  O PDV só enfileira (EmissaoFiscal); o worker `manage.py worker_fiscal`
+#  reserva lotes da fila, chama o provedor configurado em FISCAL_PROVEDOR
+#  e grava a URL da nota na venda. Falhas temporárias voltam para a fila
+#  com espera exponencial; cada loja tem um limite de emissões simultâneas.
+#  Toda chamada ao provedor leva a referência fixa da emissão (EmissaoFiscal.referencia):
+#  se a mesma nota for enviada de novo, o provedor devolve a que já existe.
+# =========================================================
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Empresa, EmissaoFiscal, Venda
+
+logger = logging.getLogger(__name__)
+
+
+class ErroFiscal(Exception):
+    # definitiva=True: a SEFAZ rejeitou a nota (dados inválidos), não adianta tentar de novo
+    def __init__(self, mensagem, definitiva=False):
+        super().__init__(mensagem)
+        self.definitiva = definitiva
+
+
+class ProvedorFake:
+    # Provedor local para desenvolvimento e testes: não fala com a SEFAZ,
+    # apenas devolve uma URL previsível. Use FISCAL_PROVEDOR para trocar pelo real.
+    # Um provedor real precisa tratar `referencia` como chave de idempotência
+    # (o "ref" das APIs de NFC-e): mesma referência, mesma nota, nunca uma segunda.
+    def emitir(self, venda, empresa, referencia):
+        if not empresa.token_api_fiscal and empresa.ambiente_fiscal == 'PRODUCAO':
+            raise ErroFiscal("Empresa sem token fiscal configurado.", definitiva=True)
+        ambiente = empresa.ambiente_fiscal.lower()
+        return f"https://nfce.exemplo.local/{ambiente}/{referencia}"
+
+
+def config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def obter_provedor():
+    return import_string(config('FISCAL_PROVEDOR', 'core.fiscal.ProvedorFake'))()
+
+
+def calcular_espera(tentativas):
+    # 30s, 60s, 120s... até o teto, com um pouco de aleatoriedade para não chegarem todas juntas
+    base = config('FISCAL_BACKOFF_SEGUNDOS', 30)
+    teto = config('FISCAL_BACKOFF_MAXIMO', 3600)
+    segundos = min(base * (2 ** max(tentativas - 1, 0)), teto)
+    return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+def liberar_travadas():
+    # Emissões que ficaram em PROCESSANDO porque o worker caiu no meio voltam para a fila.
+    # A nota pode ter saído antes da queda: o reenvio usa a mesma referência, então o
+    # provedor devolve a nota já emitida em vez de gerar outra.
+    limite = timezone.now() - timedelta(seconds=config('FISCAL_TEMPO_MAXIMO_SEGUNDOS', 300))
+    return EmissaoFiscal.objects.filter(status='PROCESSANDO', iniciada_em__lt=limite).update(
+        status='PENDENTE', ultimo_erro="Worker interrompido; reenviada com a mesma referência."
+    )
+
+
+def reservar_lote(tamanho):
+    # Pega as próximas emissões vencidas respeitando o limite por loja e marca como PROCESSANDO.
+    # skip_locked deixa vários workers dividirem a fila sem pegar a mesma nota.
+    por_empresa = config('FISCAL_CONCORRENCIA_POR_EMPRESA', 2)
+    agora = timezone.now()
+    pendentes = EmissaoFiscal.objects.filter(status='PENDENTE', proxima_tentativa__lte=agora)
+    with transaction.atomic():
+        # Lojas com nota vencida, a que espera há mais tempo primeiro, sem as que já estão no limite:
+        # uma loja com fila enorme não ocupa a rodada inteira e as outras não ficam paradas atrás dela
+        cheias = (
+            EmissaoFiscal.objects.filter(status='PROCESSANDO').values('empresa_id')
+            .annotate(total=Count('id')).filter(total__gte=por_empresa).values('empresa_id')
+        )
+        empresas = list(
+            pendentes.exclude(empresa_id__in=cheias).values('empresa_id')
+            .annotate(primeira=Min('proxima_tentativa')).order_by('primeira')
+            .values_list('empresa_id', flat=True)[:tamanho]
+        )
+        if not empresas:
+            return []
+        # Trava essas lojas (sempre na mesma ordem, sem deadlock) e conta de novo o que está em
+        # andamento: outro worker reservando para a mesma loja espera este terminar e já conta as
+        # emissões que este marcou, então o limite por loja vale entre workers também.
+        list(Empresa.objects.select_for_update().filter(id__in=empresas).order_by('id').values_list('id', flat=True))
+        em_andamento = dict(
+            EmissaoFiscal.objects.filter(status='PROCESSANDO', empresa_id__in=empresas)
+            .values_list('empresa_id').annotate(total=Count('id')).order_by()
+        )
+        reservadas = []
+        for empresa_id in empresas:
+            vagas = min(por_empresa - em_andamento.get(empresa_id, 0), tamanho - len(reservadas))
+            if vagas <= 0:
+                continue
+            reservadas += list(
+                pendentes.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+                .filter(empresa_id=empresa_id).order_by('proxima_tentativa').values_list('id', flat=True)[:vagas]
+            )
+            if len(reservadas) >= tamanho:
+                break
+        EmissaoFiscal.objects.filter(id__in=reservadas).update(status='PROCESSANDO', iniciada_em=agora)
+    return reservadas
+
+
+def processar(emissao_id, provedor=None):
+    provedor = provedor or obter_provedor()
+    emissao = EmissaoFiscal.objects.select_related('venda', 'empresa').get(id=emissao_id)
+    if emissao.venda.status != 'FECHADA':
+        # Venda cancelada depois que a nota foi reservada: não emite
+        EmissaoFiscal.objects.filter(id=emissao.id).update(status='CANCELADA', ultimo_erro="Venda cancelada antes da emissão.")
+        return False
+    try:
+        url = provedor.emitir(emissao.venda, emissao.empresa, referencia=emissao.referencia)
+    except Exception as erro:
+        tentativas = emissao.tentativas + 1
+        definitiva = getattr(erro, 'definitiva', False) or tentativas >= config('FISCAL_MAX_TENTATIVAS', 8)
+        EmissaoFiscal.objects.filter(id=emissao.id).update(
+            status='ERRO' if definitiva else 'PENDENTE',
+            tentativas=tentativas,
+            proxima_tentativa=timezone.now() + calcular_espera(tentativas),
+            ultimo_erro=str(erro)[:2000],
+        )
+        return False
+
+    with transaction.atomic():
+        Venda.objects.filter(id=emissao.venda_id).update(nota_fiscal_url=url, nota_fiscal_emitida=True)
+        # Cancelada enquanto o provedor emitia: a nota existe e precisa ser cancelada no provedor
+        cancelada = Venda.objects.filter(id=emissao.venda_id, status='CANCELADA').exists()
+        EmissaoFiscal.objects.filter(id=emissao.id).update(
+            status='EMITIDA', tentativas=emissao.tentativas + 1, data_emissao=timezone.now(),
+            ultimo_erro="Venda cancelada durante a emissão: cancele a NFC-e no provedor." if cancelada else None,
+        )
+    if cancelada:
+        logger.warning("nfce_de_venda_cancelada emissao=%s venda=%s", emissao.id, emissao.venda_id)
+    return True
+
+
+def processar_com_log(emissao_id, provedor):
+    # Erro fora do provedor (banco fora do ar, venda apagada) não derruba a rodada:
+    # fica registrado e a emissão continua em PROCESSANDO até liberar_travadas devolvê-la
+    try:
+        return processar(emissao_id, provedor)
+    except Exception:
+        logger.exception("emissao_fiscal_falhou id=%s", emissao_id)
+        return False
+
+
+def _processar_em_thread(emissao_id, provedor):
+    try:
+        return processar_com_log(emissao_id, provedor)
+    finally:
+        # Cada thread abre sua própria conexão com o banco
+        close_old_connections()
+        connection.close()
+
+
+def processar_fila(tamanho_lote=None, threads=None):
+    # Uma rodada do worker: devolve quantas notas foram processadas (com sucesso ou não)
+    tamanho_lote = tamanho_lote or config('FISCAL_TAMANHO_LOTE', 20)
+    threads = threads or config('FISCAL_THREADS', 4)
+    liberar_travadas()
+    ids = reservar_lote(tamanho_lote)
+    if not ids:
+        return 0
+    provedor = obter_provedor()
+    if threads == 1:
+        for emissao_id in ids:
+            processar_com_log(emissao_id, provedor)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda emissao_id: _processar_em_thread(emissao_id, provedor), ids))
+    return len(ids)
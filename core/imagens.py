@@ -0,0 +1,84 @@
+# =========================================================
+#  VARIANTES DE IMAGEM (FOTO DO PRODUTO / LOGO DA LOJA)
+#  A foto original (muitas vezes 3-5 MB, direto da câmera) continua guardada,
+#  mas as telas usam versões reduzidas em WebP. Cada variante é gerada uma
+#  vez (no upload, ou na primeira vez que for pedida para fotos antigas) e
+#  fica em media/variantes/<tamanho>/, com o nome derivado do arquivo original.
+#  Nos templates: {% load imagens %} {% variante produto.foto 'mini' %}
+# =========================================================
+import hashlib
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# nome: (largura, altura, recortar). recortar=True preenche o quadrado (cover);
+# False só reduz mantendo a proporção (logo, foto ampliada).
+VARIANTES = {
+    'mini': (96, 96, True),       # Listas e catálogo (miniatura redonda/quadrada)
+    'card': (400, 400, True),     # Cards da lista de produtos
+    'media': (1000, 1000, False),  # Foto ampliada
+    'logo': (300, 300, False),    # Logo no cupom e documentos
+}
+QUALIDADE_WEBP = 80
+
+
+def caminho_variante(nome_original, tamanho):
+    # O storage nunca reaproveita nome de arquivo (troca de foto = nome novo), então a variante
+    # pode ser identificada só pelo nome do original
+    chave = hashlib.sha1(nome_original.encode('utf-8')).hexdigest()
+    return f"variantes/{tamanho}/{chave[:2]}/{chave}.webp"
+
+
+def gerar_variante(arquivo, tamanho):
+    largura, altura, recortar = VARIANTES[tamanho]
+    arquivo.open('rb')
+    try:
+        with Image.open(arquivo) as imagem:
+            # JPEG grande: o Pillow já decodifica numa escala menor (bem mais rápido e leve)
+            imagem.draft('RGB', (largura * 2, altura * 2))
+            imagem = ImageOps.exif_transpose(imagem)  # Foto de celular "deitada"
+            imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() else 'RGB')
+            if recortar:
+                imagem = ImageOps.fit(imagem, (largura, altura), Image.LANCZOS)
+            else:
+                imagem.thumbnail((largura, altura), Image.LANCZOS)
+            buffer = BytesIO()
+            imagem.save(buffer, format='WEBP', quality=QUALIDADE_WEBP, method=4)
+    finally:
+        arquivo.close()
+    return buffer.getvalue()
+
+
+def obter_variante(arquivo, tamanho):
+    # Caminho da variante no storage, gerando se ainda não existir. None se o original não abrir.
+    caminho = caminho_variante(arquivo.name, tamanho)
+    if default_storage.exists(caminho):
+        return caminho
+    try:
+        conteudo = gerar_variante(arquivo, tamanho)
+    except (OSError, ValueError) as erro:
+        logger.warning("variante_falhou arquivo=%s tamanho=%s erro=%s", arquivo.name, tamanho, erro)
+        return None
+    salvo = default_storage.save(caminho, ContentFile(conteudo))
+    if salvo != caminho:
+        default_storage.delete(salvo)  # Outro request gerou a mesma variante ao mesmo tempo
+    return caminho
+
+
+def url_variante(arquivo, tamanho):
+    # URL para usar no <img>: a variante, ou o original se não deu para gerar
+    if not arquivo:
+        return ''
+    caminho = obter_variante(arquivo, tamanho)
+    return default_storage.url(caminho) if caminho else arquivo.url
+
+
+def gerar_variantes(arquivo, tamanhos):
+    # Chamado no save do modelo quando chega um arquivo novo
+    for tamanho in tamanhos:
+        obter_variante(arquivo, tamanho)
@@ -0,0 +1,183 @@
+# =========================================================
+#  IMPORTAÇÃO DE PRODUTOS (PLANILHA .XLSX)
+#  A planilha é lida em blocos com o openpyxl em modo read-only, sem carregar
+#  o arquivo inteiro. Cada bloco vira um DataFrame validado de uma vez só
+#  (sem iterrows), e os produtos entram com bulk_create / bulk_update.
+#  Códigos de barras e categorias da loja são carregados uma vez no início,
+#  então o banco recebe poucas queries por bloco, não várias por linha.
+#  O QR Code é gerado sob demanda (core/qrcodes.py), não na importação.
+# =========================================================
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from openpyxl import load_workbook
+
+from .models import Categoria, Produto
+
+TAMANHO_BLOCO = 1000
+
+# Nome da coluna na planilha (sem diferenciar maiúsculas) -> nome usado aqui
+COLUNAS = {
+    'nome': 'Nome', 'codigo': 'Codigo', 'código': 'Codigo', 'categoria': 'Categoria',
+    'tamanho': 'Tamanho', 'cor': 'Cor', 'custo': 'Custo', 'venda': 'Venda', 'estoque': 'Estoque',
+}
+
+CAMPOS_ATUALIZADOS = ['preco_custo', 'preco_venda', 'estoque_atual']
+
+
+def ler_blocos(arquivo, tamanho=TAMANHO_BLOCO):
+    # Gera DataFrames de até `tamanho` linhas. O índice é a linha da planilha (cabeçalho = 1),
+    # para os erros apontarem a linha que o usuário vê no Excel.
+    planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if not cabecalho:
+            return
+        colunas = [COLUNAS.get(str(c or '').strip().lower(), str(c or '').strip()) for c in cabecalho]
+        if 'Nome' not in colunas:
+            raise ValueError("A planilha precisa ter a coluna 'Nome' na primeira linha.")
+
+        bloco, numeros = [], []
+        for numero, linha in enumerate(linhas, start=2):
+            if not any(valor not in (None, '') for valor in linha):
+                continue  # linha em branco (o read-only costuma trazer várias no fim)
+            bloco.append(linha)
+            numeros.append(numero)
+            if len(bloco) >= tamanho:
+                yield pd.DataFrame.from_records(bloco, columns=colunas, index=numeros)
+                bloco, numeros = [], []
+        if bloco:
+            yield pd.DataFrame.from_records(bloco, columns=colunas, index=numeros)
+    finally:
+        planilha.close()
+
+
+def _texto(df, coluna, padrao='', limite=None):
+    if coluna not in df:
+        return pd.Series(padrao, index=df.index, dtype='string')
+    serie = df[coluna].astype('string').str.strip().fillna(padrao).replace('', padrao)
+    return serie.str.slice(0, limite) if limite else serie
+
+
+def _codigo(valor):
+    # O Excel guarda código de barras como número: 7891234567890.0 -> '7891234567890'
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = '' if valor is None or valor != valor else str(valor).strip()
+    return texto or None
+
+
+def _numero(df, coluna):
+    # Aceita número do Excel ou texto "12,90" / "1.234,56". Vazio vira 0, texto inválido vira NaN.
+    if coluna not in df:
+        return pd.Series(0.0, index=df.index)
+    texto = df[coluna].astype('string').str.strip()
+    virgula = texto.str.contains(',', regex=False).fillna(False)
+    texto = texto.where(~virgula, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    numeros = pd.to_numeric(texto, errors='coerce')
+    return numeros.where(texto.fillna('') != '', 0.0)
+
+
+def validar_bloco(df):
+    # Devolve (DataFrame só com as linhas válidas e colunas normalizadas, [(linha, motivo), ...])
+    dados = pd.DataFrame({
+        'nome': _texto(df, 'Nome', limite=200),
+        # Sem a coluna: lista de None (pd.Series(None) viraria NaN, que passa por código e grava 'nan')
+        'codigo': df['Codigo'].map(_codigo) if 'Codigo' in df else pd.Series([None] * len(df), index=df.index, dtype=object),
+        'categoria': _texto(df, 'Categoria', 'Geral', limite=100),
+        'tamanho': _texto(df, 'Tamanho', limite=10),
+        'cor': _texto(df, 'Cor', limite=30),
+        'custo': _numero(df, 'Custo'),
+        'venda': _numero(df, 'Venda'),
+        'estoque': _numero(df, 'Estoque'),
+    }, index=df.index)
+
+    problemas = [
+        (dados['nome'] == '', "nome vazio"),
+        (dados['codigo'].str.len() > 50, "código de barras com mais de 50 caracteres"),
+        (dados['venda'].isna() | (dados['venda'] < 0), "preço de venda inválido"),
+        (dados['custo'].isna() | (dados['custo'] < 0), "preço de custo inválido"),
+        (dados['estoque'].isna() | (dados['estoque'] % 1 != 0), "estoque precisa ser um número inteiro"),
+    ]
+    motivos = np.select([mascara.fillna(False).to_numpy(dtype=bool) for mascara, _ in problemas],
+                        [motivo for _, motivo in problemas], default='')
+    invalidas = motivos != ''
+    erros = list(zip(dados.index[invalidas].tolist(), motivos[invalidas].tolist()))
+    return dados[~invalidas], erros
+
+
+def _decimal(valor):
+    return Decimal(str(round(float(valor), 2)))
+
+
+def importar_planilha(empresa, arquivo, atualizar_existentes=False, tamanho_bloco=TAMANHO_BLOCO):
+    # atualizar_existentes=False: códigos que já existem na loja são ignorados (como antes).
+    # atualizar_existentes=True: atualiza preço de custo, preço de venda e estoque desses produtos.
+    resultado = {'criados': 0, 'atualizados': 0, 'ignorados': 0, 'erros': []}
+    existentes = dict(
+        Produto.objects.filter(empresa=empresa).exclude(codigo_barras__isnull=True).exclude(codigo_barras='')
+        .values_list('codigo_barras', 'id')
+    )
+    categorias = dict(Categoria.objects.filter(empresa=empresa).values_list('nome', 'id'))
+
+    for bloco in ler_blocos(arquivo, tamanho_bloco):
+        dados, erros = validar_bloco(bloco)
+        resultado['erros'].extend(erros)
+        if dados.empty:
+            continue
+
+        # Código repetido dentro da planilha: vale a primeira linha (ou a última, se for atualizar)
+        com_codigo = dados['codigo'].notna()
+        repetidos = com_codigo & dados['codigo'].duplicated(keep='last' if atualizar_existentes else 'first')
+        resultado['ignorados'] += int(repetidos.sum())
+        dados = dados[~repetidos]
+        ja_existe = dados['codigo'].isin(existentes.keys())
+        novos, antigos = dados[~ja_existe], dados[ja_existe]
+
+        with transaction.atomic():
+            faltando = sorted(set(novos['categoria']) - categorias.keys())
+            if faltando:
+                Categoria.objects.bulk_create([Categoria(empresa=empresa, nome=nome) for nome in faltando])
+                categorias.update(
+                    Categoria.objects.filter(empresa=empresa, nome__in=faltando).values_list('nome', 'id')
+                )
+
+            produtos = [
+                Produto(
+                    empresa=empresa, nome=linha.nome, codigo_barras=linha.codigo if isinstance(linha.codigo, str) else '',
+                    categoria_id=categorias[linha.categoria], tamanho=linha.tamanho, cor=linha.cor,
+                    preco_custo=_decimal(linha.custo), preco_venda=_decimal(linha.venda),
+                    estoque_atual=int(linha.estoque),
+                )
+                for linha in novos.itertuples()
+            ]
+            Produto.objects.bulk_create(produtos, batch_size=500)
+            resultado['criados'] += len(produtos)
+
+            if atualizar_existentes and not antigos.empty:
+                alterados = [
+                    Produto(
+                        id=existentes[linha.codigo], preco_custo=_decimal(linha.custo),
+                        preco_venda=_decimal(linha.venda), estoque_atual=int(linha.estoque),
+                    )
+                    for linha in antigos.itertuples()
+                ]
+                Produto.objects.bulk_update(alterados, CAMPOS_ATUALIZADOS, batch_size=500)
+                resultado['atualizados'] += len(alterados)
+            else:
+                resultado['ignorados'] += len(antigos)
+
+        # Os códigos recém-criados passam a contar como existentes para os próximos blocos
+        existentes.update(
+            Produto.objects.filter(empresa=empresa, codigo_barras__in=novos['codigo'].dropna().tolist())
+            .values_list('codigo_barras', 'id')
+        )
+
+    if resultado['criados'] or resultado['atualizados']:
+        # bulk_create/bulk_update não passam pelo Produto.save: avisa os caches de estoque aqui
+        Produto.estoque_alterado(empresa.id)
+        Produto.recontar_estoque_baixo(empresa.id)
+    return resultado
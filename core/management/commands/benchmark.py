@@ -0,0 +1,104 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Empresa, Usuario, Venda
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede tempo e número de queries das telas mais usadas (dashboard, PDV, estoque, relatórios, "
+        "financeiro, comissões) de uma loja, pelo test client. Gere a loja antes com gerar_dados_teste."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help="Loja medida (padrão: a última criada)")
+        parser.add_argument('--repeticoes', type=int, default=5, help="Execuções de cada tela (a primeira é a 'fria')")
+        parser.add_argument('--salvar', help="Grava o resultado em JSON para comparar depois")
+        parser.add_argument('--comparar', help="JSON de uma execução anterior para mostrar a diferença")
+
+    def telas(self, empresa, gerente):
+        hoje = timezone.localdate()
+        inicio_ano = hoje.replace(month=1, day=1).isoformat()
+        venda = Venda.objects.filter(empresa=empresa, status='ORCAMENTO', vendedor=gerente).first() or Venda.objects.create(
+            empresa=empresa, vendedor=gerente, movimento_caixa=empresa.movimentocaixa_set.filter(status='ABERTO').first()
+        )
+        return [
+            ('dashboard', reverse('dashboard')),
+            ('pdv', reverse('pdv', args=[venda.id])),
+            ('painel_estoque', reverse('painel_estoque')),
+            ('relatorios_vendas', f"{reverse('relatorios')}?tipo=vendas&data_ini={inicio_ano}"),
+            ('relatorios_financeiro', f"{reverse('relatorios')}?tipo=financeiro&data_ini={inicio_ano}"),
+            ('relatorios_produtos', f"{reverse('relatorios')}?tipo=produtos&data_ini={inicio_ano}"),
+            ('financeiro', reverse('financeiro')),
+            ('fluxo_caixa', reverse('fluxo_caixa')),
+            ('minhas_comissoes', reverse('minhas_comissoes')),
+        ]
+
+    def handle(self, *args, **opcoes):
+        empresas = Empresa.objects.order_by('-id')
+        empresa = empresas.filter(id=opcoes['empresa']).first() if opcoes['empresa'] else empresas.first()
+        if not empresa:
+            raise CommandError("Nenhuma loja encontrada. Rode antes: manage.py gerar_dados_teste")
+        gerente = Usuario.objects.filter(empresa=empresa, cargo='GERENTE').first()
+        if not gerente:
+            raise CommandError(f"A loja #{empresa.id} não tem gerente para logar.")
+
+        anterior = {}
+        if opcoes['comparar']:
+            with open(opcoes['comparar'], encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)['telas']
+
+        # Libera o host 'testserver' e o contador de queries mesmo com DEBUG=False
+        # (dentro do test runner o ambiente já está montado e não pode ser montado de novo)
+        try:
+            setup_test_environment()
+            montou_ambiente = True
+        except RuntimeError:
+            montou_ambiente = False
+        try:
+            cliente = Client()
+            cliente.force_login(gerente)
+            resultado = {}
+            for nome, url in self.telas(empresa, gerente):
+                tempos, queries = [], []
+                for _ in range(max(1, opcoes['repeticoes'])):
+                    with CaptureQueriesContext(connection) as capturadas:
+                        inicio = time.perf_counter()
+                        resposta = cliente.get(url)
+                        tempos.append((time.perf_counter() - inicio) * 1000)
+                    queries.append(len(capturadas))
+                    if resposta.status_code != 200:
+                        raise CommandError(f"{nome} respondeu {resposta.status_code} ({url})")
+                resultado[nome] = {
+                    'frio_ms': round(tempos[0], 1),
+                    'mediana_ms': round(statistics.median(tempos[1:] or tempos), 1),
+                    'queries': queries[-1],
+                    'queries_frio': queries[0],
+                }
+        finally:
+            if montou_ambiente:
+                teardown_test_environment()
+
+        self.stdout.write(f"Loja #{empresa.id} ({empresa.nome_fantasia}) - {opcoes['repeticoes']} repetições\n")
+        self.stdout.write(f"{'tela':<24}{'frio ms':>10}{'mediana ms':>12}{'queries':>10}{'antes':>16}")
+        for nome, medida in resultado.items():
+            comparacao = ''
+            if nome in anterior:
+                comparacao = f"{anterior[nome]['mediana_ms']}ms/{anterior[nome]['queries']}q"
+            self.stdout.write(
+                f"{nome:<24}{medida['frio_ms']:>10}{medida['mediana_ms']:>12}"
+                f"{str(medida['queries_frio']) + '/' + str(medida['queries']):>10}{comparacao:>16}"
+            )
+
+        if opcoes['salvar']:
+            with open(opcoes['salvar'], 'w', encoding='utf-8') as arquivo:
+                json.dump({'empresa': empresa.id, 'data': timezone.now().isoformat(), 'telas': resultado}, arquivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {opcoes['salvar']}"))
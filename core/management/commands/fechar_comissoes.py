@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Empresa, FechamentoComissao
+
+
+class Command(BaseCommand):
+    help = "Fecha as comissões de um mês (padrão: mês anterior) gravando o total de cada vendedor. Pode ser rodado de novo para refazer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mes', help="Mês a fechar no formato AAAA-MM (padrão: mês anterior)")
+        parser.add_argument('--empresa', type=int, default=None, help="Fecha só esta empresa (id)")
+
+    def handle(self, *args, **options):
+        if options['mes']:
+            try:
+                competencia = datetime.strptime(options['mes'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("Use --mes no formato AAAA-MM.")
+        else:
+            competencia = (timezone.localdate().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+        if competencia >= timezone.localdate().replace(day=1):
+            raise CommandError("Só é possível fechar meses que já terminaram.")
+
+        empresas = Empresa.objects.all()
+        if options['empresa']:
+            empresas = empresas.filter(id=options['empresa'])
+
+        total = 0
+        for empresa_id in empresas.values_list('id', flat=True).iterator():
+            total += FechamentoComissao.fechar_mes(empresa_id, competencia)
+        self.stdout.write(self.style.SUCCESS(f"Comissões de {competencia:%m/%Y} fechadas: {total} vendedores."))
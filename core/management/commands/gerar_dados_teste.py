@@ -0,0 +1,165 @@
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    AjusteEstoque, Caixa, Cliente, Empresa, FormaPagamento, ItemVenda,
+    Lancamento, MovimentoCaixa, Produto, ResumoVendasDia, Usuario, Venda,
+)
+
+CENTAVO = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria uma loja com volume parecido com o de produção (produtos, clientes, anos de vendas, "
+        "lançamentos e ajustes de estoque) usando inserts em lote. Use junto com o comando benchmark."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nome', default='Loja Benchmark', help="Nome da loja criada")
+        parser.add_argument('--produtos', type=int, default=2000)
+        parser.add_argument('--clientes', type=int, default=1000)
+        parser.add_argument('--vendedores', type=int, default=4)
+        parser.add_argument('--dias', type=int, default=365, help="Dias de histórico de vendas até hoje")
+        parser.add_argument('--vendas-por-dia', type=int, default=40)
+        parser.add_argument('--itens-por-venda', type=int, default=3, help="Média de itens por venda")
+        parser.add_argument('--despesas-por-mes', type=int, default=20)
+        parser.add_argument('--ajustes', type=int, default=500)
+        parser.add_argument('--lote', type=int, default=2000, help="Tamanho dos lotes de insert")
+        parser.add_argument('--semente', type=int, default=42, help="Semente aleatória (mesma semente = mesmos dados)")
+
+    def handle(self, *args, **opcoes):
+        if opcoes['produtos'] < 1 or opcoes['vendedores'] < 1:
+            raise CommandError("É preciso ao menos 1 produto e 1 vendedor.")
+        self.aleatorio = random.Random(opcoes['semente'])
+        self.lote = opcoes['lote']
+
+        with transaction.atomic():
+            self.criar_loja(opcoes)
+            self.criar_cadastros(opcoes)
+        self.stdout.write(f"Loja #{self.empresa.id} criada. Gerente: {self.gerente.username} / senha: benchmark")
+
+        # Vendas dia a dia, uma transação por dia: memória constante mesmo com anos de histórico
+        hoje = timezone.localdate()
+        total_vendas = 0
+        for dias_atras in range(opcoes['dias'], -1, -1):
+            with transaction.atomic():
+                total_vendas += self.gerar_dia(hoje - timedelta(days=dias_atras), opcoes)
+        self.stdout.write(f"{total_vendas} vendas geradas.")
+
+        with transaction.atomic():
+            self.gerar_despesas(hoje, opcoes)
+            self.gerar_ajustes(opcoes)
+        ResumoVendasDia.reconstruir(self.empresa.id)
+        Produto.estoque_alterado(self.empresa.id)
+        Produto.recontar_estoque_baixo(self.empresa.id)
+        self.stdout.write(self.style.SUCCESS("Dados de teste gerados."))
+
+    def criar_loja(self, opcoes):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia=opcoes['nome'], plano='PRO',
+            data_vencimento=timezone.localdate() + timedelta(days=365),
+        )
+        prefixo = f"bench{self.empresa.id}"
+        self.gerente = Usuario.objects.create_user(username=f"{prefixo}_gerente", password='benchmark', empresa=self.empresa, cargo='GERENTE')
+        Usuario.objects.bulk_create([
+            Usuario(username=f"{prefixo}_vendedor{i}", empresa=self.empresa, cargo='VENDEDOR')
+            for i in range(opcoes['vendedores'])
+        ])
+        self.vendedores = list(Usuario.objects.filter(empresa=self.empresa).values_list('id', flat=True))
+        caixa = Caixa.objects.create(empresa=self.empresa, nome='Caixa 01')
+        self.movimento = MovimentoCaixa.objects.create(empresa=self.empresa, caixa=caixa, operador=self.gerente, valor_abertura=0)
+        FormaPagamento.objects.bulk_create([
+            FormaPagamento(empresa=self.empresa, nome=nome) for nome in ('Dinheiro', 'Pix', 'Cartão de Crédito', 'Cartão de Débito')
+        ])
+        self.formas = list(FormaPagamento.objects.filter(empresa=self.empresa).values_list('id', flat=True))
+
+    def criar_cadastros(self, opcoes):
+        # bulk_create não chama Produto.save, então nenhum QR Code é gerado aqui
+        Produto.objects.bulk_create([
+            Produto(
+                empresa=self.empresa, nome=f"Produto {i:06d}", codigo_barras=f"2{self.empresa.id:04d}{i:07d}",
+                preco_custo=Decimal(self.aleatorio.randint(100, 20000)) / 100,
+                preco_venda=Decimal(self.aleatorio.randint(200, 40000)) / 100,
+                porcentagem_comissao=Decimal(self.aleatorio.choice([0, 1, 2, 5])),
+                estoque_atual=self.aleatorio.randint(0, 300), estoque_minimo=5,
+            ) for i in range(opcoes['produtos'])
+        ], batch_size=self.lote)
+        self.produtos = list(Produto.objects.filter(empresa=self.empresa).values_list('id', 'preco_venda', 'porcentagem_comissao'))
+
+        Cliente.objects.bulk_create([
+            Cliente(empresa=self.empresa, nome=f"Cliente {i:06d}", telefone=f"1199{i:07d}")
+            for i in range(opcoes['clientes'])
+        ], batch_size=self.lote)
+        self.clientes = list(Cliente.objects.filter(empresa=self.empresa).values_list('id', flat=True))
+
+    def gerar_dia(self, dia, opcoes):
+        aleatorio = self.aleatorio
+        quantidade = max(0, int(aleatorio.gauss(opcoes['vendas_por_dia'], opcoes['vendas_por_dia'] * 0.2)))
+        if not quantidade:
+            return 0
+
+        vendas, itens_por_venda, horarios = [], [], []
+        for _ in range(quantidade):
+            horario = timezone.make_aware(datetime.combine(dia, datetime.min.time()) + timedelta(seconds=aleatorio.randint(8 * 3600, 20 * 3600)))
+            itens = []
+            for produto_id, preco, comissao in aleatorio.sample(self.produtos, min(len(self.produtos), max(1, int(aleatorio.expovariate(1 / opcoes['itens_por_venda']))))):
+                qtd = aleatorio.randint(1, 3)
+                itens.append(ItemVenda(
+                    produto_id=produto_id, quantidade=qtd, preco_unitario=preco,
+                    comissao_valor=(qtd * preco * comissao / 100).quantize(CENTAVO),
+                ))
+            subtotal = sum(i.quantidade * i.preco_unitario for i in itens)
+            vendas.append(Venda(
+                empresa=self.empresa, vendedor_id=aleatorio.choice(self.vendedores), movimento_caixa=self.movimento,
+                cliente_id=aleatorio.choice(self.clientes) if self.clientes and aleatorio.random() < 0.4 else None,
+                forma_pagamento_id=aleatorio.choice(self.formas), status='FECHADA',
+                subtotal=subtotal, valor_total=subtotal, qtd_itens=sum(i.quantidade for i in itens),
+                total_comissao=sum(i.comissao_valor for i in itens),
+            ))
+            itens_por_venda.append(itens)
+            horarios.append(horario)
+
+        Venda.objects.bulk_create(vendas, batch_size=self.lote)
+        # data_venda é auto_now_add: o insert grava "agora", então a data histórica vai num update em lote
+        for venda, horario, itens in zip(vendas, horarios, itens_por_venda):
+            venda.data_venda = horario
+            for item in itens:
+                item.venda = venda
+        Venda.objects.bulk_update(vendas, ['data_venda'], batch_size=self.lote)
+
+        ItemVenda.objects.bulk_create([item for itens in itens_por_venda for item in itens], batch_size=self.lote)
+        Lancamento.objects.bulk_create([
+            Lancamento(
+                empresa=self.empresa, tipo='RECEITA', titulo=f"Venda #{venda.id}", valor=venda.valor_total,
+                data_vencimento=dia, data_pagamento=dia, pago=True, venda_origem=venda,
+            ) for venda in vendas
+        ], batch_size=self.lote)
+        return len(vendas)
+
+    def gerar_despesas(self, hoje, opcoes):
+        # Despesas dos meses do histórico e dos próximos 3 meses (contas a pagar)
+        despesas = []
+        for dias in range(-opcoes['dias'], 90):
+            dia = hoje + timedelta(days=dias)
+            for _ in range(self.aleatorio.randint(0, max(1, opcoes['despesas_por_mes'] * 2 // 30))):
+                pago = dia <= hoje
+                despesas.append(Lancamento(
+                    empresa=self.empresa, tipo='DESPESA', titulo=self.aleatorio.choice(['Aluguel', 'Fornecedor', 'Energia', 'Salários', 'Frete']),
+                    valor=Decimal(self.aleatorio.randint(5000, 500000)) / 100,
+                    data_vencimento=dia, data_pagamento=dia if pago else None, pago=pago,
+                ))
+        Lancamento.objects.bulk_create(despesas, batch_size=self.lote)
+
+    def gerar_ajustes(self, opcoes):
+        AjusteEstoque.objects.bulk_create([
+            AjusteEstoque(
+                empresa=self.empresa, produto_id=self.aleatorio.choice(self.produtos)[0], responsavel=self.gerente,
+                quantidade=self.aleatorio.randint(1, 20), motivo=self.aleatorio.choice(AjusteEstoque.MOTIVO_CHOICES)[0],
+            ) for _ in range(opcoes['ajustes'])
+        ], batch_size=self.lote)
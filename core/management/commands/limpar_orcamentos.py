@@ -0,0 +1,44 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import Venda, ItemVenda
+
+
+class Command(BaseCommand):
+    help = "Apaga orçamentos (vendas em ORCAMENTO) sem nenhum item e sem uso há mais de N horas, em lotes pequenos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help="Idade mínima do rascunho (padrão: 24h)")
+        parser.add_argument('--lote', type=int, default=1000, help="Vendas apagadas por transação (padrão: 1000)")
+        parser.add_argument('--pausa', type=float, default=0.1, help="Segundos de espera entre lotes, para não segurar o banco")
+        parser.add_argument('--simular', action='store_true', help="Só conta o que seria apagado")
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=options['horas'])
+        # qtd_itens é mantido pelo PDV; o EXISTS garante que nenhuma venda com itens seja apagada
+        abandonadas = Venda.objects.filter(status='ORCAMENTO', qtd_itens=0, data_venda__lt=limite).exclude(
+            Exists(ItemVenda.objects.filter(venda=OuterRef('pk')))
+        )
+
+        if options['simular']:
+            self.stdout.write(f"{abandonadas.count()} orçamentos vazios seriam apagados.")
+            return
+
+        total = 0
+        ultimo_id = 0
+        while True:
+            # Lotes por faixa de id: cada DELETE é curto e não trava a tabela inteira
+            ids = list(abandonadas.filter(id__gt=ultimo_id).order_by('id').values_list('id', flat=True)[:options['lote']])
+            if not ids:
+                break
+            Venda.objects.filter(id__in=ids, status='ORCAMENTO', qtd_itens=0).delete()
+            total += len(ids)
+            ultimo_id = ids[-1]
+            self.stdout.write(f"  ... {total} apagados")
+            time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} orçamentos vazios apagados."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ResumoVendasDia
+
+
+class Command(BaseCommand):
+    help = "Refaz o resumo diário de vendas (dashboard/relatórios) a partir das vendas fechadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, default=None, help="Recalcula só esta empresa (id)")
+
+    def handle(self, *args, **options):
+        ResumoVendasDia.reconstruir(options['empresa'])
+        self.stdout.write(self.style.SUCCESS("Resumo diário de vendas recalculado."))
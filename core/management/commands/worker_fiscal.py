@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.fiscal import processar_fila
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de NFC-e: emite as notas pendentes fora do caixa, com novas tentativas e limite por loja."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help="Processa uma rodada e sai (útil em cron)")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera quando a fila está vazia")
+        parser.add_argument('--lote', type=int, default=None, help="Notas reservadas por rodada (padrão: FISCAL_TAMANHO_LOTE)")
+        parser.add_argument('--threads', type=int, default=None, help="Emissões em paralelo (padrão: FISCAL_THREADS)")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            processadas = processar_fila(options['lote'], options['threads'])
+            if processadas:
+                self.stdout.write(f"{processadas} notas processadas.")
+            if options['uma_vez']:
+                break
+            if not processadas:
+                time.sleep(options['intervalo'])
@@ -1,46 +1,136 @@
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import connection
 from django.shortcuts import render, redirect
 from django.contrib.auth import logout
 from django.utils import timezone
 from django.urls import reverse
 
+from .models import Empresa, usar_empresa
+
+logger = logging.getLogger('core.instrumentacao')
+
+# URLs que NÃO devem ser bloqueadas (segurança para não travar o sistema)
+# /admin/ -> Para você conseguir entrar e desbloquear
+# /logout/, /login/, /cadastro/ -> Para o cliente conseguir sair ou entrar em outra conta
+# /static/ e /media/ -> Para o CSS e as imagens carregarem na tela de bloqueio
+# /webhook/ -> Para o Asaas conseguir avisar do pagamento
+URLS_LIBERADAS = re.compile(r'^/(?:admin|logout|login|cadastro|static|media|webhook)/')
+
+
 class SaasSecurityMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Lista de URLs que NÃO devem ser bloqueadas (segurança para não travar o sistema)
-        # /admin/ -> Para você conseguir entrar e desbloquear
-        # /logout/ -> Para o cliente conseguir sair da conta bloqueada
-        # /static/ e /media/ -> Para o CSS e as imagens carregarem na tela de bloqueio
-        urls_liberadas = [
-        '/admin/', '/logout/', '/login/', '/cadastro/', # <--- Adicione Login e Cadastro   
-        '/static/', '/media/', '/webhook/' # <--- Adicione Webhook também para o Asaas conseguir avisar         '/static/', '/media/'
-        ]
-        
         # Se o usuário não está logado ou é o dono do sistema (Você), deixa passar livre
         if not request.user.is_authenticated or request.user.is_superuser:
             return self.get_response(request)
 
         # Se a página que ele quer acessar está na lista liberada, deixa passar
-        for path in urls_liberadas:
-            if request.path.startswith(path):
-                return self.get_response(request)
+        if URLS_LIBERADAS.match(request.path):
+            return self.get_response(request)
 
         # --- AQUI COMEÇA A SEGURANÇA ---
-        if hasattr(request.user, 'empresa') and request.user.empresa:
-            empresa = request.user.empresa
+        # Estado da loja vem do cache (Empresa.estado_acesso), sem query a cada request
+        empresa_id = getattr(request.user, 'empresa_id', None)
+        if empresa_id:
+            estado = Empresa.estado_acesso(empresa_id)
             hoje = timezone.now().date()
-            
+
             # 1. Checa se a empresa foi travada manualmente por você (Inadimplência grave)
-            if not empresa.ativa:
+            if estado and not estado['ativa']:
                 logout(request)
                 return render(request, 'core/bloqueado.html', {'motivo': 'bloqueada'})
 
             # 2. Checa se venceu o Teste Grátis ou a Mensalidade
-            if empresa.data_vencimento and empresa.data_vencimento < hoje:
+            if estado and estado['data_vencimento'] and estado['data_vencimento'] < hoje:
                 # Em vez de só avisar, agora nós mostramos a tela de cobrança e impedimos o acesso
-                return render(request, 'core/planos.html', {'empresa': empresa})
+                return render(request, 'core/planos.html', {'empresa': request.user.empresa})
 
         return self.get_response(request)
-    
-        return response
\ No newline at end of file
+
+
+# Painéis que enxergam todas as lojas: sem loja no contexto, o manager não filtra
+URLS_SEM_TENANT = re.compile(r'^/(?:admin|saas-admin)/')
+
+
+class TenantMiddleware:
+    # Coloca a loja do usuário logado no contexto (core.models.empresa_atual) durante o request,
+    # para o TenantManager filtrar todas as queries dos modelos da loja
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        empresa_id = None
+        if request.user.is_authenticated and not URLS_SEM_TENANT.match(request.path):
+            empresa_id = getattr(request.user, 'empresa_id', None)
+        with usar_empresa(empresa_id):
+            return self.get_response(request)
+
+
+class ColetorQueries:
+    # Passa por toda query executada na conexão (connection.execute_wrapper)
+    def __init__(self):
+        self.total = 0
+        self.tempo_db = 0.0
+        self.vistas = set()
+        self.repetidas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_db += time.perf_counter() - inicio
+            self.total += 1
+            # Mesmo SQL com parâmetros diferentes também conta: é o padrão do N+1
+            if sql in self.vistas:
+                self.repetidas += 1
+            else:
+                self.vistas.add(sql)
+
+
+class InstrumentacaoMiddleware:
+    # Mede tempo total, tempo de banco, nº de queries e queries repetidas de cada request.
+    # Passou de algum limite (INSTRUMENTACAO_* no settings) -> linha de log com tudo em chave=valor.
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ativa = getattr(settings, 'INSTRUMENTACAO_ATIVA', True)
+        self.limite_ms = getattr(settings, 'INSTRUMENTACAO_LIMITE_MS', 500)
+        self.limite_queries = getattr(settings, 'INSTRUMENTACAO_LIMITE_QUERIES', 30)
+        self.limite_repetidas = getattr(settings, 'INSTRUMENTACAO_LIMITE_REPETIDAS', 10)
+        self.server_timing = getattr(settings, 'INSTRUMENTACAO_SERVER_TIMING', False)
+
+    def __call__(self, request):
+        if not self.ativa:
+            return self.get_response(request)
+
+        coletor = ColetorQueries()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(coletor):
+            response = self.get_response(request)
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        tempo_db_ms = coletor.tempo_db * 1000
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'app;dur={tempo_ms - tempo_db_ms:.1f}, '
+                f'db;dur={tempo_db_ms:.1f};desc="{coletor.total} queries ({coletor.repetidas} repetidas)"'
+            )
+
+        if tempo_ms >= self.limite_ms or coletor.total >= self.limite_queries or coletor.repetidas >= self.limite_repetidas:
+            view = request.resolver_match.view_name if request.resolver_match else '-'
+            # Este middleware roda antes do AuthenticationMiddleware: request.user pode nem existir
+            # (resposta curta do CSRF/Common) ou ainda não ter sido carregado. Só usa o usuário que a
+            # própria view já carregou, sem gastar uma query de sessão/usuário só para o log.
+            empresa_id = getattr(getattr(request, '_cached_user', None), 'empresa_id', None)
+            logger.warning(
+                'request_acima_limite view=%s metodo=%s caminho=%s status=%s tempo_ms=%.1f db_ms=%.1f queries=%d repetidas=%d empresa=%s',
+                view, request.method, request.path, response.status_code, tempo_ms, tempo_db_ms,
+                coletor.total, coletor.repetidas, empresa_id or '-',
+            )
+        return response
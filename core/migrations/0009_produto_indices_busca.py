@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_produto_cor_produto_tamanho'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['empresa', 'codigo_barras'], name='core_prod_emp_codbar_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['empresa', 'ativo', 'nome'], name='core_prod_emp_ativo_nome_idx'),
+        ),
+    ]
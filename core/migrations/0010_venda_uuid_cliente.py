@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_produto_indices_busca'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='uuid_cliente',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='venda',
+            constraint=models.UniqueConstraint(fields=('empresa', 'uuid_cliente'), name='core_venda_uuid_cliente_unico'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:14
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_totais(apps, schema_editor):
+    # Vendas antigas: calcula os totais mantidos a partir dos itens num único UPDATE
+    Venda = apps.get_model('core', 'Venda')
+    ItemVenda = apps.get_model('core', 'ItemVenda')
+    decimal = models.DecimalField(max_digits=12, decimal_places=2)
+    itens = ItemVenda.objects.filter(venda=OuterRef('pk')).values('venda')
+    subtotal = ExpressionWrapper(F('quantidade') * F('preco_unitario'), output_field=decimal)
+    Venda.objects.update(
+        subtotal=Coalesce(Subquery(itens.annotate(t=Sum(subtotal)).values('t')), Value(Decimal('0.00')), output_field=decimal),
+        qtd_itens=Coalesce(Subquery(itens.annotate(t=Sum('quantidade')).values('t')), Value(0)),
+        total_comissao=Coalesce(Subquery(itens.annotate(t=Sum('comissao_valor')).values('t')), Value(Decimal('0.00')), output_field=decimal),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_venda_uuid_cliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venda',
+            name='qtd_itens',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='venda',
+            name='total_comissao',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+        ),
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_venda_totais_mantidos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmissaoFiscal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('PROCESSANDO', 'Enviando'), ('EMITIDA', 'Emitida'), ('ERRO', 'Falhou')], default='PENDENTE', max_length=20)),
+                ('tentativas', models.IntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_erro', models.TextField(blank=True, null=True)),
+                ('data_criacao', models.DateTimeField(auto_now_add=True)),
+                ('data_emissao', models.DateTimeField(blank=True, null=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa')),
+                ('venda', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='emissao_fiscal', to='core.venda')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='core_emissao_fila_idx')],
+            },
+        ),
+    ]
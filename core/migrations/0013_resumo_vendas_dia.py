@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def preencher_resumo(apps, schema_editor):
+    # Resumo inicial a partir das vendas já fechadas (um GROUP BY por loja/dia)
+    Venda = apps.get_model('core', 'Venda')
+    ResumoVendasDia = apps.get_model('core', 'ResumoVendasDia')
+    totais = (
+        Venda.objects.filter(status='FECHADA')
+        .annotate(dia=TruncDate('data_venda', tzinfo=timezone.get_current_timezone()))
+        .values('empresa_id', 'dia')
+        .annotate(receita=Sum('valor_total'), qtd_vendas=Count('id'), itens_vendidos=Sum('qtd_itens'))
+        .order_by()
+    )
+    ResumoVendasDia.objects.bulk_create((ResumoVendasDia(**linha) for linha in totais.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_emissao_fiscal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoVendasDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('receita', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('qtd_vendas', models.IntegerField(default=0)),
+                ('itens_vendidos', models.IntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_vendas', to='core.empresa')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'dia'), name='core_resumo_vendas_dia_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_resumo_vendas_dia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FechamentoComissao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ativo', models.BooleanField(default=True)),
+                ('competencia', models.DateField(help_text='Primeiro dia do mês fechado')),
+                ('total_vendido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_comissao', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('qtd_itens', models.IntegerField(default=0)),
+                ('data_fechamento', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa')),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='fechamentos_comissao', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('empresa', 'competencia', 'vendedor'), name='core_fech_comissao_unico')],
+            },
+        ),
+    ]
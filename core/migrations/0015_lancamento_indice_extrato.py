@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_fechamento_comissao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['empresa', 'data_vencimento', 'id'], name='core_lanc_emp_venc_idx'),
+        ),
+    ]
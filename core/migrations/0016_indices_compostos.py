@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_lancamento_indice_extrato'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['empresa', 'tipo', 'pago', 'data_vencimento'], name='core_lanc_emp_tipo_pago_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(condition=models.Q(('pago', True)), fields=['empresa', 'data_pagamento'], name='core_lanc_pagos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentocaixa',
+            index=models.Index(condition=models.Q(('status', 'ABERTO')), fields=['operador'], name='core_movcaixa_aberto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'status', 'data_venda'], name='core_venda_emp_status_data_idx'),
+        ),
+    ]
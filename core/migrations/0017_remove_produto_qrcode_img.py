@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_indices_compostos'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='produto',
+            name='qrcode_img',
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_remove_produto_qrcode_img'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['empresa', 'nome', 'id'], name='core_categ_emp_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['empresa', 'nome', 'id'], name='core_cliente_emp_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['empresa', 'data_cadastro', 'id'], name='core_cliente_emp_cad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fornecedor',
+            index=models.Index(fields=['empresa', 'razao_social', 'id'], name='core_fornec_emp_razao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['empresa', 'nome', 'id'], name='core_prod_emp_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['empresa', 'preco_venda', 'id'], name='core_prod_emp_preco_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['empresa', 'estoque_atual', 'id'], name='core_prod_emp_estoque_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['empresa', 'username', 'id'], name='core_usuario_emp_user_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_indices_listas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emissaofiscal',
+            name='status',
+            field=models.CharField(choices=[('PENDENTE', 'Na fila'), ('PROCESSANDO', 'Enviando'), ('EMITIDA', 'Emitida'), ('ERRO', 'Falhou'), ('CANCELADA', 'Venda cancelada')], default='PENDENTE', max_length=20),
+        ),
+    ]
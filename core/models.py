@@ -1,9 +1,22 @@
-from django.db import models
+import contextvars
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Sum, Count, Value, Case, When, OuterRef, Subquery, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
+import uuid
 from django.contrib.auth.models import AbstractUser
-import qrcode
-from io import BytesIO
-from django.core.files.base import ContentFile
+from django.core.cache import cache
 from django.utils import timezone
+from .cache_relatorios import invalidar_relatorios
+from .imagens import gerar_variantes
+
+logger = logging.getLogger(__name__)
 
 # =========================================================
 #  1. EMPRESA (A MÃE DE TODOS) - DEVE FICAR NO TOPO
@@ -49,6 +62,25 @@ class Empresa(models.Model):
     def __str__(self):
         return self.nome_fantasia
 
+    def save(self, *args, **kwargs):
+        logo_nova = bool(self.logo) and not self.logo._committed
+        super().save(*args, **kwargs)
+        if logo_nova:
+            gerar_variantes(self.logo, ('logo',))
+        # Bloqueio, vencimento e plano mudam por aqui (painel SaaS, webhook do Asaas, configurações)
+        transaction.on_commit(lambda: cache.delete(f'empresa:acesso:{self.pk}'))
+
+    @staticmethod
+    def estado_acesso(empresa_id):
+        # ativa / data_vencimento / plano da loja, em cache: o SaasSecurityMiddleware
+        # confere isso em todo request e não deve ir ao banco para isso
+        chave = f'empresa:acesso:{empresa_id}'
+        estado = cache.get(chave)
+        if estado is None:
+            estado = Empresa.objects.filter(pk=empresa_id).values('ativa', 'data_vencimento', 'plano').first() or {}
+            cache.set(chave, estado, settings.EMPRESA_ACESSO_CACHE_SEGUNDOS)
+        return estado
+
     # --- LÓGICA DE NEGÓCIO ---
     @property
     def dias_restantes(self):
@@ -89,17 +121,63 @@ class Usuario(AbstractUser):
     )
     cargo = models.CharField(max_length=20, choices=TIPO_CHOICES, default='VENDEDOR')
 
+    class Meta(AbstractUser.Meta):
+        # Lista da equipe: usuários da loja por username, paginada por cursor
+        indexes = [
+            models.Index(fields=['empresa', 'username', 'id'], name='core_usuario_emp_user_idx'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.get_cargo_display()})"
 
 # =========================================================
 #  3. CLASSE ABSTRATA (BASE PARA OS OUTROS)
 # =========================================================
+# Loja do request atual. Quem define é o TenantMiddleware (core/middleware.py);
+# fora de request (comandos, worker fiscal) fica vazio e nada é filtrado,
+# a não ser que o código use `with usar_empresa(id):`.
+empresa_atual = contextvars.ContextVar('empresa_atual', default=None)
+
+
+@contextmanager
+def usar_empresa(empresa_id):
+    token = empresa_atual.set(empresa_id)
+    try:
+        yield
+    finally:
+        empresa_atual.reset(token)
+
+
+class TenantQuerySet(models.QuerySet):
+    def da_empresa(self, empresa):
+        return self.filter(empresa=empresa)
+
+    def ativos(self):
+        return self.filter(ativo=True)
+
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    # Manager padrão dos modelos da loja: com uma loja no contexto, toda query
+    # já sai filtrada por ela (e cai nos índices que começam por empresa).
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        empresa_id = empresa_atual.get()
+        if empresa_id is not None:
+            queryset = queryset.filter(empresa_id=empresa_id)
+        return queryset
+
+
 class ModeloDoTenant(models.Model):
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE)
     ativo = models.BooleanField(default=True)
+
+    objects = TenantManager()
+    todas_empresas = models.Manager()  # Sem filtro de loja (painel SaaS, rotinas globais)
+
     class Meta:
         abstract = True
+        # Sem índice genérico (empresa, ativo): a FK já indexa empresa, e cada modelo declara
+        # só os índices compostos que as suas consultas usam
 
 # =========================================================
 #  4. CADASTROS BÁSICOS
@@ -109,12 +187,23 @@ class Fornecedor(ModeloDoTenant):
     cnpj = models.CharField(max_length=20, blank=True, null=True)
     telefone = models.CharField(max_length=20)
     email = models.EmailField(blank=True, null=True)
-    
+
+    class Meta(ModeloDoTenant.Meta):
+        indexes = [
+            models.Index(fields=['empresa', 'razao_social', 'id'], name='core_fornec_emp_razao_idx'),
+        ]
+
     def __str__(self):
         return self.razao_social
 
 class Categoria(ModeloDoTenant):
     nome = models.CharField(max_length=100)
+
+    class Meta(ModeloDoTenant.Meta):
+        indexes = [
+            models.Index(fields=['empresa', 'nome', 'id'], name='core_categ_emp_nome_idx'),
+        ]
+
     def __str__(self):
         return self.nome
 
@@ -150,6 +239,12 @@ class MovimentoCaixa(ModeloDoTenant):
     
     status = models.CharField(max_length=20, default='ABERTO', choices=(('ABERTO', 'Aberto'), ('FECHADO', 'Fechado')))
 
+    class Meta(ModeloDoTenant.Meta):
+        # "Caixa aberto do operador" roda em toda abertura de PDV; parcial: só turnos abertos entram no índice
+        indexes = [
+            models.Index(fields=['operador'], condition=Q(status='ABERTO'), name='core_movcaixa_aberto_idx'),
+        ]
+
     def __str__(self):
         return f"Turno #{self.id} - {self.operador.username}"
 
@@ -175,22 +270,96 @@ class Produto(ModeloDoTenant):
     
     descricao = models.TextField(blank=True, null=True)
     foto = models.ImageField(upload_to='produtos/', blank=True, null=True)
-    qrcode_img = models.ImageField(upload_to='qrcodes/', blank=True, null=True)
+
+    class Meta(ModeloDoTenant.Meta):
+        # Índices por loja usados pela busca do PDV (código de barras exato e nome).
+        # (empresa, ativo, nome) também atende os filtros só por (empresa, ativo), como o catálogo do PDV offline.
+        # Os três últimos servem às ordenações da lista de produtos (paginada por cursor).
+        indexes = [
+            models.Index(fields=['empresa', 'codigo_barras'], name='core_prod_emp_codbar_idx'),
+            models.Index(fields=['empresa', 'ativo', 'nome'], name='core_prod_emp_ativo_nome_idx'),
+            models.Index(fields=['empresa', 'nome', 'id'], name='core_prod_emp_nome_idx'),
+            models.Index(fields=['empresa', 'preco_venda', 'id'], name='core_prod_emp_preco_idx'),
+            models.Index(fields=['empresa', 'estoque_atual', 'id'], name='core_prod_emp_estoque_idx'),
+        ]
 
     def __str__(self):
         return self.nome
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        produto = super().from_db(db, field_names, values)
+        # Lembra se o produto já estava abaixo do mínimo, para o contador de estoque baixo
+        if 'estoque_atual' in field_names and 'estoque_minimo' in field_names:
+            produto._estoque_baixo_original = produto.estoque_atual <= produto.estoque_minimo
+        return produto
+
     def save(self, *args, **kwargs):
-        if not self.qrcode_img:
-            conteudo_qr = f"ID:{self.id}|{self.nome}|R$ {self.preco_venda}"
-            qr = qrcode.QRCode(version=1, box_size=10, border=2)
-            qr.add_data(conteudo_qr)
-            qr.make(fit=True)
-            img = qr.make_image(fill='black', back_color='white')
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            self.qrcode_img.save(f'qr_{self.id}.png', ContentFile(buffer.getvalue()), save=False)
+        # O QR Code é gerado sob demanda (core/qrcodes.py), não aqui
+        novo = self._state.adding
+        foto_nova = bool(self.foto) and not self.foto._committed
         super().save(*args, **kwargs)
+        if foto_nova:
+            gerar_variantes(self.foto, ('mini', 'card'))
+        Produto.estoque_alterado(self.empresa_id)
+
+        baixo = int(self.estoque_atual) <= int(self.estoque_minimo)
+        original = getattr(self, '_estoque_baixo_original', None)
+        if novo:
+            Produto.ajustar_estoque_baixo(self.empresa_id, int(baixo))
+        elif original is None:
+            Produto.recontar_estoque_baixo(self.empresa_id)
+        else:
+            Produto.ajustar_estoque_baixo(self.empresa_id, int(baixo) - int(original))
+        self._estoque_baixo_original = baixo
+
+    def delete(self, *args, **kwargs):
+        baixo = getattr(self, '_estoque_baixo_original', None)
+        resultado = super().delete(*args, **kwargs)
+        Produto.estoque_alterado(self.empresa_id)
+        if baixo is None:
+            Produto.recontar_estoque_baixo(self.empresa_id)
+        else:
+            Produto.ajustar_estoque_baixo(self.empresa_id, -int(baixo))
+        return resultado
+
+    @staticmethod
+    def versao_estoque(empresa_id):
+        # Marca da última mudança de estoque da loja; entra na chave dos caches derivados
+        return cache.get_or_set(f'estoque:versao:{empresa_id}', uuid.uuid4().hex, None)
+
+    @staticmethod
+    def estoque_alterado(empresa_id):
+        # Troca a versão só depois do commit, para ninguém recalcular e guardar dados antigos
+        transaction.on_commit(lambda: cache.set(f'estoque:versao:{empresa_id}', uuid.uuid4().hex, None))
+
+    @staticmethod
+    def contar_estoque_baixo(empresa_id):
+        # Quantos produtos da loja estão no estoque mínimo ou abaixo. O número fica no cache
+        # e é ajustado a cada produto que cruza o mínimo; o COUNT só roda com o cache vazio.
+        chave = f'estoque:baixo:{empresa_id}'
+        total = cache.get(chave)
+        if total is None:
+            total = Produto.objects.filter(empresa_id=empresa_id, estoque_atual__lte=F('estoque_minimo')).count()
+            cache.add(chave, total, settings.ESTOQUE_BAIXO_CACHE_SEGUNDOS)
+        return total
+
+    @staticmethod
+    def ajustar_estoque_baixo(empresa_id, delta):
+        if not delta:
+            return
+
+        def aplicar():
+            try:
+                cache.incr(f'estoque:baixo:{empresa_id}', delta)
+            except ValueError:
+                pass  # Contador fora do cache: a próxima leitura conta de novo no banco
+        transaction.on_commit(aplicar)
+
+    @staticmethod
+    def recontar_estoque_baixo(empresa_id):
+        # Para mudanças em lote (importação, carga de dados): descarta o contador
+        transaction.on_commit(lambda: cache.delete(f'estoque:baixo:{empresa_id}'))
 
 class Cliente(ModeloDoTenant):
     nome = models.CharField(max_length=200)
@@ -201,12 +370,44 @@ class Cliente(ModeloDoTenant):
     data_cadastro = models.DateTimeField(auto_now_add=True)
     data_ultima_compra = models.DateTimeField(null=True, blank=True)
 
+    DIAS_CLIENTE_ATIVO = 30  # Comprou dentro desse prazo = cliente ativo
+
+    class Meta(ModeloDoTenant.Meta):
+        # Lista de clientes: ordem por nome ou pelos mais recentes, paginada por cursor
+        indexes = [
+            models.Index(fields=['empresa', 'nome', 'id'], name='core_cliente_emp_nome_idx'),
+            models.Index(fields=['empresa', 'data_cadastro', 'id'], name='core_cliente_emp_cad_idx'),
+        ]
+
     def __str__(self):
         return self.nome
 
+    @property
+    def dias_sem_comprar(self):
+        if not self.data_ultima_compra:
+            return None
+        return (timezone.now() - self.data_ultima_compra).days
+
+    @property
+    def status_compra(self):
+        if not self.data_ultima_compra:
+            return 'NOVO'
+        return 'ATIVO' if self.dias_sem_comprar <= self.DIAS_CLIENTE_ATIVO else 'INATIVO'
+
 # =========================================================
 #  7. VENDAS
 # =========================================================
+def limites_do_periodo(data_ini, data_fim):
+    # [data_ini 00:00, dia seguinte a data_fim 00:00) no fuso da loja. Filtrar data_venda por
+    # esse intervalo usa os índices; data_venda__date=... aplica função na coluna e não usa.
+    if isinstance(data_ini, str):
+        data_ini = parse_date(data_ini)
+    if isinstance(data_fim, str):
+        data_fim = parse_date(data_fim)
+    inicio = timezone.make_aware(datetime.combine(data_ini, datetime.min.time()))
+    fim = timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), datetime.min.time()))
+    return inicio, fim
+
 class Venda(ModeloDoTenant):
     STATUS_CHOICES = (
         ('ORCAMENTO', 'Orçamento'),
@@ -223,13 +424,349 @@ class Venda(ModeloDoTenant):
     
     desconto = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     valor_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+
+    # Totais do carrinho mantidos a cada item lançado/removido (sem somar os itens na hora de exibir)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
+    qtd_itens = models.IntegerField(default=0)
+    total_comissao = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
     
     nota_fiscal_url = models.URLField(blank=True, null=True)
     nota_fiscal_emitida = models.BooleanField(default=False)
 
+    # Gerado no navegador pelo PDV offline: reenviar a mesma venda não duplica
+    uuid_cliente = models.UUIDField(null=True, blank=True, editable=False)
+
+    class Meta(ModeloDoTenant.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'uuid_cliente'], name='core_venda_uuid_cliente_unico'),
+        ]
+        # Relatórios, comissões e exportações: vendas fechadas da loja num período
+        indexes = [
+            models.Index(fields=['empresa', 'status', 'data_venda'], name='core_venda_emp_status_data_idx'),
+        ]
+
     def __str__(self):
         return f"Venda #{self.id}"
 
+    def fechar(self, forma_pagamento_id, emitir_fiscal=False):
+        # Fecha a venda numa única transação, com número fixo de queries
+        # (não importa quantos itens a venda tenha). Retorna False se outra
+        # requisição/terminal já fechou esta venda.
+        with transaction.atomic():
+            # Trava a linha da venda: dois cliques em "Finalizar" não geram baixa dupla
+            status_atual = Venda.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
+            if status_atual != 'ORCAMENTO':
+                return False
+
+            Venda.objects.filter(pk=self.pk).update(status='FECHADA', forma_pagamento_id=forma_pagamento_id)
+            totais = Venda.efetivar_fechamento(self.empresa_id, [self.pk], data_lancamento=timezone.now().date())
+
+            # A NFC-e não é emitida aqui: entra na fila e o worker fiscal (manage.py worker_fiscal)
+            # fala com a SEFAZ depois, sem segurar o caixa.
+            if emitir_fiscal:
+                EmissaoFiscal.objects.create(empresa_id=self.empresa_id, venda_id=self.pk)
+
+        self.status = 'FECHADA'
+        self.forma_pagamento_id = forma_pagamento_id
+        self.valor_total = totais[self.pk]
+        return True
+
+    @classmethod
+    def efetivar_fechamento(cls, empresa_id, venda_ids, data_lancamento=None):
+        # Efeitos de uma ou várias vendas recém-fechadas, em número fixo de queries:
+        # total calculado no banco, baixa de estoque, última compra do cliente e receita.
+        # Deve rodar dentro da transação de quem fechou as vendas. Sem data_lancamento,
+        # a receita fica na data de cada venda (vendas sincronizadas do modo offline).
+        agora = timezone.now()
+        itens = ItemVenda.objects.filter(venda_id__in=venda_ids)
+        subtotal = ExpressionWrapper(F('quantidade') * F('preco_unitario'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
+        total_da_venda = ItemVenda.objects.filter(venda=OuterRef('pk')).values('venda').annotate(total=Sum(subtotal)).values('total')
+        cls.objects.filter(pk__in=venda_ids).update(valor_total=Coalesce(Subquery(total_da_venda), Value(Decimal('0.00'))))
+
+        # Baixa de estoque em um único UPDATE com F(): o banco subtrai sobre o valor
+        # atual, então vendas simultâneas do mesmo produto não se sobrescrevem.
+        qtd_vendida = itens.filter(produto=OuterRef('pk')).values('produto').annotate(total=Sum('quantidade')).values('total')
+        Produto.objects.filter(id__in=itens.values('produto_id')).update(
+            estoque_atual=F('estoque_atual') - Subquery(qtd_vendida)
+        )
+        Produto.estoque_alterado(empresa_id)
+        # Conta depois do UPDATE (linhas já travadas por esta transação): quem cruzou o mínimo agora
+        Produto.ajustar_estoque_baixo(empresa_id, Produto.objects.filter(id__in=itens.values('produto_id')).annotate(
+            vendida=Subquery(qtd_vendida)
+        ).filter(estoque_atual__lte=F('estoque_minimo'), estoque_atual__gt=F('estoque_minimo') - F('vendida')).count())
+
+        vendas = list(cls.objects.filter(pk__in=venda_ids).values_list('id', 'valor_total', 'data_venda', 'cliente_id', 'qtd_itens'))
+        Cliente.objects.filter(pk__in={v[3] for v in vendas if v[3]}).update(data_ultima_compra=agora)
+
+        Lancamento.objects.bulk_create([
+            Lancamento(
+                empresa_id=empresa_id, tipo='RECEITA', titulo=f"Venda #{venda_id}", valor=valor_total,
+                data_vencimento=data_lancamento or timezone.localdate(data_venda),
+                data_pagamento=data_lancamento or timezone.localdate(data_venda),
+                pago=True, venda_origem_id=venda_id
+            ) for venda_id, valor_total, data_venda, _, _ in vendas
+        ])
+
+        ResumoVendasDia.acumular(empresa_id, [(data_venda, valor_total, qtd_itens) for _, valor_total, data_venda, _, qtd_itens in vendas])
+        invalidar_relatorios(empresa_id, [data_lancamento] + [timezone.localdate(v[2]) for v in vendas])
+        return {venda_id: valor_total for venda_id, valor_total, _, _, _ in vendas}
+
+    def cancelar(self):
+        # Cancela a venda. Se ela já estava fechada, desfaz os efeitos do fechamento:
+        # devolve o estoque, tira a receita do financeiro e do resumo diário.
+        # Retorna False se a venda já estava cancelada.
+        with transaction.atomic():
+            status_atual = Venda.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
+            if status_atual == 'CANCELADA':
+                return False
+
+            if status_atual == 'FECHADA':
+                itens = ItemVenda.objects.filter(venda_id=self.pk)
+                qtd_vendida = itens.filter(produto=OuterRef('pk')).values('produto').annotate(total=Sum('quantidade')).values('total')
+                Produto.objects.filter(id__in=itens.values('produto_id')).update(
+                    estoque_atual=F('estoque_atual') + Subquery(qtd_vendida)
+                )
+                Produto.estoque_alterado(self.empresa_id)
+                Produto.ajustar_estoque_baixo(self.empresa_id, -Produto.objects.filter(id__in=itens.values('produto_id')).annotate(
+                    devolvida=Subquery(qtd_vendida)
+                ).filter(estoque_atual__gt=F('estoque_minimo'), estoque_atual__lte=F('estoque_minimo') + F('devolvida')).count())
+                receitas = Lancamento.objects.filter(venda_origem_id=self.pk, tipo='RECEITA')
+                datas_receita = list(receitas.values_list('data_pagamento', flat=True))
+                receitas.delete()
+                # Nota que o worker já reservou (PROCESSANDO) não é apagada: ele confere o status da venda antes de emitir
+                EmissaoFiscal.objects.filter(venda_id=self.pk, status='PENDENTE').delete()
+                valor_total, data_venda, qtd_itens = Venda.objects.filter(pk=self.pk).values_list('valor_total', 'data_venda', 'qtd_itens').get()
+                ResumoVendasDia.acumular(self.empresa_id, [(data_venda, -valor_total, -qtd_itens)], vendas=-1)
+                invalidar_relatorios(self.empresa_id, datas_receita + [timezone.localdate(data_venda)])
+
+            Venda.objects.filter(pk=self.pk).update(status='CANCELADA')
+            if status_atual == 'FECHADA':
+                # Depois do UPDATE: o fechamento refeito já não soma esta venda
+                FechamentoComissao.refazer_meses_fechados(self.empresa_id, [data_venda])
+
+        self.status = 'CANCELADA'
+        return True
+
+    @classmethod
+    def sincronizar_offline(cls, usuario, vendas):
+        # Recebe vendas registradas no PDV offline:
+        # [{'uuid', 'data', 'forma_pagamento', 'cliente', 'itens': [{'produto', 'quantidade'}]}]
+        # O uuid vem do navegador, então reenviar um lote é seguro: o que já
+        # foi recebido volta em 'duplicadas' e não mexe em estoque nem no caixa.
+        # Cada venda é gravada no seu próprio savepoint: uma venda com defeito vai para
+        # 'rejeitadas' com o motivo e não impede as outras (nem trava a fila do navegador).
+        empresa_id = usuario.empresa_id
+        resultado = {'recebidas': [], 'duplicadas': [], 'rejeitadas': []}
+
+        def inteiro(valor):
+            try:
+                return int(valor)
+            except (TypeError, ValueError):
+                return None
+
+        pendentes = {}
+        for venda in vendas:
+            try:
+                pendentes.setdefault(str(uuid.UUID(str(venda['uuid']))), venda)
+            except (KeyError, TypeError, ValueError):
+                resultado['rejeitadas'].append({'uuid': venda.get('uuid') if isinstance(venda, dict) else None, 'motivo': 'uuid inválido'})
+
+        ja_recebidas = {str(u) for u in cls.objects.filter(empresa_id=empresa_id, uuid_cliente__in=list(pendentes)).values_list('uuid_cliente', flat=True)}
+        for chave in ja_recebidas:
+            resultado['duplicadas'].append(chave)
+            del pendentes[chave]
+        if not pendentes:
+            return resultado
+
+        def linhas_da(dados):
+            linhas = dados.get('itens')
+            return [l for l in linhas if isinstance(l, dict)] if isinstance(linhas, list) else []
+
+        ids_produtos = {inteiro(l.get('produto')) for v in pendentes.values() for l in linhas_da(v)}
+        # Preço e comissão vêm do cadastro, nunca do navegador
+        produtos = {p.id: p for p in Produto.objects.filter(empresa_id=empresa_id, id__in=ids_produtos - {None}).only('id', 'preco_venda', 'porcentagem_comissao')}
+        formas = set(FormaPagamento.objects.filter(empresa_id=empresa_id).values_list('id', flat=True))
+        clientes = set(Cliente.objects.filter(empresa_id=empresa_id, id__in={inteiro(v.get('cliente')) for v in pendentes.values()} - {None}).values_list('id', flat=True))
+        movimento = MovimentoCaixa.objects.filter(operador=usuario, status='ABERTO').first()
+
+        for chave, dados in pendentes.items():
+            linhas = linhas_da(dados)
+            if not linhas or len(linhas) != len(dados['itens']) or any(
+                inteiro(l.get('produto')) not in produtos or not 1 <= (inteiro(l.get('quantidade')) or 0) <= cls.QTD_MAXIMA_LINHA
+                for l in linhas
+            ):
+                resultado['rejeitadas'].append({'uuid': chave, 'motivo': 'itens inválidos ou produto inexistente'})
+                continue
+            try:
+                data = parse_datetime(dados['data']) if isinstance(dados.get('data'), str) else None
+            except ValueError:
+                data = None
+            data = data or timezone.now()
+            if timezone.is_naive(data):
+                data = timezone.make_aware(data)
+
+            try:
+                with transaction.atomic():
+                    venda = cls.objects.create(
+                        empresa_id=empresa_id, vendedor=usuario, movimento_caixa=movimento, status='FECHADA', uuid_cliente=chave,
+                        forma_pagamento_id=inteiro(dados.get('forma_pagamento')) if inteiro(dados.get('forma_pagamento')) in formas else None,
+                        cliente_id=inteiro(dados.get('cliente')) if inteiro(dados.get('cliente')) in clientes else None,
+                        subtotal=Decimal('0.00'), qtd_itens=0, total_comissao=Decimal('0.00'),
+                    )
+                    itens = []
+                    for linha in linhas:
+                        produto = produtos[int(linha['produto'])]
+                        item = ItemVenda(venda=venda, produto=produto, quantidade=int(linha['quantidade']), preco_unitario=produto.preco_venda)
+                        item.calcular_comissao()
+                        itens.append(item)
+                        venda.subtotal += item.subtotal
+                        venda.qtd_itens += item.quantidade
+                        venda.total_comissao += item.comissao_valor
+                    ItemVenda.objects.bulk_create(itens)
+                    # data_venda é auto_now_add: grava a hora real da venda offline depois do INSERT
+                    cls.objects.filter(pk=venda.pk).update(
+                        data_venda=data, subtotal=venda.subtotal, qtd_itens=venda.qtd_itens, total_comissao=venda.total_comissao,
+                    )
+                    cls.efetivar_fechamento(empresa_id, [venda.pk])
+                    # Venda offline de um mês cuja comissão já foi fechada
+                    FechamentoComissao.refazer_meses_fechados(empresa_id, [data])
+            except IntegrityError:
+                # Outro envio da mesma fila gravou este uuid ao mesmo tempo
+                resultado['duplicadas'].append(chave)
+            except (ValueError, TypeError, ArithmeticError) as erro:
+                logger.warning("venda_offline_rejeitada uuid=%s erro=%s", chave, erro)
+                resultado['rejeitadas'].append({'uuid': chave, 'motivo': 'dados inválidos'})
+            else:
+                resultado['recebidas'].append(chave)
+        return resultado
+
+    QTD_MAXIMA_LINHA = 9999
+
+    @staticmethod
+    def normalizar_linha(linha):
+        # Valida uma linha vinda do PDV/leitor e devolve {'produto', 'codigo', 'quantidade'} já convertidos.
+        # Lança ValueError com o motivo, para o lote recusar só essa linha.
+        if not isinstance(linha, dict):
+            raise ValueError("linha precisa ser um objeto")
+        produto = linha.get('produto')
+        codigo = str(linha.get('codigo') or '').strip()
+        if produto not in (None, ''):
+            try:
+                produto = int(produto)
+            except (TypeError, ValueError):
+                raise ValueError("produto inválido")
+        else:
+            produto = None
+        if produto is None and not codigo:
+            raise ValueError("informe o produto ou o código de barras")
+        try:
+            quantidade = int(linha.get('quantidade') or 1)
+        except (TypeError, ValueError):
+            raise ValueError("quantidade inválida")
+        if not 1 <= quantidade <= Venda.QTD_MAXIMA_LINHA:
+            raise ValueError("quantidade fora do limite")
+        return {'produto': produto, 'codigo': codigo, 'quantidade': quantidade}
+
+    def adicionar_itens(self, linhas):
+        # Lança várias linhas de uma vez: cada linha é {'produto': id} ou {'codigo': código de barras},
+        # mais 'quantidade', já passadas por normalizar_linha. Produto repetido (no lote ou já na venda)
+        # é somado na mesma linha. Retorna os ids/códigos que não existem (ou estão inativos) nesta loja,
+        # ou None se a venda já não está em orçamento (fechada/cancelada por outro terminal).
+        ids, codigos = set(), set()
+        for linha in linhas:
+            if linha.get('produto'):
+                ids.add(int(linha['produto']))
+            elif linha.get('codigo'):
+                codigos.add(str(linha['codigo']).strip())
+
+        produtos = list(Produto.objects.filter(empresa_id=self.empresa_id, ativo=True).filter(Q(id__in=ids) | Q(codigo_barras__in=codigos)))
+        por_id = {p.id: p for p in produtos}
+        por_codigo = {p.codigo_barras: p for p in produtos if p.codigo_barras}
+
+        quantidades = {}
+        nao_encontrados = []
+        for linha in linhas:
+            qtd = int(linha.get('quantidade') or 1)
+            if linha.get('produto'):
+                produto = por_id.get(int(linha['produto']))
+            else:
+                produto = por_codigo.get(str(linha.get('codigo', '')).strip())
+            if produto is None:
+                nao_encontrados.append(linha.get('produto') or linha.get('codigo'))
+            elif qtd > 0:
+                quantidades[produto.id] = quantidades.get(produto.id, 0) + qtd
+
+        if not quantidades:
+            # Nada a gravar: não precisa travar, só não responder "não encontrado" para venda já fechada
+            return nao_encontrados if Venda.objects.filter(pk=self.pk, status='ORCAMENTO').exists() else None
+
+        with transaction.atomic():
+            # Trava a venda para que dois lotes simultâneos não somem sobre a mesma linha, e confere
+            # o status com a trava: um "Finalizar" concorrente não pode fechar a venda no meio do lote
+            status, subtotal, qtd_itens, total_comissao = Venda.objects.select_for_update().filter(pk=self.pk).values_list('status', 'subtotal', 'qtd_itens', 'total_comissao').get()
+            if status != 'ORCAMENTO':
+                return None
+            existentes = {i.produto_id: i for i in self.itens.filter(produto_id__in=quantidades)}
+            atualizar, novos = [], []
+            for produto_id, qtd in quantidades.items():
+                produto = por_id[produto_id]
+                item = existentes.get(produto_id)
+                if item:
+                    item.produto = produto
+                    item.quantidade += qtd
+                    total_comissao -= item.comissao_valor
+                    atualizar.append(item)
+                else:
+                    item = ItemVenda(venda=self, produto=produto, quantidade=qtd, preco_unitario=produto.preco_venda)
+                    novos.append(item)
+                item.calcular_comissao()
+                subtotal += qtd * item.preco_unitario
+                qtd_itens += qtd
+                total_comissao += item.comissao_valor
+            ItemVenda.objects.bulk_update(atualizar, ['quantidade', 'comissao_valor'])
+            ItemVenda.objects.bulk_create(novos)
+            Venda.objects.filter(pk=self.pk).update(subtotal=subtotal, qtd_itens=qtd_itens, total_comissao=total_comissao)
+
+        self.subtotal, self.qtd_itens, self.total_comissao = subtotal, qtd_itens, total_comissao
+        return nao_encontrados
+
+    def remover_item(self, item_id):
+        # Tira uma linha do carrinho e desconta dos totais mantidos. Retorna False se o item não é desta venda,
+        # ou None se a venda já não está em orçamento (conferido com a venda travada, como em adicionar_itens).
+        with transaction.atomic():
+            status, subtotal, qtd_itens, total_comissao = Venda.objects.select_for_update().filter(pk=self.pk).values_list('status', 'subtotal', 'qtd_itens', 'total_comissao').get()
+            if status != 'ORCAMENTO':
+                return None
+            item = self.itens.filter(pk=item_id).first()
+            if item is None:
+                return False
+            ItemVenda.objects.filter(pk=item.pk).delete()
+            subtotal -= item.subtotal
+            qtd_itens -= item.quantidade
+            total_comissao -= item.comissao_valor
+            Venda.objects.filter(pk=self.pk).update(subtotal=subtotal, qtd_itens=qtd_itens, total_comissao=total_comissao)
+
+        self.subtotal, self.qtd_itens, self.total_comissao = subtotal, qtd_itens, total_comissao
+        return True
+
+    def recalcular_totais(self):
+        # Refaz os totais mantidos direto no banco (um UPDATE só). Usado quando um item
+        # é alterado fora do PDV, por exemplo pelo admin.
+        Venda.objects.filter(pk=self.pk).update(**Venda.totais_dos_itens())
+        self.refresh_from_db(fields=['subtotal', 'qtd_itens', 'total_comissao'])
+
+    @staticmethod
+    def totais_dos_itens():
+        itens = ItemVenda.objects.filter(venda=OuterRef('pk')).values('venda')
+        decimal = models.DecimalField(max_digits=12, decimal_places=2)
+        subtotal = ExpressionWrapper(F('quantidade') * F('preco_unitario'), output_field=decimal)
+        return {
+            'subtotal': Coalesce(Subquery(itens.annotate(t=Sum(subtotal)).values('t')), Value(Decimal('0.00')), output_field=decimal),
+            'qtd_itens': Coalesce(Subquery(itens.annotate(t=Sum('quantidade')).values('t')), Value(0)),
+            'total_comissao': Coalesce(Subquery(itens.annotate(t=Sum('comissao_valor')).values('t')), Value(Decimal('0.00')), output_field=decimal),
+        }
+
 class ItemVenda(models.Model):
     venda = models.ForeignKey(Venda, on_delete=models.CASCADE, related_name='itens')
     produto = models.ForeignKey(Produto, on_delete=models.PROTECT)
@@ -237,18 +774,218 @@ class ItemVenda(models.Model):
     preco_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     comissao_valor = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
-    def save(self, *args, **kwargs):
+    def calcular_comissao(self):
         if not self.preco_unitario:
             self.preco_unitario = self.produto.preco_venda
-        
-        porcentagem = self.produto.porcentagem_comissao or 0
-        self.comissao_valor = (self.preco_unitario * self.quantidade) * (porcentagem / 100)
+
+        # Tudo em Decimal: `or 0` devolveria int e 0 / 100 vira float (Decimal * float dá TypeError)
+        porcentagem = self.produto.porcentagem_comissao or Decimal('0')
+        # Arredonda como o banco grava, para os totais mantidos na Venda baterem com os itens
+        self.comissao_valor = ((self.preco_unitario * self.quantidade) * (Decimal(porcentagem) / Decimal(100))).quantize(Decimal('0.01'))
+
+    def save(self, *args, **kwargs):
+        self.calcular_comissao()
         super().save(*args, **kwargs)
+        self.venda.recalcular_totais()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        self.venda.recalcular_totais()
+        return resultado
 
     @property
     def subtotal(self):
         return self.quantidade * self.preco_unitario
 
+class ResumoVendasDia(models.Model):
+    # Totais de vendas fechadas por loja e por dia, atualizados ao fechar/cancelar.
+    # O dashboard e os relatórios leem daqui em vez de somar a tabela de vendas.
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='resumos_vendas')
+    dia = models.DateField()
+    receita = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    qtd_vendas = models.IntegerField(default=0)
+    itens_vendidos = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'dia'], name='core_resumo_vendas_dia_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.empresa} - {self.dia:%d/%m/%Y}: R$ {self.receita}"
+
+    @classmethod
+    def acumular(cls, empresa_id, movimentos, vendas=1):
+        # movimentos: [(data_venda, valor, itens)]. Soma com F() no banco, agrupado por dia
+        # local, então fechamentos simultâneos na mesma loja não se perdem.
+        por_dia = {}
+        for data_venda, valor, itens in movimentos:
+            dia = timezone.localdate(data_venda)
+            receita, qtd, qtd_itens = por_dia.get(dia, (0, 0, 0))
+            por_dia[dia] = (receita + valor, qtd + vendas, qtd_itens + itens)
+
+        for dia, (receita, qtd, qtd_itens) in por_dia.items():
+            cls.objects.get_or_create(empresa_id=empresa_id, dia=dia)
+            cls.objects.filter(empresa_id=empresa_id, dia=dia).update(
+                receita=F('receita') + receita, qtd_vendas=F('qtd_vendas') + qtd, itens_vendidos=F('itens_vendidos') + qtd_itens
+            )
+
+    @classmethod
+    def reconstruir(cls, empresa_id=None):
+        # Refaz o resumo a partir das vendas fechadas (GROUP BY no banco).
+        # Usado na migração inicial e pelo comando recalcular_resumo_vendas.
+        vendas = Venda.objects.filter(status='FECHADA')
+        resumos = cls.objects.all()
+        if empresa_id:
+            vendas = vendas.filter(empresa_id=empresa_id)
+            resumos = resumos.filter(empresa_id=empresa_id)
+        totais = (
+            vendas.annotate(dia=TruncDate('data_venda', tzinfo=timezone.get_current_timezone()))
+            .values('empresa_id', 'dia')
+            .annotate(receita=Sum('valor_total'), qtd_vendas=Count('id'), itens_vendidos=Sum('qtd_itens'))
+            .order_by()
+        )
+        with transaction.atomic():
+            resumos.delete()
+            cls.objects.bulk_create((cls(**linha) for linha in totais.iterator()), batch_size=1000)
+
+class FechamentoComissao(ModeloDoTenant):
+    # Comissão de cada vendedor em um mês já fechado (comando fechar_comissoes).
+    # Meses fechados são lidos daqui; só o período em aberto soma os itens vendidos.
+    vendedor = models.ForeignKey(Usuario, on_delete=models.PROTECT, related_name='fechamentos_comissao')
+    competencia = models.DateField(help_text="Primeiro dia do mês fechado")
+    total_vendido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_comissao = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    qtd_itens = models.IntegerField(default=0)
+    data_fechamento = models.DateTimeField(auto_now=True)
+
+    class Meta(ModeloDoTenant.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['empresa', 'competencia', 'vendedor'], name='core_fech_comissao_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendedor} - {self.competencia:%m/%Y}: R$ {self.total_comissao}"
+
+    @staticmethod
+    def intervalo_do_mes(competencia):
+        # [primeiro instante do mês, primeiro instante do mês seguinte) no fuso da loja
+        inicio = timezone.make_aware(datetime(competencia.year, competencia.month, 1))
+        seguinte = (competencia.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return inicio, timezone.make_aware(datetime(seguinte.year, seguinte.month, 1))
+
+    @staticmethod
+    def itens_do_periodo(empresa_id, inicio, fim, vendedor_id=None):
+        itens = ItemVenda.objects.filter(
+            venda__empresa_id=empresa_id, venda__status='FECHADA',
+            venda__data_venda__gte=inicio, venda__data_venda__lt=fim,
+        )
+        if vendedor_id:
+            itens = itens.filter(venda__vendedor_id=vendedor_id)
+        return itens
+
+    @staticmethod
+    def somar_itens(itens):
+        subtotal = ExpressionWrapper(F('quantidade') * F('preco_unitario'), output_field=models.DecimalField(max_digits=14, decimal_places=2))
+        return itens.aggregate(
+            total_vendido=Coalesce(Sum(subtotal), Value(Decimal('0.00'))),
+            total_comissao=Coalesce(Sum('comissao_valor'), Value(Decimal('0.00'))),
+            qtd_itens=Coalesce(Sum('quantidade'), Value(0)),
+        )
+
+    @classmethod
+    def fechar_mes(cls, empresa_id, competencia):
+        # Grava (ou refaz) o fechamento do mês para todos os vendedores da loja
+        competencia = competencia.replace(day=1)
+        inicio, fim = cls.intervalo_do_mes(competencia)
+        subtotal = ExpressionWrapper(F('quantidade') * F('preco_unitario'), output_field=models.DecimalField(max_digits=14, decimal_places=2))
+        por_vendedor = (
+            cls.itens_do_periodo(empresa_id, inicio, fim)
+            .values('venda__vendedor_id')
+            .annotate(total_vendido=Sum(subtotal), total_comissao=Sum('comissao_valor'), qtd_itens=Sum('quantidade'))
+            .order_by()
+        )
+        with transaction.atomic():
+            cls.objects.filter(empresa_id=empresa_id, competencia=competencia).delete()
+            fechamentos = cls.objects.bulk_create([
+                cls(
+                    empresa_id=empresa_id, competencia=competencia, vendedor_id=linha['venda__vendedor_id'],
+                    total_vendido=linha['total_vendido'], total_comissao=linha['total_comissao'], qtd_itens=linha['qtd_itens'],
+                ) for linha in por_vendedor
+            ])
+        return len(fechamentos)
+
+    @classmethod
+    def refazer_meses_fechados(cls, empresa_id, datas):
+        # Venda cancelada ou sincronizada do offline com data num mês já fechado: o fechamento
+        # daquele mês ficou velho e é refeito aqui (meses sem fechamento não custam nada além de uma query)
+        competencias = {timezone.localdate(data).replace(day=1) for data in datas}
+        fechadas = set(cls.objects.filter(empresa_id=empresa_id, competencia__in=competencias).values_list('competencia', flat=True))
+        for competencia in fechadas:
+            cls.fechar_mes(empresa_id, competencia)
+
+    @classmethod
+    def totais(cls, empresa_id, inicio, fim, vendedor_id=None):
+        # Totais de [inicio, fim): meses inteiros já fechados vêm dos fechamentos,
+        # o resto (normalmente só o mês corrente) é agregado no banco a partir dos itens.
+        meses_fechados = []
+        for competencia in (
+            cls.objects.filter(empresa_id=empresa_id, competencia__gte=timezone.localdate(inicio), competencia__lt=timezone.localdate(fim))
+            .values_list('competencia', flat=True).distinct().order_by()
+        ):
+            mes_inicio, mes_fim = cls.intervalo_do_mes(competencia)
+            if mes_inicio >= inicio and mes_fim <= fim:
+                meses_fechados.append((mes_inicio, mes_fim))
+
+        itens = cls.itens_do_periodo(empresa_id, inicio, fim, vendedor_id)
+        if not meses_fechados:
+            return cls.somar_itens(itens)
+
+        fora_dos_fechados = Q()
+        for mes_inicio, mes_fim in meses_fechados:
+            fora_dos_fechados &= ~Q(venda__data_venda__gte=mes_inicio, venda__data_venda__lt=mes_fim)
+        totais = cls.somar_itens(itens.filter(fora_dos_fechados))
+
+        fechados = cls.objects.filter(empresa_id=empresa_id, competencia__in=[timezone.localdate(i) for i, _ in meses_fechados])
+        if vendedor_id:
+            fechados = fechados.filter(vendedor_id=vendedor_id)
+        for campo, valor in fechados.aggregate(
+            total_vendido=Sum('total_vendido'), total_comissao=Sum('total_comissao'), qtd_itens=Sum('qtd_itens')
+        ).items():
+            totais[campo] += valor or 0
+        return totais
+
+class EmissaoFiscal(ModeloDoTenant):
+    # Fila persistente de emissão de NFC-e, consumida pelo worker fiscal
+    STATUS_CHOICES = (
+        ('PENDENTE', 'Na fila'),
+        ('PROCESSANDO', 'Enviando'),
+        ('EMITIDA', 'Emitida'),
+        ('ERRO', 'Falhou'),
+        ('CANCELADA', 'Venda cancelada'),
+    )
+    venda = models.OneToOneField(Venda, on_delete=models.CASCADE, related_name='emissao_fiscal')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    tentativas = models.IntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    ultimo_erro = models.TextField(blank=True, null=True)
+    data_criacao = models.DateTimeField(auto_now_add=True)
+    data_emissao = models.DateTimeField(null=True, blank=True)
+
+    class Meta(ModeloDoTenant.Meta):
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa'], name='core_emissao_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"NFC-e da Venda #{self.venda_id} ({self.get_status_display()})"
+
+    @property
+    def referencia(self):
+        # Chave de idempotência enviada ao provedor: a mesma em todas as tentativas desta venda
+        return f"{self.empresa_id}-{self.venda_id}"
+
 # =========================================================
 #  8. FINANCEIRO
 # =========================================================
@@ -269,9 +1006,83 @@ class Lancamento(ModeloDoTenant):
     
     def __str__(self):
         return f"{self.titulo} - {self.valor}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        lancamento = super().from_db(db, field_names, values)
+        # Lembra as datas como estavam no banco: mudar o vencimento/pagamento de um mês
+        # para outro precisa invalidar os relatórios dos dois meses
+        if 'data_vencimento' in field_names and 'data_pagamento' in field_names:
+            lancamento._datas_originais = [lancamento.data_vencimento, lancamento.data_pagamento]
+        return lancamento
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidar_relatorios(self.empresa_id, [self.data_vencimento, self.data_pagamento] + getattr(self, '_datas_originais', []))
+        self._datas_originais = [self.data_vencimento, self.data_pagamento]
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        invalidar_relatorios(self.empresa_id, [self.data_vencimento, self.data_pagamento] + getattr(self, '_datas_originais', []))
+        return resultado
     
-    class Meta:
+    class Meta(ModeloDoTenant.Meta):
         ordering = ['data_vencimento']
+        # Extrato do financeiro: paginação por (data_vencimento, id) dentro da loja
+        indexes = [
+            models.Index(fields=['empresa', 'data_vencimento', 'id'], name='core_lanc_emp_venc_idx'),
+            # Contas a pagar/receber por tipo e situação (financeiro filtrado, projeção de caixa)
+            models.Index(fields=['empresa', 'tipo', 'pago', 'data_vencimento'], name='core_lanc_emp_tipo_pago_idx'),
+            # Relatório financeiro: só lançamentos pagos, por data de pagamento
+            models.Index(fields=['empresa', 'data_pagamento'], condition=Q(pago=True), name='core_lanc_pagos_idx'),
+        ]
+
+    @classmethod
+    def fluxo_projetado(cls, empresa_id, dias=90, por_semana=False):
+        # Saldo realizado (só o que foi pago) e previsto (pago + a pagar/receber) para os
+        # próximos `dias`, agrupado por dia ou semana no banco. Contas em atraso entram hoje.
+        hoje = timezone.localdate()
+        fim = hoje + timedelta(days=dias)
+        valor = Case(When(tipo='DESPESA', then=-F('valor')), default=F('valor'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        data_efetiva = Case(
+            When(pago=True, then=Coalesce('data_pagamento', 'data_vencimento')),
+            When(data_vencimento__lt=hoje, then=Value(hoje)),
+            default=F('data_vencimento'), output_field=models.DateField(),
+        )
+        lancamentos = cls.objects.filter(empresa_id=empresa_id).annotate(data_efetiva=data_efetiva)
+
+        saldo_inicial = lancamentos.filter(pago=True, data_efetiva__lt=hoje).aggregate(
+            total=Coalesce(Sum(valor), Value(Decimal('0.00')))
+        )['total']
+
+        balde = TruncWeek('data_efetiva', output_field=models.DateField()) if por_semana else F('data_efetiva')
+        por_periodo = {
+            linha['periodo']: linha
+            for linha in lancamentos.filter(data_efetiva__gte=hoje, data_efetiva__lt=fim)
+            .annotate(periodo=balde).values('periodo')
+            .annotate(
+                realizado=Coalesce(Sum(valor, filter=Q(pago=True)), Value(Decimal('0.00'))),
+                entradas=Coalesce(Sum('valor', filter=Q(tipo='RECEITA')), Value(Decimal('0.00'))),
+                saidas=Coalesce(Sum('valor', filter=Q(tipo='DESPESA')), Value(Decimal('0.00'))),
+            ).order_by()
+        }
+
+        # Acumula os períodos (no máximo 90 linhas) preenchendo os dias sem movimento
+        passo = 7 if por_semana else 1
+        periodo = hoje - timedelta(days=hoje.weekday()) if por_semana else hoje
+        saldo_realizado = saldo_previsto = saldo_inicial
+        fluxo = []
+        while periodo < fim:
+            linha = por_periodo.get(periodo, {})
+            entradas, saidas = linha.get('entradas', 0), linha.get('saidas', 0)
+            saldo_realizado += linha.get('realizado', 0)
+            saldo_previsto += entradas - saidas
+            fluxo.append({
+                'periodo': periodo, 'entradas': entradas, 'saidas': saidas,
+                'saldo_realizado': saldo_realizado, 'saldo_previsto': saldo_previsto,
+            })
+            periodo += timedelta(days=passo)
+        return saldo_inicial, fluxo
 
 # =========================================================
 #  9. SUPORTE E AJUSTES
@@ -0,0 +1,91 @@
+# =========================================================
+#  PAGINAÇÃO POR CURSOR (KEYSET)
+#  As listas não usam OFFSET: o link "próxima página" leva os valores da
+#  ordenação do último item (?apos=...) e a consulta continua a partir dele
+#  pelo índice (empresa, <campo da ordenação>, id). A página 200 custa o
+#  mesmo que a primeira, e não há COUNT(*) da tabela inteira.
+# =========================================================
+import base64
+import binascii
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+POR_PAGINA = 50
+
+
+def _valor_json(valor):
+    # Datas com isoformat completo: o DjangoJSONEncoder corta os microssegundos e o cursor pularia linhas
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Valor de cursor não suportado: {type(valor).__name__}")
+
+
+def codificar_cursor(valores):
+    texto = json.dumps(valores, default=_valor_json, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, quantidade):
+    # Lista com os valores do cursor, ou None se estiver vazio/adulterado (volta para a primeira página)
+    if not cursor:
+        return None
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(valores, list) or len(valores) != quantidade or None in valores:
+        return None
+    return valores
+
+
+def converter_cursor(model, ordem, valores):
+    # Converte cada valor para o tipo do campo da ordenação. Um cursor adulterado
+    # (texto onde era número, data inválida) vira None e a lista volta para a primeira página.
+    try:
+        return [model._meta.get_field(campo.lstrip('-')).to_python(valor) for campo, valor in zip(ordem, valores)]
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+def filtro_apos(ordem, valores):
+    # Linhas que vêm depois do cursor na ordenação. Para ('nome', 'id'):
+    # nome > x OR (nome = x AND id > y). Campo com '-' na frente é decrescente.
+    filtro = Q()
+    for posicao, campo in enumerate(ordem):
+        condicao = Q(**{f"{campo.lstrip('-')}__{'lt' if campo.startswith('-') else 'gt'}": valores[posicao]})
+        for anterior, valor in zip(ordem[:posicao], valores[:posicao]):
+            condicao &= Q(**{anterior.lstrip('-'): valor})
+        filtro |= condicao
+    return filtro
+
+
+def paginar_por_cursor(request, queryset, ordem, por_pagina=POR_PAGINA):
+    # `ordem` precisa terminar num campo único (id) e não ter campos que aceitem NULL
+    valores = decodificar_cursor(request.GET.get('apos', ''), len(ordem))
+    if valores:
+        valores = converter_cursor(queryset.model, ordem, valores)
+    if valores:
+        queryset = queryset.filter(filtro_apos(ordem, valores))
+    itens = list(queryset.order_by(*ordem)[:por_pagina + 1])
+
+    proxima = None
+    if len(itens) > por_pagina:
+        itens = itens[:por_pagina]
+        parametros = request.GET.copy()
+        parametros['apos'] = codificar_cursor([getattr(itens[-1], campo.lstrip('-')) for campo in ordem])
+        proxima = parametros.urlencode()
+
+    filtros = request.GET.copy()
+    filtros.pop('apos', None)
+    return {
+        'itens': itens,
+        'proxima_pagina': proxima,
+        'primeira_pagina': bool(valores),
+        'filtros': filtros.urlencode(),
+    }
@@ -0,0 +1,135 @@
+# =========================================================
+#  GERAÇÃO DE PDF (ORÇAMENTO, CONTRATO)
+#  O WeasyPrint roda em processos separados que ficam abertos: a importação
+#  da biblioteca, a configuração de fontes e o CSS de cada documento são
+#  preparados uma vez por processo, não a cada PDF. O PDF pronto é guardado
+#  em media/pdfs/ com o nome igual ao hash do HTML + CSS; enquanto itens,
+#  totais e dados da loja não mudam, o arquivo é servido direto, sem renderizar.
+# =========================================================
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+#  DENTRO DOS PROCESSOS DE RENDERIZAÇÃO
+#  (nada de Django aqui: só recebem texto e devolvem bytes)
+# ---------------------------------------------------------
+_fontes = None
+_folhas = {}
+
+
+def preparar_processo():
+    # Roda uma vez quando o processo sobe: importa o WeasyPrint e faz um PDF mínimo
+    # para deixar fontes e layout carregados antes do primeiro documento de verdade
+    global _fontes
+    from weasyprint import HTML
+    from weasyprint.text.fonts import FontConfiguration
+    _fontes = FontConfiguration()
+    HTML(string='<p>.</p>').write_pdf(font_config=_fontes)
+
+
+def _folha(css):
+    from weasyprint import CSS
+    chave = hashlib.sha256(css.encode('utf-8')).hexdigest()
+    if chave not in _folhas:
+        _folhas[chave] = CSS(string=css, font_config=_fontes)
+    return _folhas[chave]
+
+
+def renderizar(html, css):
+    from weasyprint import HTML
+    if _fontes is None:
+        preparar_processo()
+    return HTML(string=html).write_pdf(stylesheets=[_folha(css)], font_config=_fontes)
+
+
+# ---------------------------------------------------------
+#  NO PROCESSO DO DJANGO
+# ---------------------------------------------------------
+_pool = None
+
+
+def obter_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_PROCESSOS, initializer=preparar_processo)
+    return _pool
+
+
+def caminho_pdf(hash_conteudo):
+    return f"pdfs/{hash_conteudo[:2]}/{hash_conteudo}.pdf"
+
+
+def guardar(caminho, conteudo):
+    if default_storage.exists(caminho):
+        return
+    salvo = default_storage.save(caminho, ContentFile(conteudo))
+    if salvo != caminho:
+        default_storage.delete(salvo)  # Outro request guardou o mesmo PDF ao mesmo tempo
+
+
+def _guardar_quando_terminar(caminho):
+    def guardar_resultado(futuro):
+        if futuro.exception() is None:
+            guardar(caminho, futuro.result())
+        else:
+            logger.warning("pdf_falhou caminho=%s erro=%s", caminho, futuro.exception())
+    return guardar_resultado
+
+
+def obter_pdf(html, css):
+    # Devolve (hash, caminho no storage) do PDF, renderizando só se ainda não existir.
+    # Levanta TimeoutError se passar de PDF_TIMEOUT_SEGUNDOS (o PDF continua sendo gerado e é guardado).
+    global _pool
+    hash_conteudo = hashlib.sha256(f'{css}\n{html}'.encode('utf-8')).hexdigest()
+    caminho = caminho_pdf(hash_conteudo)
+    if default_storage.exists(caminho):
+        return hash_conteudo, caminho
+
+    if settings.PDF_PROCESSOS <= 0:
+        guardar(caminho, renderizar(html, css))
+        return hash_conteudo, caminho
+    try:
+        futuro = obter_pool().submit(renderizar, html, css)
+        try:
+            conteudo = futuro.result(timeout=settings.PDF_TIMEOUT_SEGUNDOS)
+        except TimeoutError:
+            futuro.add_done_callback(_guardar_quando_terminar(caminho))
+            raise
+    except BrokenProcessPool:
+        # Um processo morreu (memória, kill): renderiza aqui e o pool é recriado no próximo PDF
+        _pool = None
+        conteudo = renderizar(html, css)
+    guardar(caminho, conteudo)
+    return hash_conteudo, caminho
+
+
+def resposta_pdf(request, template, contexto, nome_arquivo):
+    # template sem extensão: usa <template>.html e a folha de estilo <template>.css
+    html = render_to_string(f'{template}.html', contexto)
+    css = render_to_string(f'{template}.css')
+    try:
+        hash_conteudo, caminho = obter_pdf(html, css)
+    except TimeoutError:
+        resposta = HttpResponse("O PDF ainda está sendo gerado. Tente de novo em alguns segundos.", status=503)
+        resposta['Retry-After'] = '5'
+        return resposta
+
+    etag = f'"{hash_conteudo}"'
+    if request.headers.get('If-None-Match') == etag:
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = FileResponse(default_storage.open(caminho, 'rb'), content_type='application/pdf')
+        resposta['Content-Disposition'] = f'inline; filename="{nome_arquivo}"'
+    resposta['ETag'] = etag
+    resposta['Cache-Control'] = 'private, no-cache'
+    return resposta
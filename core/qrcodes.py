@@ -0,0 +1,48 @@
+# =========================================================
+#  QR CODE DOS PRODUTOS
+#  O QR não é mais gerado no Produto.save: a imagem é criada na primeira vez
+#  que alguém pede (catálogo, etiqueta) e guardada em media/qrcodes/ com o
+#  nome igual ao hash do conteúdo. Mesmo conteúdo = mesmo arquivo, reaproveitado
+#  por todos os processos; mudou nome ou preço, muda o hash e sai uma imagem nova.
+# =========================================================
+import hashlib
+from io import BytesIO
+
+import qrcode
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+def conteudo_qr(produto):
+    return f"ID:{produto.id}|{produto.nome}|R$ {produto.preco_venda}"
+
+
+def hash_qr(conteudo):
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:32]
+
+
+def caminho_qr(hash_conteudo):
+    # Subpasta pelos 2 primeiros caracteres para não juntar milhares de arquivos numa pasta só
+    return f"qrcodes/{hash_conteudo[:2]}/{hash_conteudo}.png"
+
+
+def gerar_png(conteudo):
+    qr = qrcode.QRCode(version=1, box_size=10, border=2)
+    qr.add_data(conteudo)
+    qr.make(fit=True)
+    buffer = BytesIO()
+    qr.make_image(fill='black', back_color='white').save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def obter_qrcode(produto):
+    # Devolve (hash, caminho no storage), gerando a imagem só se ela ainda não existir
+    conteudo = conteudo_qr(produto)
+    hash_conteudo = hash_qr(conteudo)
+    caminho = caminho_qr(hash_conteudo)
+    if not default_storage.exists(caminho):
+        salvo = default_storage.save(caminho, ContentFile(gerar_png(conteudo)))
+        if salvo != caminho:
+            # Outro processo gravou o mesmo QR ao mesmo tempo; o storage renomeou a cópia
+            default_storage.delete(salvo)
+    return hash_conteudo, caminho
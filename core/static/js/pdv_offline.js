@@ -0,0 +1,227 @@
+// =========================================================
+//  PDV OFFLINE
+//  Catálogo e preços ficam no navegador; cada venda finalizada entra numa
+//  fila local (com uuid próprio) que é enviada ao servidor quando a
+//  internet volta. O servidor ignora uuids que já recebeu.
+// =========================================================
+(function() {
+    var CHAVE_CATALOGO = 'nexum_catalogo';
+    var CHAVE_ETAG = 'nexum_catalogo_etag';
+    var CHAVE_FILA = 'nexum_fila_vendas';
+
+    var tela = document.getElementById('pdvOffline');
+    var urlCatalogo = tela.dataset.urlCatalogo;
+    var urlSincronizar = tela.dataset.urlSincronizar;
+
+    var busca = document.getElementById('buscaOffline');
+    var qtd = document.getElementById('qtdOffline');
+    var resultados = document.getElementById('resultadosOffline');
+    var forma = document.getElementById('formaOffline');
+
+    var catalogo = JSON.parse(localStorage.getItem(CHAVE_CATALOGO) || '{"produtos": [], "formas_pagamento": []}');
+    var porId = {};
+    var porCodigo = {};
+    var carrinho = [];
+    var sincronizando = false;
+
+    // --- CATÁLOGO LOCAL ---
+    // Cada produto vem como [id, nome, codigo_barras, preco_venda, tamanho, cor]
+    function indexarCatalogo() {
+        porId = {};
+        porCodigo = {};
+        catalogo.produtos.forEach(function(p) {
+            porId[p[0]] = p;
+            if (p[2]) porCodigo[p[2]] = p;
+        });
+        forma.innerHTML = '';
+        catalogo.formas_pagamento.forEach(function(fp) {
+            var opcao = document.createElement('option');
+            opcao.value = fp.id;
+            opcao.textContent = fp.nome;
+            forma.appendChild(opcao);
+        });
+    }
+
+    function atualizarCatalogo() {
+        var etag = localStorage.getItem(CHAVE_ETAG);
+        return fetch(urlCatalogo, {credentials: 'same-origin', headers: etag ? {'If-None-Match': etag} : {}})
+            .then(function(r) {
+                if (r.status !== 200) return;
+                localStorage.setItem(CHAVE_ETAG, r.headers.get('ETag') || '');
+                return r.json().then(function(dados) {
+                    catalogo = dados;
+                    localStorage.setItem(CHAVE_CATALOGO, JSON.stringify(dados));
+                    indexarCatalogo();
+                });
+            })
+            .catch(function() {});
+    }
+
+    // --- FILA DE VENDAS ---
+    function lerFila() { return JSON.parse(localStorage.getItem(CHAVE_FILA) || '[]'); }
+
+    function salvarFila(fila) {
+        localStorage.setItem(CHAVE_FILA, JSON.stringify(fila));
+        document.getElementById('qtdFila').textContent = fila.length;
+    }
+
+    function novoUuid() {
+        if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function(c) {
+            var r = Math.random() * 16 | 0;
+            return (c === 'x' ? r : (r & 0x3 | 0x8)).toString(16);
+        });
+    }
+
+    function csrfToken() {
+        var achado = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return achado ? decodeURIComponent(achado[1]) : '';
+    }
+
+    function sincronizar() {
+        var fila = lerFila();
+        if (sincronizando || fila.length === 0) return;
+        sincronizando = true;
+        fetch(urlSincronizar, {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': csrfToken()},
+            body: JSON.stringify({vendas: fila})
+        })
+            .then(function(r) { return r.json(); })
+            .then(function(dados) {
+                // Recebidas e duplicadas já estão no servidor; rejeitadas (cada uma com o motivo) não adianta reenviar
+                var resolvidas = {};
+                (dados.recebidas || []).concat(dados.duplicadas || []).forEach(function(u) { resolvidas[u] = true; });
+                (dados.rejeitadas || []).forEach(function(r) {
+                    resolvidas[r.uuid] = true;
+                    console.warn('Venda offline rejeitada', r);
+                });
+                salvarFila(lerFila().filter(function(v) { return !resolvidas[v.uuid]; }));
+            })
+            .catch(function() {})
+            .finally(function() { sincronizando = false; });
+    }
+
+    function pedirSincronizacao() {
+        if ('serviceWorker' in navigator && 'SyncManager' in window) {
+            navigator.serviceWorker.ready
+                .then(function(reg) { return reg.sync.register('sincronizar-vendas'); })
+                .catch(function() {});
+        }
+        sincronizar();
+    }
+
+    // --- CARRINHO ---
+    function renderizarCarrinho() {
+        var corpo = document.getElementById('itensOffline');
+        var total = 0;
+        corpo.innerHTML = '';
+        carrinho.forEach(function(item, i) {
+            var subtotal = item.quantidade * parseFloat(item.preco_unitario);
+            total += subtotal;
+            var linha = document.createElement('tr');
+            [i + 1, item.nome, item.quantidade, item.preco_unitario, subtotal.toFixed(2)].forEach(function(valor, col) {
+                var celula = document.createElement('td');
+                celula.textContent = valor;
+                if (col === 1) celula.className = 'fw-bold';
+                if (col === 2) celula.className = 'text-center';
+                if (col > 2) celula.className = 'text-end';
+                linha.appendChild(celula);
+            });
+            corpo.appendChild(linha);
+        });
+        if (carrinho.length === 0) {
+            corpo.innerHTML = '<tr><td colspan="5" class="text-center py-5 text-muted"><h3>CAIXA LIVRE</h3>Aguardando produtos...</td></tr>';
+        }
+        document.getElementById('totalOffline').textContent = total.toFixed(2);
+    }
+
+    function lancar(produto) {
+        var quantidade = parseInt(qtd.value, 10) || 1;
+        var existente = carrinho.find(function(item) { return item.produto === produto[0]; });
+        if (existente) {
+            existente.quantidade += quantidade;
+        } else {
+            carrinho.push({produto: produto[0], nome: produto[1], quantidade: quantidade, preco_unitario: produto[3]});
+        }
+        busca.value = '';
+        qtd.value = 1;
+        resultados.innerHTML = '';
+        renderizarCarrinho();
+        busca.focus();
+    }
+
+    function finalizar() {
+        if (carrinho.length === 0) return;
+        var fila = lerFila();
+        fila.push({
+            uuid: novoUuid(),
+            data: new Date().toISOString(),
+            forma_pagamento: forma.value ? parseInt(forma.value, 10) : null,
+            itens: carrinho.map(function(item) {
+                // O servidor cobra o preço do cadastro; o preço aqui é só para mostrar no carrinho
+                return {produto: item.produto, quantidade: item.quantidade};
+            })
+        });
+        salvarFila(fila);
+        carrinho = [];
+        renderizarCarrinho();
+        pedirSincronizacao();
+    }
+
+    busca.addEventListener('input', function() {
+        var termo = busca.value.trim().toLowerCase();
+        resultados.innerHTML = '';
+        if (termo.length < 2) return;
+        var achados = catalogo.produtos.filter(function(p) { return p[1].toLowerCase().indexOf(termo) !== -1; }).slice(0, 15);
+        achados.forEach(function(p) {
+            var item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            item.textContent = p[1] + (p[4] ? ' ' + p[4] : '') + ' (R$ ' + p[3] + ')';
+            item.addEventListener('click', function() { lancar(p); });
+            resultados.appendChild(item);
+        });
+    });
+
+    document.getElementById('formOffline').addEventListener('submit', function(e) {
+        e.preventDefault();
+        var produto = porCodigo[busca.value.trim()];
+        if (produto) {
+            lancar(produto);
+        } else if (busca.value.trim()) {
+            alert('Produto não encontrado no catálogo local.');
+        }
+    });
+
+    document.getElementById('btnFinalizar').addEventListener('click', finalizar);
+    document.getElementById('btnLimpar').addEventListener('click', function() { carrinho = []; renderizarCarrinho(); });
+    document.getElementById('btnSincronizar').addEventListener('click', function() { atualizarCatalogo(); sincronizar(); });
+    document.addEventListener('keydown', function(e) {
+        if (e.key === 'F2') { e.preventDefault(); finalizar(); }
+        if (e.key === 'F1') { e.preventDefault(); busca.focus(); }
+    });
+
+    // --- CONEXÃO ---
+    function mostrarConexao() {
+        var status = document.getElementById('statusConexao');
+        status.textContent = navigator.onLine ? 'Online' : 'Offline - vendas ficam guardadas neste aparelho';
+        status.className = 'badge ' + (navigator.onLine ? 'bg-success' : 'bg-danger');
+    }
+
+    window.addEventListener('online', function() { mostrarConexao(); atualizarCatalogo(); sincronizar(); });
+    window.addEventListener('offline', mostrarConexao);
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.addEventListener('message', function(e) {
+            if (e.data === 'sincronizar-vendas') sincronizar();
+        });
+    }
+    setInterval(sincronizar, 30000);
+
+    indexarCatalogo();
+    renderizarCarrinho();
+    salvarFila(lerFila());
+    mostrarConexao();
+    atualizarCatalogo().then(sincronizar);
+})();
@@ -1,21 +1,77 @@
-const CACHE_NAME = 'nexum-v1';
+{% load static %}const CACHE_NAME = 'nexum-v2';
+const PDV_OFFLINE = "{% url 'pdv_offline' %}";
 const urlsToCache = [
   '/',
-  '/static/css/styles.css',
-  '/static/icons/icon-192.png'
+  "{% static 'css/styles.css' %}",
+  "{% static 'js/pdv_offline.js' %}",
+  'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+  'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+  'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css'
 ];
 
+// Guarda a tela do PDV offline só se o usuário estiver logado (sem redirecionamento para o login)
+function guardarPdvOffline(cache) {
+  return fetch(PDV_OFFLINE, {credentials: 'same-origin'})
+    .then(response => {
+      if (response.ok && !response.redirected) {
+        return cache.put(PDV_OFFLINE, response);
+      }
+    })
+    .catch(() => {});
+}
+
 self.addEventListener('install', event => {
   event.waitUntil(
     caches.open(CACHE_NAME)
-      .then(cache => cache.addAll(urlsToCache))
+      .then(cache => Promise.all([
+        Promise.all(urlsToCache.map(url => cache.add(url).catch(() => {}))),
+        guardarPdvOffline(cache)
+      ]))
+      .then(() => self.skipWaiting())
+  );
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil(
+    caches.keys()
+      .then(nomes => Promise.all(nomes.filter(nome => nome !== CACHE_NAME).map(nome => caches.delete(nome))))
+      .then(() => self.clients.claim())
   );
 });
 
 self.addEventListener('fetch', event => {
+  // POSTs (vendas, sincronização) nunca passam pelo cache
+  if (event.request.method !== 'GET') {
+    return;
+  }
+  const url = new URL(event.request.url);
+
   event.respondWith(
-    fetch(event.request).catch(() => {
-      return caches.match(event.request);
-    })
+    fetch(event.request)
+      .then(response => {
+        if (url.pathname === PDV_OFFLINE && response.ok && !response.redirected) {
+          const copia = response.clone();
+          caches.open(CACHE_NAME).then(cache => cache.put(PDV_OFFLINE, copia));
+        }
+        return response;
+      })
+      .catch(() => {
+        return caches.match(event.request).then(resposta => {
+          // Sem internet no meio de uma venda: qualquer tela do PDV cai no modo offline
+          if (!resposta && event.request.mode === 'navigate' && url.pathname.startsWith('/pdv/')) {
+            return caches.match(PDV_OFFLINE);
+          }
+          return resposta;
+        });
+      })
   );
-});
\ No newline at end of file
+});
+
+// Background Sync: o navegador avisa quando a conexão voltou e a tela envia a fila de vendas
+self.addEventListener('sync', event => {
+  if (event.tag === 'sincronizar-vendas') {
+    event.waitUntil(
+      self.clients.matchAll().then(clientes => clientes.forEach(cliente => cliente.postMessage('sincronizar-vendas')))
+    );
+  }
+});
@@ -0,0 +1,11 @@
+from django import template
+
+from core.imagens import url_variante
+
+register = template.Library()
+
+
+@register.simple_tag
+def variante(arquivo, tamanho='mini'):
+    # {% variante produto.foto 'card' %} -> URL da versão reduzida (WebP) da imagem
+    return url_variante(arquivo, tamanho)
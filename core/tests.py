@@ -1,3 +1,504 @@
-from django.test import TestCase
+import base64
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from . import fiscal
+from .cache_relatorios import invalidar_relatorios, relatorio_em_cache
+from .importacao import importar_planilha
+from .models import (
+    Caixa, Cliente, EmissaoFiscal, Empresa, FechamentoComissao, FormaPagamento, ItemVenda, Lancamento,
+    MovimentoCaixa, Produto, ResumoVendasDia, Usuario, Venda,
+)
+from .paginacao import paginar_por_cursor
+
+
+def planilha(*linhas):
+    # .xlsx em memória: a primeira linha é o cabeçalho
+    livro = Workbook()
+    for linha in linhas:
+        livro.active.append(linha)
+    arquivo = BytesIO()
+    livro.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+
+class BaseLoja(TestCase):
+    # Uma loja com vendedor, caixa aberto, forma de pagamento e dois produtos
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Loja Teste', cnpj='00.000.000/0001-00', plano='PRO',
+            data_vencimento=timezone.localdate() + timedelta(days=30),
+        )
+        self.usuario = Usuario.objects.create_user(username='vendedor', password='senha', empresa=self.empresa, cargo='GERENTE')
+        caixa = Caixa.objects.create(empresa=self.empresa)
+        MovimentoCaixa.objects.create(empresa=self.empresa, caixa=caixa, operador=self.usuario, valor_abertura=0)
+        self.forma = FormaPagamento.objects.create(empresa=self.empresa, nome='Dinheiro')
+        self.camiseta = Produto.objects.create(
+            empresa=self.empresa, nome='Camiseta', codigo_barras='7891000000001', preco_venda=Decimal('50.00'),
+            porcentagem_comissao=Decimal('10'), estoque_atual=10, estoque_minimo=5,
+        )
+        # Produto sem comissão: `or 0` virava float e o cálculo quebrava com TypeError
+        self.meia = Produto.objects.create(
+            empresa=self.empresa, nome='Meia', codigo_barras='7891000000002', preco_venda=Decimal('12.50'),
+            porcentagem_comissao=Decimal('0'), estoque_atual=20, estoque_minimo=2,
+        )
+
+    def nova_venda(self, *linhas):
+        venda = Venda.objects.create(empresa=self.empresa, vendedor=self.usuario, status='ORCAMENTO')
+        venda.adicionar_itens([Venda.normalizar_linha(linha) for linha in linhas])
+        return venda
+
+    def fechar(self, venda):
+        with self.captureOnCommitCallbacks(execute=True):
+            return venda.fechar(self.forma.id)
+
+
+class ComandosBenchmarkTests(TestCase):
+    def test_gerar_dados_e_medir_telas(self):
+        saida = StringIO()
+        call_command(
+            'gerar_dados_teste', produtos=5, clientes=3, vendedores=1, dias=3, vendas_por_dia=2,
+            itens_por_venda=2, despesas_por_mes=2, ajustes=3, stdout=saida,
+        )
+        empresa = Empresa.objects.get()
+        self.assertTrue(Venda.objects.filter(empresa=empresa, status='FECHADA').exists())
+        self.assertTrue(ResumoVendasDia.objects.filter(empresa=empresa).exists())
+
+        # Todas as telas precisam responder 200, senão o comando para com CommandError
+        call_command('benchmark', empresa=empresa.id, repeticoes=1, stdout=saida)
+        self.assertIn('dashboard', saida.getvalue())
+
+
+class ImportacaoTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome_fantasia='Loja Teste', plano='PRO', data_vencimento=timezone.localdate() + timedelta(days=30),
+        )
+
+    def test_planilha_sem_coluna_codigo(self):
+        resultado = importar_planilha(self.empresa, planilha(('Nome', 'Venda', 'Estoque'), ('A', 10, 1), ('B', '12,50', 2)))
+        self.assertEqual((resultado['criados'], resultado['erros']), (2, []))
+        self.assertEqual(
+            list(Produto.objects.filter(empresa=self.empresa).order_by('nome').values_list('nome', 'codigo_barras')),
+            [('A', ''), ('B', '')],
+        )
+
+    def test_codigo_existente_e_linha_invalida(self):
+        Produto.objects.create(empresa=self.empresa, nome='Antigo', codigo_barras='789', preco_venda=5, estoque_atual=1)
+        resultado = importar_planilha(self.empresa, planilha(
+            ('Nome', 'Codigo', 'Venda', 'Estoque'),
+            ('Novo', 7891, 10, 3), ('Antigo', '789', 8, 9), ('', '555', 1, 1), ('Sem código', None, 2, 1),
+        ), atualizar_existentes=True)
+        self.assertEqual((resultado['criados'], resultado['atualizados']), (2, 1))
+        self.assertEqual(resultado['erros'], [(4, 'nome vazio')])
+        self.assertEqual(Produto.objects.get(codigo_barras='789').estoque_atual, 9)
+        self.assertEqual(Produto.objects.get(nome='Novo').codigo_barras, '7891')
+        self.assertEqual(Produto.objects.get(nome='Sem código').codigo_barras, '')
+
+
+class PaginacaoTests(BaseLoja):
+    def percorrer(self, queryset, ordem, por_pagina):
+        fabrica = RequestFactory()
+        request = fabrica.get('/')
+        vistos = []
+        while True:
+            pagina = paginar_por_cursor(request, queryset, ordem, por_pagina=por_pagina)
+            vistos += [item.id for item in pagina['itens']]
+            if not pagina['proxima_pagina']:
+                return vistos
+            request = fabrica.get('/?' + pagina['proxima_pagina'])
+
+    def test_cursor_percorre_nomes_repetidos_sem_pular_nem_repetir(self):
+        for i in range(23):
+            Cliente.objects.create(empresa=self.empresa, nome=f'Cliente {i % 4}')
+        clientes = Cliente.objects.filter(empresa=self.empresa)
+        esperado = list(clientes.order_by('nome', 'id').values_list('id', flat=True))
+        self.assertEqual(self.percorrer(clientes, ('nome', 'id'), 5), esperado)
+
+    def test_cursor_com_data_decrescente(self):
+        agora = timezone.now()
+        for i in range(12):
+            cliente = Cliente.objects.create(empresa=self.empresa, nome=f'Cliente {i}')
+            # Microssegundos diferentes e datas repetidas: o cursor precisa guardar a data completa
+            Cliente.objects.filter(pk=cliente.pk).update(data_cadastro=agora - timedelta(microseconds=(i // 2) * 7))
+        clientes = Cliente.objects.filter(empresa=self.empresa)
+        esperado = list(clientes.order_by('-data_cadastro', 'id').values_list('id', flat=True))
+        self.assertEqual(self.percorrer(clientes, ('-data_cadastro', 'id'), 5), esperado)
+
+    def test_cursor_adulterado_volta_para_a_primeira_pagina(self):
+        Cliente.objects.create(empresa=self.empresa, nome='Ana')
+        request = RequestFactory().get('/', {'apos': 'isso-nao-e-cursor'})
+        pagina = paginar_por_cursor(request, Cliente.objects.all(), ('nome', 'id'))
+        self.assertEqual(len(pagina['itens']), 1)
+        self.assertFalse(pagina['primeira_pagina'])
+
+    def test_cursor_com_valor_do_tipo_errado_volta_para_a_primeira_pagina(self):
+        cursor = base64.urlsafe_b64encode(b'["abc","x"]').decode().rstrip('=')
+        request = RequestFactory().get('/', {'apos': cursor})
+        pagina = paginar_por_cursor(request, Produto.objects.all(), ('preco_venda', 'id'))
+        self.assertEqual(len(pagina['itens']), 2)
+
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('lista_produtos'), {'ordem': 'preco', 'apos': cursor})
+        self.assertEqual(resposta.status_code, 200)
+
+
+class TotaisDaVendaTests(BaseLoja):
+    def test_adicionar_itens_soma_produto_repetido_e_comissao_zero(self):
+        venda = self.nova_venda(
+            {'produto': self.camiseta.id, 'quantidade': 2},
+            {'codigo': '7891000000002', 'quantidade': 3},
+            {'produto': self.camiseta.id, 'quantidade': 1},
+        )
+        venda.refresh_from_db()
+        self.assertEqual((venda.qtd_itens, venda.subtotal, venda.total_comissao), (6, Decimal('187.50'), Decimal('15.00')))
+        self.assertEqual(venda.itens.get(produto=self.camiseta).quantidade, 3)
+        self.assertEqual(venda.itens.get(produto=self.meia).comissao_valor, Decimal('0.00'))
+
+    def test_remover_item_desconta_dos_totais(self):
+        venda = self.nova_venda({'produto': self.camiseta.id, 'quantidade': 2}, {'produto': self.meia.id})
+        self.assertTrue(venda.remover_item(venda.itens.get(produto=self.camiseta).id))
+        self.assertFalse(venda.remover_item(999999))
+        venda.refresh_from_db()
+        self.assertEqual((venda.qtd_itens, venda.subtotal, venda.total_comissao), (1, Decimal('12.50'), Decimal('0.00')))
+
+    def test_venda_fechada_nao_aceita_itens_nem_remocao(self):
+        venda = self.nova_venda({'produto': self.meia.id})
+        self.fechar(venda)
+        self.assertIsNone(venda.adicionar_itens([Venda.normalizar_linha({'produto': self.meia.id})]))
+        self.assertIsNone(venda.remover_item(venda.itens.get().id))
+        self.assertEqual(venda.itens.get().quantidade, 1)
+
+    def test_trocar_cliente_no_pdv_preserva_totais(self):
+        venda = self.nova_venda({'produto': self.camiseta.id, 'quantidade': 2})
+        cliente = Cliente.objects.create(empresa=self.empresa, nome='Ana')
+        outra_loja = Empresa.objects.create(nome_fantasia='Outra', cnpj='11.111.111/0001-11')
+        de_fora = Cliente.objects.create(empresa=outra_loja, nome='Intruso')
+        self.client.force_login(self.usuario)
+        url = reverse('pdv', args=[venda.id])
+
+        # A instância carregada pela view não pode regravar totais antigos
+        self.client.post(url, {'cliente': cliente.id})
+        self.client.post(url, {'cliente': de_fora.id})
+        venda.refresh_from_db()
+        self.assertEqual((venda.cliente_id, venda.subtotal, venda.qtd_itens), (cliente.id, Decimal('100.00'), 2))
+
+
+class FilaFiscalTests(BaseLoja):
+    def venda_com_nota(self, empresa=None, vendedor=None):
+        venda = Venda.objects.create(empresa=empresa or self.empresa, vendedor=vendedor or self.usuario, status='ORCAMENTO')
+        produto = self.meia if empresa is None else Produto.objects.create(empresa=empresa, nome='Boné', preco_venda=Decimal('30.00'), estoque_atual=50)
+        venda.adicionar_itens([Venda.normalizar_linha({'produto': produto.id})])
+        with self.captureOnCommitCallbacks(execute=True):
+            venda.fechar(None, emitir_fiscal=True)
+        return venda
+
+    def test_loja_com_fila_grande_nao_segura_as_outras(self):
+        for _ in range(8):
+            self.venda_com_nota()
+        outra = Empresa.objects.create(nome_fantasia='Outra', cnpj='22.222.222/0001-22')
+        vendedor = Usuario.objects.create_user(username='outro', password='senha', empresa=outra)
+        EmissaoFiscal.objects.update(proxima_tentativa=timezone.now() - timedelta(minutes=5))
+        nota_da_outra = self.venda_com_nota(outra, vendedor).emissao_fiscal
+
+        with self.settings(FISCAL_CONCORRENCIA_POR_EMPRESA=2):
+            reservadas = fiscal.reservar_lote(5)
+        self.assertEqual(len(reservadas), 3)
+        self.assertIn(nota_da_outra.id, reservadas)
+        self.assertEqual(EmissaoFiscal.objects.filter(empresa=self.empresa, status='PROCESSANDO').count(), 2)
+
+    def test_venda_cancelada_depois_da_reserva_nao_emite(self):
+        venda = self.venda_com_nota()
+        emissao_id, = fiscal.reservar_lote(5)
+        with self.captureOnCommitCallbacks(execute=True):
+            venda.cancelar()
+        self.assertFalse(fiscal.processar(emissao_id))
+        self.assertEqual(EmissaoFiscal.objects.get(pk=emissao_id).status, 'CANCELADA')
+        self.assertFalse(Venda.objects.get(pk=venda.pk).nota_fiscal_emitida)
+
+    def test_emite_com_referencia_fixa(self):
+        venda = self.venda_com_nota()
+        self.assertEqual(fiscal.processar_fila(threads=1), 1)
+        emissao = EmissaoFiscal.objects.get(venda=venda)
+        self.assertEqual(emissao.status, 'EMITIDA')
+        self.assertTrue(Venda.objects.get(pk=venda.pk).nota_fiscal_url.endswith(emissao.referencia))
+
+
+class RelatoriosViewTests(BaseLoja):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.usuario)
+
+    def test_data_invalida_volta_para_o_mes_atual(self):
+        hoje = timezone.localdate()
+        resposta = self.client.get(reverse('relatorios'), {'tipo': 'vendas', 'data_ini': '2026-02-30', 'data_fim': 'ontem', 'formato': 'csv'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn(f'relatorio_vendas_{hoje.replace(day=1)}_{hoje}', resposta['Content-Disposition'])
+        b''.join(resposta.streaming_content)
+
+        resposta = self.client.get(reverse('relatorios'), {'tipo': 'financeiro', 'data_ini': '2026-02-30'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, f'value="{hoje.replace(day=1).isoformat()}"')
+
+
+class CacheRelatoriosTests(BaseLoja):
+    def setUp(self):
+        super().setUp()
+        self.calculos = 0
+        hoje = timezone.localdate()
+        self.fim = hoje.replace(day=1) - timedelta(days=1)  # Último dia do mês passado
+        self.inicio = self.fim.replace(day=1)
+
+    def relatorio(self):
+        def calcular(ini, fim):
+            self.calculos += 1
+            return {'total': 1}
+        return relatorio_em_cache(self.empresa.id, 'teste', self.inicio, self.fim, calcular, lambda partes: partes[0])
+
+    def test_mes_passado_fica_em_cache_ate_ser_invalidado(self):
+        self.relatorio()
+        self.relatorio()
+        self.assertEqual(self.calculos, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_relatorios(self.empresa.id, [self.fim])
+        self.relatorio()
+        self.assertEqual(self.calculos, 2)
+
+        # Hoje nunca está no histórico: não invalida nada
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_relatorios(self.empresa.id, [timezone.localdate()])
+        self.relatorio()
+        self.assertEqual(self.calculos, 2)
+
+    def test_lancamento_movido_invalida_o_mes_antigo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lancamento = Lancamento.objects.create(
+                empresa=self.empresa, titulo='Aluguel', tipo='DESPESA', valor=Decimal('900.00'), data_vencimento=self.fim,
+            )
+        self.relatorio()
+        lancamento = Lancamento.objects.get(pk=lancamento.pk)
+        lancamento.data_vencimento = timezone.localdate() + timedelta(days=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            lancamento.save()
+        self.relatorio()
+        self.assertEqual(self.calculos, 2)
+
+    def test_entrada_do_historico_tem_prazo(self):
+        with self.settings(RELATORIOS_CACHE_SEGUNDOS=120), mock.patch.object(cache, 'set', wraps=cache.set) as gravar:
+            self.relatorio()
+        self.assertEqual(gravar.call_args.args[2], 120)
+
+
+
+class FechamentoComissaoTests(BaseLoja):
+    def setUp(self):
+        super().setUp()
+        self.mes_passado = timezone.localdate().replace(day=1) - timedelta(days=20)
+        self.competencia = self.mes_passado.replace(day=1)
+
+    def vender_no_mes_passado(self, quantidade):
+        chave = str(uuid.uuid4())
+        with self.captureOnCommitCallbacks(execute=True):
+            Venda.sincronizar_offline(self.usuario, [{
+                'uuid': chave, 'data': f'{self.mes_passado.isoformat()}T12:00:00',
+                'itens': [{'produto': self.camiseta.id, 'quantidade': quantidade}],
+            }])
+        return Venda.objects.get(uuid_cliente=chave)
+
+    def comissao_fechada(self):
+        return FechamentoComissao.objects.get(empresa=self.empresa, competencia=self.competencia, vendedor=self.usuario).total_comissao
+
+    def test_venda_sincronizada_e_cancelamento_refazem_o_mes_fechado(self):
+        primeira = self.vender_no_mes_passado(1)
+        FechamentoComissao.fechar_mes(self.empresa.id, self.competencia)
+        self.assertEqual(self.comissao_fechada(), Decimal('5.00'))
+
+        self.vender_no_mes_passado(2)
+        self.assertEqual(self.comissao_fechada(), Decimal('15.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primeira.cancelar()
+        self.assertEqual(self.comissao_fechada(), Decimal('10.00'))
+
+
+class DashboardTests(BaseLoja):
+    def test_contador_de_estoque_baixo(self):
+        self.assertEqual(Produto.contar_estoque_baixo(self.empresa.id), 0)
+        venda = self.nova_venda({'produto': self.camiseta.id, 'quantidade': 6})
+        self.fechar(venda)
+        self.assertEqual(Produto.contar_estoque_baixo(self.empresa.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venda.cancelar()
+        self.assertEqual(Produto.contar_estoque_baixo(self.empresa.id), 0)
+
+        produto = Produto.objects.get(pk=self.meia.pk)
+        produto.estoque_atual = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            produto.save()
+        self.assertEqual(Produto.contar_estoque_baixo(self.empresa.id), 1)
+
+    def test_estoque_baixo_vem_do_contador_mantido(self):
+        self.client.force_login(self.usuario)
+        cache.set(f'estoque:baixo:{self.empresa.id}', 7)
+        resposta = self.client.get(reverse('dashboard'))
+        self.assertEqual(resposta.context['estoque_baixo_count'], 7)
+
+
+class FecharVendaTests(BaseLoja):
+    def test_fechar_duas_vezes_baixa_estoque_uma_vez(self):
+        venda = self.nova_venda({'produto': self.camiseta.id, 'quantidade': 2})
+        self.assertTrue(self.fechar(venda))
+        self.assertFalse(self.fechar(Venda.objects.get(pk=venda.pk)))
+
+        self.camiseta.refresh_from_db()
+        self.assertEqual(self.camiseta.estoque_atual, 8)
+        self.assertEqual(Lancamento.objects.filter(venda_origem=venda).count(), 1)
+        self.assertEqual(Venda.objects.get(pk=venda.pk).valor_total, Decimal('100.00'))
+
+    def test_cancelar_devolve_estoque_e_receita(self):
+        venda = self.nova_venda({'produto': self.camiseta.id, 'quantidade': 2}, {'produto': self.meia.id, 'quantidade': 4})
+        self.fechar(venda)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(venda.cancelar())
+        self.assertFalse(venda.cancelar())
+
+        self.camiseta.refresh_from_db()
+        self.meia.refresh_from_db()
+        self.assertEqual((self.camiseta.estoque_atual, self.meia.estoque_atual), (10, 20))
+        self.assertFalse(Lancamento.objects.filter(venda_origem=venda).exists())
+        self.assertEqual(Venda.objects.get(pk=venda.pk).status, 'CANCELADA')
+
+
+
+class ItensEmLoteTests(BaseLoja):
+    def test_adicionar_itens_devolve_nao_encontrados(self):
+        venda = Venda.objects.create(empresa=self.empresa, vendedor=self.usuario, status='ORCAMENTO')
+        nao_encontrados = venda.adicionar_itens([
+            Venda.normalizar_linha({'codigo': '000'}),
+            Venda.normalizar_linha({'produto': self.meia.id}),
+        ])
+        self.assertEqual(nao_encontrados, ['000'])
+        self.assertEqual(venda.itens.count(), 1)
+
+    def test_adicionar_itens_em_venda_fechada(self):
+        venda = self.nova_venda({'produto': self.meia.id})
+        self.fechar(venda)
+        self.assertIsNone(venda.adicionar_itens([Venda.normalizar_linha({'produto': self.meia.id})]))
+        self.assertEqual(venda.itens.get().quantidade, 1)
+
+    def test_normalizar_linha_recusa_linha_invalida(self):
+        for linha in ({}, {'produto': 'x'}, {'produto': 1, 'quantidade': 'dois'}, {'produto': 1, 'quantidade': -1},
+                      {'produto': 1, 'quantidade': Venda.QTD_MAXIMA_LINHA + 1}, ['produto']):
+            with self.subTest(linha=linha), self.assertRaises(ValueError):
+                Venda.normalizar_linha(linha)
+
+
+class AdicionarItensLoteViewTests(BaseLoja):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.usuario)
+        self.venda = Venda.objects.create(empresa=self.empresa, vendedor=self.usuario, status='ORCAMENTO')
+        self.url = reverse('adicionar_itens_lote', args=[self.venda.id])
+
+    def enviar(self, itens):
+        return self.client.post(self.url, json.dumps({'itens': itens}), content_type='application/json')
+
+    def test_linha_invalida_e_recusada_sozinha(self):
+        resposta = self.enviar([
+            {'codigo': '7891000000002', 'quantidade': 2},
+            {'produto': 'abc'},
+            {'produto': self.camiseta.id, 'quantidade': 'muitos'},
+            {'codigo': '999'},
+        ])
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+        self.assertEqual([i['linha'] for i in dados['invalidas']], [1, 2])
+        self.assertEqual(dados['nao_encontrados'], ['999'])
+        self.assertEqual((dados['qtd_itens'], dados['total']), (2, '25.00'))
+
+    def test_corpo_invalido(self):
+        resposta = self.client.post(self.url, 'não é json', content_type='application/json')
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_venda_fechada(self):
+        Venda.objects.filter(pk=self.venda.pk).update(status='FECHADA')
+        resposta = self.enviar([{'produto': self.meia.id}])
+        self.assertEqual(resposta.status_code, 409)
+        self.assertFalse(ItemVenda.objects.filter(venda=self.venda).exists())
+
+
+
+class SincronizarOfflineTests(BaseLoja):
+    def venda_offline(self, **dados):
+        venda = {
+            'uuid': str(uuid.uuid4()), 'data': '2026-01-15T10:30:00', 'forma_pagamento': self.forma.id,
+            'itens': [{'produto': self.camiseta.id, 'quantidade': 2, 'preco_unitario': '0.01'}],
+        }
+        venda.update(dados)
+        return venda
+
+    def sincronizar(self, vendas):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Venda.sincronizar_offline(self.usuario, vendas)
+
+    def test_reenvio_do_mesmo_uuid_nao_duplica(self):
+        venda = self.venda_offline()
+        self.assertEqual(self.sincronizar([venda, venda])['recebidas'], [venda['uuid']])
+        resultado = self.sincronizar([venda])
+        self.assertEqual((resultado['recebidas'], resultado['duplicadas']), ([], [venda['uuid']]))
+
+        self.assertEqual(Venda.objects.filter(uuid_cliente=venda['uuid']).count(), 1)
+        self.camiseta.refresh_from_db()
+        self.assertEqual(self.camiseta.estoque_atual, 8)
+
+    def test_preco_vem_do_cadastro(self):
+        venda = self.venda_offline(itens=[{'produto': self.meia.id, 'quantidade': 2, 'preco_unitario': '0.01'}])
+        self.sincronizar([venda])
+        gravada = Venda.objects.get(uuid_cliente=venda['uuid'])
+        self.assertEqual(gravada.valor_total, Decimal('25.00'))
+        self.assertEqual(gravada.itens.get().comissao_valor, Decimal('0.00'))
+        self.assertEqual(timezone.localdate(gravada.data_venda).isoformat(), '2026-01-15')
+
+    def test_venda_com_defeito_nao_derruba_o_lote(self):
+        boa = self.venda_offline()
+        quantidade_ruim = self.venda_offline(itens=[{'produto': self.camiseta.id, 'quantidade': 'x'}])
+        produto_de_fora = self.venda_offline(itens=[{'produto': 999999, 'quantidade': 1}])
+        resultado = self.sincronizar([quantidade_ruim, boa, {'uuid': 'abc'}, 'lixo', produto_de_fora])
+
+        self.assertEqual(resultado['recebidas'], [boa['uuid']])
+        self.assertCountEqual(
+            [r['uuid'] for r in resultado['rejeitadas']],
+            [quantidade_ruim['uuid'], produto_de_fora['uuid'], 'abc', None],
+        )
+        self.assertTrue(all(r['motivo'] for r in resultado['rejeitadas']))
+
+
+
+class ResumoVendasDiaTests(BaseLoja):
+    def test_resumo_do_dia_acumula_e_desconta_cancelamento(self):
+        primeira = self.nova_venda({'produto': self.camiseta.id, 'quantidade': 1})
+        segunda = self.nova_venda({'produto': self.meia.id, 'quantidade': 2})
+        self.fechar(primeira)
+        self.fechar(segunda)
+        resumo = ResumoVendasDia.objects.get(empresa=self.empresa, dia=timezone.localdate())
+        self.assertEqual((resumo.receita, resumo.qtd_vendas, resumo.itens_vendidos), (Decimal('75.00'), 2, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            primeira.cancelar()
+        resumo.refresh_from_db()
+        self.assertEqual((resumo.receita, resumo.qtd_vendas, resumo.itens_vendidos), (Decimal('25.00'), 1, 2))
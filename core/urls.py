@@ -13,12 +13,20 @@ urlpatterns = [
     path('nova-venda/', views.criar_venda, name='criar_venda'),
     path('pdv/<int:venda_id>/', views.pdv, name='pdv'),
     path('pdv/<int:venda_id>/adicionar/', views.adicionar_item, name='adicionar_item'),
+    path('pdv/<int:venda_id>/itens/', views.adicionar_itens_lote, name='adicionar_itens_lote'),
+    path('pdv/<int:venda_id>/remover/<int:item_id>/', views.remover_item, name='remover_item'),
+    path('pdv/produtos/buscar/', views.buscar_produtos, name='buscar_produtos'),
+    path('pdv/offline/', views.pdv_offline, name='pdv_offline'),
+    path('pdv/offline/catalogo/', views.catalogo_offline, name='catalogo_offline'),
+    path('pdv/offline/sincronizar/', views.sincronizar_vendas, name='sincronizar_vendas'),
     path('orcamento/<int:venda_id>/', views.gerar_orcamento_pdf, name='gerar_orcamento_pdf'),
     path('venda/cupom/<int:venda_id>/', views.imprimir_cupom, name='imprimir_cupom'),
+    path('venda/cancelar/<int:venda_id>/', views.cancelar_venda, name='cancelar_venda'),
 
     # Financeiro
     path('financeiro/', views.financeiro, name='financeiro'),
     path('financeiro/nova-despesa/', views.adicionar_despesa, name='adicionar_despesa'),
+    path('financeiro/fluxo-caixa/', views.fluxo_caixa, name='fluxo_caixa'),
     path('comissoes/', views.minhas_comissoes, name='minhas_comissoes'),
     path('caixa/', views.gerenciar_caixa, name='gerenciar_caixa'),
     path('caixa/abrir/', views.abrir_caixa, name='abrir_caixa'),
@@ -43,6 +51,8 @@ urlpatterns = [
     path('produtos/editar/<int:produto_id>/', views.editar_produto, name='editar_produto'),
     path('produtos/excluir/<int:produto_id>/', views.excluir_produto, name='excluir_produto'),
     path('produtos/catalogo-qr/', views.catalogo_qr, name='catalogo_qr'),
+    path('produtos/qrcode/<int:produto_id>/', views.qrcode_produto, name='qrcode_produto'),
+    path('produtos/etiquetas/', views.etiquetas_produtos, name='etiquetas_produtos'),
 
     # Clientes
     path('clientes/', views.lista_clientes, name='lista_clientes'),
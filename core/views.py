@@ -9,12 +9,11 @@ from .forms import (
     ConfiguracaoEmpresaForm,  # <--- ELE TEM QUE ESTAR AQUI!
     ChamadoForm, AjusteEstoqueForm
 )
-import pandas as pd
-from django.core.files.storage import FileSystemStorage
 import os
 import uuid
 import requests
 import json
+import hashlib
 import traceback # Importante para o erro
 
 # Imports dos novos forms e models
@@ -23,67 +22,81 @@ from .forms import ChamadoForm, AjusteEstoqueForm
     # Servir arquivos de PWA
 from django.views.generic import TemplateView
 
-from datetime import timedelta
+from datetime import datetime, timedelta
+from decimal import Decimal
 
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Sum, Count, F, Avg, Q, ExpressionWrapper, FloatField
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.core.paginator import Paginator
+from django.db.models import Sum, Count, F, Avg, Q, ExpressionWrapper, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from .models import Chamado # Garanta que importou Chamado
 
-from weasyprint import HTML
 
 from .models import (
     Venda, ItemVenda, Produto, Cliente, Lancamento, Empresa, 
     MovimentoCaixa, Caixa, FormaPagamento, Usuario,
-    Categoria, Fornecedor
+    Categoria, Fornecedor, ResumoVendasDia, FechamentoComissao, limites_do_periodo
 )
+from .estoque import previsao_estoque
+from .importacao import importar_planilha
+from .qrcodes import obter_qrcode
+from .etiquetas import folha_de_etiquetas
+from .pdf import resposta_pdf
+from .paginacao import paginar_por_cursor
+from .cache_relatorios import estatisticas as estatisticas_cache_relatorios, relatorio_em_cache, somar_parciais
+from .exportacao import RELATORIOS, exportar_relatorio
 
 
 # CONFIGURAÇÕES ASAAS
 ASAAS_API_KEY = os.environ.get('ASAAS_API_KEY', '')
 ASAAS_URL = os.environ.get('ASAAS_URL', 'https://www.asaas.com/api/v3')
 
+POR_PAGINA_FINANCEIRO = 50
+
 # =========================================================
 #  DASHBOARD & INICIO
 # =========================================================
 @login_required
 def dashboard(request):
     empresa_usuario = request.user.empresa
-    hoje = timezone.now().date()
-    
-    estoque_baixo_count = Produto.objects.filter(
-        empresa=empresa_usuario, 
-        estoque_atual__lte=F('estoque_minimo')
-    ).count()
-
-    vendas_hoje = Venda.objects.filter(empresa=empresa_usuario, data_venda__date=hoje, status='FECHADA')
-    total_hoje = vendas_hoje.aggregate(Sum('valor_total'))['valor_total__sum'] or 0
-    qtd_vendas = vendas_hoje.count()
-    
-    datas_grafico = []
-    valores_grafico = []
-    for i in range(6, -1, -1):
-        d = hoje - timedelta(days=i)
-        val = Venda.objects.filter(empresa=empresa_usuario, status='FECHADA', data_venda__date=d).aggregate(Sum('valor_total'))['valor_total__sum'] or 0
-        datas_grafico.append(d.strftime('%d/%m'))
-        valores_grafico.append(float(val))
+    hoje = timezone.localdate()
+    semana = [hoje - timedelta(days=i) for i in range(6, -1, -1)]
+
+    # Contadores do cadastro numa única query (subqueries sobre a empresa)
+    def contar(queryset):
+        return Coalesce(Subquery(queryset.filter(empresa=OuterRef('pk')).order_by().values('empresa').annotate(c=Count('id')).values('c')), 0)
+
+    contadores = Empresa.objects.filter(pk=empresa_usuario.pk).values(
+        total_clientes=contar(Cliente.objects.all()),
+        total_produtos=contar(Produto.objects.all()),
+    ).get()
+
+    # Vendas de hoje e gráfico da semana saem do resumo diário (7 linhas no máximo)
+    resumos = {r.dia: r for r in ResumoVendasDia.objects.filter(empresa=empresa_usuario, dia__range=[semana[0], hoje])}
+    resumo_hoje = resumos.get(hoje)
+    datas_grafico = [d.strftime('%d/%m') for d in semana]
+    valores_grafico = [float(resumos[d].receita) if d in resumos else 0.0 for d in semana]
 
     ultimas_vendas = Venda.objects.filter(empresa=empresa_usuario).order_by('-data_venda')[:5]
 
     return render(request, 'core/dashboard.html', {
-        'total_clientes': Cliente.objects.filter(empresa=empresa_usuario).count(),
-        'total_produtos': Produto.objects.filter(empresa=empresa_usuario).count(),
-        'estoque_baixo_count': estoque_baixo_count,
-        'vendas_hoje': qtd_vendas,
-        'total_hoje': total_hoje,
+        'total_clientes': contadores['total_clientes'],
+        'total_produtos': contadores['total_produtos'],
+        # Mesmo contador mantido do sino de notificação (context processor): sem COUNT na tabela de produtos
+        'estoque_baixo_count': Produto.contar_estoque_baixo(empresa_usuario.id),
+        'vendas_hoje': resumo_hoje.qtd_vendas if resumo_hoje else 0,
+        'total_hoje': resumo_hoje.receita if resumo_hoje else 0,
         'ultimas_vendas': ultimas_vendas,
         'datas_grafico': datas_grafico,
         'valores_grafico': valores_grafico,
@@ -339,6 +352,16 @@ def criar_venda(request):
     if not caixa_aberto:
         return render(request, 'core/erro_caixa_fechado.html')
 
+    # Reaproveita o rascunho vazio que o operador já tem aberto neste turno
+    # (cada login passa por aqui; sem isso a tabela enche de orçamentos vazios)
+    rascunho = Venda.objects.filter(
+        empresa=request.user.empresa, vendedor=request.user, movimento_caixa=caixa_aberto,
+        status='ORCAMENTO', qtd_itens=0
+    ).order_by('-id').first()
+    if rascunho:
+        Venda.objects.filter(pk=rascunho.pk).update(data_venda=timezone.now())
+        return redirect('pdv', venda_id=rascunho.id)
+
     venda = Venda.objects.create(
         empresa=request.user.empresa,
         vendedor=request.user,
@@ -350,90 +373,255 @@ def criar_venda(request):
 
 @login_required
 def pdv(request, venda_id):
-    venda = get_object_or_404(Venda, id=venda_id, empresa=request.user.empresa)
+    venda = get_object_or_404(Venda.objects.select_related('cliente'), id=venda_id, empresa=request.user.empresa)
     
     if request.method == 'POST':
         acao = request.POST.get('acao')
-        if request.POST.get('cliente'):
-            venda.cliente_id = request.POST.get('cliente')
-            venda.save()
-            
+        cliente_id = request.POST.get('cliente', '')
+        if cliente_id:
+            # Só o cliente, num UPDATE: save() regravaria os totais mantidos pelos itens.
+            # O cliente precisa ser desta loja, e a venda ainda estar em orçamento.
+            cliente = Cliente.objects.filter(pk=cliente_id, empresa=request.user.empresa).first() if cliente_id.isdigit() else None
+            if cliente is None:
+                messages.error(request, "Cliente não encontrado.")
+            elif Venda.objects.filter(pk=venda.pk, status='ORCAMENTO').update(cliente=cliente):
+                venda.cliente = cliente
+
+
         if acao == 'fechar_venda':
             forma_id = request.POST.get('forma_pagamento')
             if forma_id:
-                venda.valor_total = sum(i.subtotal for i in venda.itens.all())
-                venda.status = 'FECHADA'
-                venda.forma_pagamento_id = forma_id
-                venda.save()
-                
-                if venda.cliente:
-                    venda.cliente.data_ultima_compra = timezone.now()
-                    venda.cliente.save()
-                
-                for item in venda.itens.all():
-                    item.produto.estoque_atual -= item.quantidade
-                    item.produto.save()
-
-                if request.POST.get('emitir_fiscal'):
-                    venda.nota_fiscal_emitida = True
-                    venda.save()
+                emitir_fiscal = bool(request.POST.get('emitir_fiscal'))
+                # Estoque, total, cliente e receita são gravados juntos (ou nada é gravado)
+                if not venda.fechar(forma_id, emitir_fiscal=emitir_fiscal):
+                    messages.warning(request, "Esta venda já foi fechada.")
+                elif emitir_fiscal:
                     messages.success(request, "Venda Fechada (Nota Fiscal em processamento).")
                 else:
                     messages.success(request, "Venda Fechada com sucesso.")
-
-                Lancamento.objects.create(
-                    empresa=venda.empresa, tipo='RECEITA',
-                    titulo=f"Venda #{venda.id}", valor=venda.valor_total,
-                    data_vencimento=timezone.now().date(), data_pagamento=timezone.now().date(),
-                    pago=True, venda_origem=venda
-                )
                 return redirect('dashboard')
 
     template = 'core/pdv_focus.html' if request.user.cargo in ['VENDEDOR', 'CAIXA'] else 'core/pdv.html'
     
     return render(request, template, {
         'venda': venda,
-        'produtos': Produto.objects.filter(empresa=request.user.empresa, ativo=True),
+        # Itens lidos uma vez só, já com o produto; o total vem mantido na própria venda
+        'itens': list(venda.itens.select_related('produto')),
         'clientes': Cliente.objects.filter(empresa=request.user.empresa),
         'formas_pagamento': FormaPagamento.objects.filter(empresa=request.user.empresa),
-        'total': sum(item.subtotal for item in venda.itens.all())
+        'total': venda.subtotal
     })
 
 @login_required
 @require_POST
 def adicionar_item(request, venda_id):
-    venda = get_object_or_404(Venda, id=venda_id)
-    prod_id = request.POST.get('produto')
-    qtd = int(request.POST.get('quantidade', 1))
-    if prod_id:
-        p = get_object_or_404(Produto, id=prod_id)
-        ItemVenda.objects.create(venda=venda, produto=p, quantidade=qtd, preco_unitario=p.preco_venda)
+    venda = get_object_or_404(Venda, id=venda_id, empresa=request.user.empresa_id)
+    if not (request.POST.get('produto') or request.POST.get('codigo', '').strip()):
+        return redirect('pdv', venda_id=venda.id)
+    try:
+        linha = Venda.normalizar_linha({
+            'produto': request.POST.get('produto'),
+            # Leitor de código de barras: busca exata no índice (empresa, codigo_barras)
+            'codigo': request.POST.get('codigo', ''),
+            'quantidade': request.POST.get('quantidade', 1),
+        })
+    except ValueError as erro:
+        messages.error(request, f"Item não lançado: {erro}.")
+        return redirect('pdv', venda_id=venda.id)
+    nao_encontrados = venda.adicionar_itens([linha])
+    if nao_encontrados is None:
+        messages.error(request, "Esta venda já foi finalizada.")
+    elif nao_encontrados:
+        messages.error(request, f"Produto {linha['codigo'] or linha['produto']} não encontrado.")
+    return redirect('pdv', venda_id=venda.id)
+
+@login_required
+@require_POST
+def adicionar_itens_lote(request, venda_id):
+    # Endpoint do leitor: recebe várias linhas numa requisição só
+    # ({"itens": [{"codigo": "789...", "quantidade": 1}, {"produto": 12, "quantidade": 2}]})
+    # e devolve apenas o carrinho atualizado, sem renderizar o PDV inteiro.
+    venda = get_object_or_404(Venda, id=venda_id, empresa=request.user.empresa)
+    try:
+        linhas = json.loads(request.body).get('itens', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({'erro': 'Lote inválido.'}, status=400)
+    if not isinstance(linhas, list):
+        return JsonResponse({'erro': 'Lote inválido.'}, status=400)
+
+    # Linha com defeito é recusada sozinha; as outras do lote entram normalmente
+    validas, invalidas = [], []
+    for posicao, linha in enumerate(linhas):
+        try:
+            validas.append(Venda.normalizar_linha(linha))
+        except ValueError as erro:
+            invalidas.append({'linha': posicao, 'erro': str(erro)})
+    # O status é conferido dentro de adicionar_itens, com a venda travada
+    nao_encontrados = venda.adicionar_itens(validas)
+    if nao_encontrados is None:
+        return JsonResponse({'erro': 'Esta venda já foi finalizada.'}, status=409)
+
+    itens = list(venda.itens.select_related('produto'))
+    return JsonResponse({
+        'itens': [{
+            'id': i.id, 'produto': i.produto_id, 'nome': i.produto.nome,
+            'quantidade': i.quantidade, 'preco_unitario': str(i.preco_unitario), 'subtotal': str(i.subtotal),
+        } for i in itens],
+        'total': str(venda.subtotal),
+        'qtd_itens': venda.qtd_itens,
+        'nao_encontrados': nao_encontrados,
+        'invalidas': invalidas,
+        'html': render_to_string('core/pdv_itens.html', {'itens': itens}, request=request),
+    })
+
+@login_required
+def buscar_produtos(request):
+    # Busca incremental do PDV: o catálogo não é mais enviado inteiro na página.
+    # 1) código de barras exato, 2) nome começando com o termo, 3) nome contendo o termo.
+    termo = request.GET.get('q', '').strip()
+    try:
+        limite = min(max(int(request.GET.get('limite', 20)), 1), 50)
+    except ValueError:
+        limite = 20
+
+    if not termo:
+        return JsonResponse({'produtos': [], 'exato': False})
+
+    produtos = Produto.objects.filter(empresa=request.user.empresa, ativo=True)
+    campos = ('id', 'nome', 'codigo_barras', 'preco_venda', 'estoque_atual', 'tamanho', 'cor')
+
+    encontrados = list(produtos.filter(codigo_barras=termo).values(*campos)[:limite])
+    exato = bool(encontrados)
+    if not exato:
+        encontrados = list(produtos.filter(nome__istartswith=termo).order_by('nome').values(*campos)[:limite])
+        if len(encontrados) < limite:
+            ids = [p['id'] for p in encontrados]
+            encontrados += list(
+                produtos.filter(nome__icontains=termo).exclude(id__in=ids)
+                .order_by('nome').values(*campos)[:limite - len(encontrados)]
+            )
+
+    for p in encontrados:
+        p['preco_venda'] = str(p['preco_venda'])
+    return JsonResponse({'produtos': encontrados, 'exato': exato})
+
+@login_required
+@require_POST
+def cancelar_venda(request, venda_id):
+    venda = get_object_or_404(Venda, id=venda_id, empresa=request.user.empresa)
+    # Vendedor só descarta o próprio carrinho; venda fechada exige gerente/caixa
+    if venda.status == 'FECHADA' and request.user.cargo == 'VENDEDOR':
+        return HttpResponseForbidden()
+    if venda.cancelar():
+        messages.success(request, f"Venda #{venda.id} cancelada.")
+    else:
+        messages.warning(request, "Esta venda já estava cancelada.")
+    return redirect('dashboard')
+
+@login_required
+@require_POST
+def remover_item(request, venda_id, item_id):
+    venda = get_object_or_404(Venda, id=venda_id, empresa=request.user.empresa)
+    # O status é conferido dentro de remover_item, com a venda travada
+    removido = venda.remover_item(item_id)
+    if removido is None:
+        messages.error(request, "Esta venda já foi finalizada.")
+    elif not removido:
+        messages.error(request, "Item não encontrado nesta venda.")
     return redirect('pdv', venda_id=venda.id)
 
+# =========================================================
+#  PDV OFFLINE (VENDAS NA FILA DO NAVEGADOR)
+# =========================================================
+@login_required
+def pdv_offline(request):
+    # Tela guardada pelo service worker: funciona sem internet usando o catálogo local
+    return render(request, 'core/pdv_offline.html')
+
+@login_required
+def catalogo_offline(request):
+    # Cópia do catálogo e da tabela de preços para o PDV offline.
+    # O ETag evita baixar tudo de novo quando nada mudou.
+    empresa = request.user.empresa
+    dados = {
+        'produtos': list(Produto.objects.filter(empresa=empresa, ativo=True).values_list('id', 'nome', 'codigo_barras', 'preco_venda', 'tamanho', 'cor')),
+        'formas_pagamento': list(FormaPagamento.objects.filter(empresa=empresa, ativo=True).values('id', 'nome')),
+    }
+    conteudo = json.dumps(dados, default=str)
+    etag = '"%s"' % hashlib.md5(conteudo.encode()).hexdigest()
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponse(status=304)
+    response = HttpResponse(conteudo, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+@login_required
+@require_POST
+def sincronizar_vendas(request):
+    # Recebe a fila de vendas feitas offline. Idempotente: o navegador pode
+    # reenviar o mesmo lote quantas vezes precisar (uuid por venda).
+    try:
+        vendas = json.loads(request.body).get('vendas', [])
+    except (ValueError, AttributeError):
+        return JsonResponse({'erro': 'JSON inválido.'}, status=400)
+    if not isinstance(vendas, list):
+        return JsonResponse({'erro': 'JSON inválido.'}, status=400)
+
+    # Cada venda vem com o seu resultado (recebida, duplicada ou rejeitada com motivo),
+    # e o navegador tira da fila todas elas
+    resultado = {'recebidas': [], 'duplicadas': [], 'rejeitadas': []}
+    for inicio in range(0, len(vendas), 100):
+        parcial = Venda.sincronizar_offline(request.user, vendas[inicio:inicio + 100])
+        for chave in resultado:
+            resultado[chave] += parcial[chave]
+    return JsonResponse(resultado)
+
 # =========================================================
 #  GESTÃO, RELATÓRIOS E PAINEL ESTOQUE (CORRIGIDO)
 # =========================================================
 @login_required
 def painel_estoque(request):
-    produtos = Produto.objects.filter(empresa=request.user.empresa)
-    baixo_estoque = produtos.filter(estoque_atual__lte=F('estoque_minimo'))
-    total_custo = sum(p.estoque_atual * p.preco_custo for p in produtos)
-    total_venda = sum(p.estoque_atual * p.preco_venda for p in produtos)
-    lucro_potencial = total_venda - total_custo
-    
-    lista_inteligente = []
-    inicio_mes = timezone.now().date() - timedelta(days=30)
-    for p in produtos:
-        qtd = ItemVenda.objects.filter(produto=p, venda__status='FECHADA', venda__data_venda__date__gte=inicio_mes).aggregate(Sum('quantidade'))['quantidade__sum'] or 0
-        dias = int(p.estoque_atual / (qtd/30)) if qtd > 0 else 999
-        lista_inteligente.append({'nome': p.nome, 'atual': p.estoque_atual, 'vendidos_30d': qtd, 'dias_restantes': dias})
-    
-    lista_inteligente.sort(key=lambda x: x['dias_restantes'])
-    return render(request, 'core/painel_estoque.html', {'baixo_estoque': baixo_estoque, 'total_custo': total_custo, 'total_venda': total_venda, 'lucro_potencial': lucro_potencial, 'lista_inteligente': lista_inteligente[:10], 'total_produtos': produtos.count()})
+    # Totais, ruptura e ponto de pedido vêm da previsão em cache (core/estoque.py)
+    return render(request, 'core/painel_estoque.html', previsao_estoque(request.user.empresa_id))
+
+# Ordenações das listas: cada uma termina em id (desempate do cursor) e tem índice (empresa, campo, id)
+ORDEM_PRODUTOS = {'nome': ('nome', 'id'), 'preco': ('preco_venda', 'id'), 'estoque': ('estoque_atual', 'id')}
 
 @login_required
 def lista_produtos(request):
-    return render(request, 'core/lista_produtos.html', {'produtos': Produto.objects.filter(empresa=request.user.empresa)})
+    produtos = Produto.objects.filter(empresa=request.user.empresa_id).select_related('categoria')
+    busca = request.GET.get('q', '').strip()
+    if busca:
+        produtos = produtos.filter(Q(nome__icontains=busca) | Q(codigo_barras=busca))
+    categoria = request.GET.get('categoria', '')
+    if categoria.isdigit():
+        produtos = produtos.filter(categoria_id=categoria)
+    if request.GET.get('estoque') == 'baixo':
+        produtos = produtos.filter(estoque_atual__lte=F('estoque_minimo'))
+    situacao = request.GET.get('situacao', '')
+    if situacao in ('ativos', 'inativos'):
+        produtos = produtos.filter(ativo=situacao == 'ativos')
+    ordem = request.GET.get('ordem', 'nome')
+    if ordem not in ORDEM_PRODUTOS:
+        ordem = 'nome'
+
+    # Lista ou grade: só o modo escolhido é montado (antes a página repetia todos os produtos nos dois)
+    modo = request.GET.get('modo') or request.session.get('modo_produtos', 'lista')
+    if modo not in ('lista', 'grade'):
+        modo = 'lista'
+    if request.session.get('modo_produtos') != modo:
+        request.session['modo_produtos'] = modo
+
+    pagina = paginar_por_cursor(request, produtos, ORDEM_PRODUTOS[ordem])
+    parametros_modo = request.GET.copy()
+    parametros_modo.pop('apos', None)
+    parametros_modo.pop('modo', None)
+    return render(request, 'core/lista_produtos.html', {
+        'produtos': pagina['itens'], 'pagina': pagina, 'modo': modo, 'parametros_modo': parametros_modo.urlencode(),
+        'categorias': Categoria.objects.filter(empresa=request.user.empresa_id).order_by('nome').values_list('id', 'nome'),
+        'busca': busca, 'categoria': categoria, 'situacao': situacao, 'ordem': ordem,
+        'estoque_baixo': request.GET.get('estoque') == 'baixo',
+    })
 
 @login_required
 def criar_produto(request):
@@ -516,28 +704,61 @@ def financeiro(request):
         inicio_mes = hoje.replace(day=1)
         lancamentos = lancamentos.filter(data_vencimento__gte=inicio_mes)
 
-    # Totais
-    total_receitas = lancamentos.filter(tipo='RECEITA', pago=True).aggregate(Sum('valor'))['valor__sum'] or 0
-    total_despesas = lancamentos.filter(tipo='DESPESA', pago=True).aggregate(Sum('valor'))['valor__sum'] or 0
-    saldo = total_receitas - total_despesas
-    
-    # Previsão (inclui o que não foi pago)
-    previsto_receitas = lancamentos.filter(tipo='RECEITA').aggregate(Sum('valor'))['valor__sum'] or 0
-    previsto_despesas = lancamentos.filter(tipo='DESPESA').aggregate(Sum('valor'))['valor__sum'] or 0
-    saldo_previsto = previsto_receitas - previsto_despesas
+    # Totais realizados e previstos numa única passada (agregação condicional)
+    zero = Value(Decimal('0.00'))
+    totais = lancamentos.aggregate(
+        total_receitas=Coalesce(Sum('valor', filter=Q(tipo='RECEITA', pago=True)), zero),
+        total_despesas=Coalesce(Sum('valor', filter=Q(tipo='DESPESA', pago=True)), zero),
+        previsto_receitas=Coalesce(Sum('valor', filter=Q(tipo='RECEITA')), zero),
+        previsto_despesas=Coalesce(Sum('valor', filter=Q(tipo='DESPESA')), zero),
+    )
+
+    # Extrato paginado por cursor (data_vencimento, id): cada página custa o mesmo,
+    # não importa quantas já ficaram para trás
+    tipo = request.GET.get('tipo', '')
+    extrato = lancamentos.filter(tipo=tipo) if tipo in ('RECEITA', 'DESPESA') else lancamentos
+    pagina = paginar_por_cursor(request, extrato, ('-data_vencimento', '-id'), POR_PAGINA_FINANCEIRO)
+
+    filtros_tipo = request.GET.copy()
+    filtros_tipo.pop('apos', None)
+    filtros_tipo.pop('tipo', None)
 
     context = {
-        'lancamentos': lancamentos.order_by('-data_vencimento'),
-        'total_receitas': total_receitas,
-        'total_despesas': total_despesas,
-        'saldo': saldo,
-        'saldo_previsto': saldo_previsto,
+        'lancamentos': pagina['itens'],
+        'pagina': pagina,
+        'tipo': tipo,
+        'filtros_tipo': filtros_tipo.urlencode(),
+        'total_receitas': totais['total_receitas'],
+        'total_despesas': totais['total_despesas'],
+        'saldo': totais['total_receitas'] - totais['total_despesas'],
+        'saldo_previsto': totais['previsto_receitas'] - totais['previsto_despesas'],
         'hoje': timezone.now().date()
     }
 
     # 4. RETORNO FINAL (A resposta que o navegador espera)
     return render(request, 'core/financeiro.html', context)    
 
+@login_required
+def fluxo_caixa(request):
+    if not request.user.empresa.tem_acesso_financeiro():
+        messages.warning(request, "O módulo financeiro é exclusivo do plano Pro ou período de testes.")
+        return redirect('dashboard')
+    if request.user.cargo == 'VENDEDOR':
+        messages.error(request, "Seu perfil não tem permissão para acessar o financeiro.")
+        return redirect('dashboard')
+
+    por_semana = request.GET.get('agrupar') == 'semana'
+    saldo_atual, fluxo = Lancamento.fluxo_projetado(request.user.empresa_id, dias=90, por_semana=por_semana)
+    return render(request, 'core/fluxo_caixa.html', {
+        'saldo_atual': saldo_atual,
+        'fluxo': fluxo,
+        'por_semana': por_semana,
+        'saldo_final': fluxo[-1]['saldo_previsto'] if fluxo else saldo_atual,
+        'datas_grafico': [f['periodo'].strftime('%d/%m') for f in fluxo],
+        'realizado_grafico': [float(f['saldo_realizado']) for f in fluxo],
+        'previsto_grafico': [float(f['saldo_previsto']) for f in fluxo],
+    })
+
 @login_required
 def adicionar_despesa(request):
     if request.method == 'POST':
@@ -551,6 +772,42 @@ def adicionar_despesa(request):
         return redirect('financeiro')
     return render(request, 'core/adicionar_despesa.html')
 
+def _relatorio_vendas(empresa_id, data_ini, data_fim):
+    totais = ResumoVendasDia.objects.filter(empresa_id=empresa_id, dia__range=[data_ini, data_fim]).aggregate(
+        total=Coalesce(Sum('receita'), Value(Decimal('0.00'))), qtd=Coalesce(Sum('qtd_vendas'), 0)
+    )
+    inicio, fim = limites_do_periodo(data_ini, data_fim)
+    pagamentos = (
+        Venda.objects.filter(empresa_id=empresa_id, status='FECHADA', data_venda__gte=inicio, data_venda__lt=fim)
+        .values('forma_pagamento__nome').annotate(qtd=Count('id'), total=Sum('valor_total')).order_by()
+    )
+    totais['por_pagamento'] = {
+        p['forma_pagamento__nome'] or 'Não informado': {'qtd': p['qtd'], 'total': p['total'] or 0} for p in pagamentos
+    }
+    return totais
+
+def _relatorio_financeiro(empresa_id, data_ini, data_fim):
+    zero = Value(Decimal('0.00'))
+    return Lancamento.objects.filter(empresa_id=empresa_id, data_pagamento__range=[data_ini, data_fim], pago=True).aggregate(
+        receitas=Coalesce(Sum('valor', filter=Q(tipo='RECEITA')), zero),
+        despesas=Coalesce(Sum('valor', filter=Q(tipo='DESPESA')), zero),
+    )
+
+def _relatorio_produtos(empresa_id, data_ini, data_fim):
+    inicio, fim = limites_do_periodo(data_ini, data_fim)
+    ranking = (
+        ItemVenda.objects.filter(venda__empresa_id=empresa_id, venda__status='FECHADA', venda__data_venda__gte=inicio, venda__data_venda__lt=fim)
+        .values('produto_id').annotate(qtd_vendida=Sum('quantidade'), total_vendido=Sum(F('quantidade') * F('preco_unitario'))).order_by()
+    )
+    return {'itens': {r['produto_id']: {'qtd_vendida': r['qtd_vendida'], 'total_vendido': r['total_vendido']} for r in ranking}}
+
+def _data_do_filtro(texto, padrao):
+    # '2026-02-30' passa no formato mas não é data: parse_date levanta ValueError
+    try:
+        return parse_date(texto or '') or padrao
+    except ValueError:
+        return padrao
+
 @login_required
 def relatorios(request):
     if request.user.cargo == 'VENDEDOR': return HttpResponseForbidden()
@@ -558,27 +815,59 @@ def relatorios(request):
     # ADICIONE A MESMA TRAVA INTELIGENTE AQUI:
     if not request.user.is_superuser and not request.user.empresa.tem_acesso_financeiro():
         return render(request, 'core/erro_plano.html')
-    hoje = timezone.now().date()
-    data_ini = request.GET.get('data_ini', hoje.replace(day=1).strftime('%Y-%m-%d'))
-    data_fim = request.GET.get('data_fim', hoje.strftime('%Y-%m-%d'))
+    hoje = timezone.localdate()
+    # Datas validadas uma vez, antes de qualquer resposta: a exportação CSV é enviada aos poucos
+    # e um erro no meio dela chegaria ao usuário como arquivo cortado, não como erro
+    inicio = _data_do_filtro(request.GET.get('data_ini'), hoje.replace(day=1))
+    fim = _data_do_filtro(request.GET.get('data_fim'), hoje)
     tipo = request.GET.get('tipo', 'vendas')
-    contexto = {'data_ini': data_ini, 'data_fim': data_fim, 'tipo': tipo}
+    formato = request.GET.get('formato')
+    if formato in ('csv', 'xlsx') and tipo in RELATORIOS:
+        return exportar_relatorio(request.user.empresa, tipo, inicio, fim, formato)
+    contexto = {'data_ini': inicio, 'data_fim': fim, 'tipo': tipo}
+    empresa_id = request.user.empresa_id
+
+    # Agregados vêm do cache de relatórios: dias passados ficam guardados, só hoje é recalculado
     if tipo == 'vendas':
-        vendas = Venda.objects.filter(empresa=request.user.empresa, status='FECHADA', data_venda__date__range=[data_ini, data_fim])
-        contexto.update({'vendas': vendas, 'total_periodo': vendas.aggregate(Sum('valor_total'))['valor_total__sum'] or 0, 'qtd_vendas': vendas.count()})
+        periodo = limites_do_periodo(inicio, fim)
+        vendas = Venda.objects.filter(empresa=request.user.empresa, status='FECHADA', data_venda__gte=periodo[0], data_venda__lt=periodo[1]).select_related('vendedor', 'cliente')
+        resumo = relatorio_em_cache(empresa_id, 'vendas', inicio, fim, lambda ini, fim: _relatorio_vendas(empresa_id, ini, fim), somar_parciais)
+        por_pagamento = sorted(
+            ({'forma_pagamento__nome': nome, **valores} for nome, valores in resumo.get('por_pagamento', {}).items()),
+            key=lambda p: p['total'], reverse=True,
+        )
+        contexto.update({'vendas': vendas, 'total_periodo': resumo.get('total', 0), 'qtd_vendas': resumo.get('qtd', 0), 'por_pagamento': por_pagamento})
     elif tipo == 'financeiro':
-        lancamentos = Lancamento.objects.filter(empresa=request.user.empresa, data_pagamento__range=[data_ini, data_fim], pago=True)
-        rec = lancamentos.filter(tipo='RECEITA').aggregate(Sum('valor'))['valor__sum'] or 0
-        desp = lancamentos.filter(tipo='DESPESA').aggregate(Sum('valor'))['valor__sum'] or 0
-        contexto.update({'lancamentos': lancamentos, 'total_receitas': rec, 'total_despesas': desp, 'lucro': rec - desp})
+        lancamentos = Lancamento.objects.filter(empresa=request.user.empresa, data_pagamento__range=[inicio, fim], pago=True)
+        totais = relatorio_em_cache(empresa_id, 'financeiro', inicio, fim, lambda ini, fim: _relatorio_financeiro(empresa_id, ini, fim), somar_parciais)
+        rec, desp = totais.get('receitas', 0), totais.get('despesas', 0)
+        contexto.update({'lancamentos': lancamentos, 'total_receitas': rec, 'total_despesas': desp, 'lucro': rec - desp, 'margem': (rec - desp) * 100 / rec if rec else 0})
     elif tipo == 'produtos':
-        itens = ItemVenda.objects.filter(venda__empresa=request.user.empresa, venda__status='FECHADA', venda__data_venda__date__range=[data_ini, data_fim]).values('produto__nome').annotate(qtd_vendida=Sum('quantidade'), total_vendido=Sum(F('quantidade')*F('preco_unitario'))).order_by('-qtd_vendida')
-        contexto['ranking_produtos'] = itens
+        ranking = relatorio_em_cache(empresa_id, 'produtos', inicio, fim, lambda ini, fim: _relatorio_produtos(empresa_id, ini, fim), somar_parciais).get('itens', {})
+        # Nome e estoque são lidos na hora: ajustes de estoque não invalidam o ranking guardado
+        produtos = Produto.objects.filter(id__in=ranking.keys()).in_bulk(field_name='id') if ranking else {}
+        contexto['ranking_produtos'] = sorted(
+            (
+                {'produto__nome': produtos[pid].nome, 'produto__estoque_atual': produtos[pid].estoque_atual, **valores}
+                for pid, valores in ranking.items() if pid in produtos
+            ),
+            key=lambda r: r['qtd_vendida'], reverse=True,
+        )
     return render(request, 'core/relatorios.html', contexto)
 
 @login_required
 def lista_equipe(request):
-    return render(request, 'core/lista_equipe.html', {'usuarios': Usuario.objects.filter(empresa=request.user.empresa)})
+    usuarios = Usuario.objects.filter(empresa=request.user.empresa_id)
+    busca = request.GET.get('q', '').strip()
+    if busca:
+        usuarios = usuarios.filter(Q(username__icontains=busca) | Q(first_name__icontains=busca) | Q(last_name__icontains=busca))
+    cargo = request.GET.get('cargo', '')
+    if cargo in dict(Usuario.TIPO_CHOICES):
+        usuarios = usuarios.filter(cargo=cargo)
+    pagina = paginar_por_cursor(request, usuarios, ('username', 'id'))
+    return render(request, 'core/lista_equipe.html', {
+        'usuarios': pagina['itens'], 'pagina': pagina, 'busca': busca, 'cargo': cargo, 'cargos': Usuario.TIPO_CHOICES,
+    })
 
 @login_required
 def adicionar_colaborador(request):
@@ -617,9 +906,30 @@ def excluir_colaborador(request, user_id):
     if u.id != request.user.id: u.delete()
     return redirect('lista_equipe')
 
+ORDEM_CLIENTES = {'nome': ('nome', 'id'), 'recentes': ('-data_cadastro', '-id')}
+
 @login_required
 def lista_clientes(request):
-    return render(request, 'core/lista_clientes.html', {'clientes': Cliente.objects.filter(empresa=request.user.empresa)})
+    clientes = Cliente.objects.filter(empresa=request.user.empresa_id)
+    busca = request.GET.get('q', '').strip()
+    if busca:
+        clientes = clientes.filter(Q(nome__icontains=busca) | Q(cpf_cnpj=busca) | Q(telefone=busca))
+    # Mesma regra de Cliente.status_compra: comprou nos últimos 30 dias = ativo
+    limite = timezone.now() - timedelta(days=Cliente.DIAS_CLIENTE_ATIVO)
+    status = request.GET.get('status', '')
+    if status == 'ATIVO':
+        clientes = clientes.filter(data_ultima_compra__gte=limite)
+    elif status == 'INATIVO':
+        clientes = clientes.filter(data_ultima_compra__lt=limite)
+    elif status == 'NOVO':
+        clientes = clientes.filter(data_ultima_compra__isnull=True)
+    ordem = request.GET.get('ordem', 'nome')
+    if ordem not in ORDEM_CLIENTES:
+        ordem = 'nome'
+    pagina = paginar_por_cursor(request, clientes, ORDEM_CLIENTES[ordem])
+    return render(request, 'core/lista_clientes.html', {
+        'clientes': pagina['itens'], 'pagina': pagina, 'busca': busca, 'status': status, 'ordem': ordem,
+    })
 
 @login_required
 def adicionar_cliente(request):
@@ -646,7 +956,12 @@ def editar_cliente(request, id):
 
 @login_required
 def lista_fornecedores(request):
-    return render(request, 'core/lista_fornecedores.html', {'fornecedores': Fornecedor.objects.filter(empresa=request.user.empresa)})
+    fornecedores = Fornecedor.objects.filter(empresa=request.user.empresa_id)
+    busca = request.GET.get('q', '').strip()
+    if busca:
+        fornecedores = fornecedores.filter(Q(razao_social__icontains=busca) | Q(cnpj=busca))
+    pagina = paginar_por_cursor(request, fornecedores, ('razao_social', 'id'))
+    return render(request, 'core/lista_fornecedores.html', {'fornecedores': pagina['itens'], 'pagina': pagina, 'busca': busca})
 
 @login_required
 def adicionar_fornecedor(request):
@@ -662,7 +977,12 @@ def adicionar_fornecedor(request):
 
 @login_required
 def lista_categorias(request):
-    return render(request, 'core/lista_categorias.html', {'categorias': Categoria.objects.filter(empresa=request.user.empresa)})
+    categorias = Categoria.objects.filter(empresa=request.user.empresa_id)
+    busca = request.GET.get('q', '').strip()
+    if busca:
+        categorias = categorias.filter(nome__icontains=busca)
+    pagina = paginar_por_cursor(request, categorias, ('nome', 'id'))
+    return render(request, 'core/lista_categorias.html', {'categorias': pagina['itens'], 'pagina': pagina, 'busca': busca})
 
 @login_required
 def adicionar_categoria(request):
@@ -678,11 +998,44 @@ def adicionar_categoria(request):
 
 @login_required
 def minhas_comissoes(request):
-    itens = ItemVenda.objects.filter(venda__empresa=request.user.empresa, venda__status='FECHADA').order_by('-venda__data_venda')
-    if request.user.cargo == 'VENDEDOR': itens = itens.filter(venda__vendedor=request.user)
-    total_comissao = sum(i.comissao_valor for i in itens)
-    total_vendido = sum(i.subtotal for i in itens)
-    return render(request, 'core/minhas_comissoes.html', {'itens': itens, 'total_comissao': total_comissao, 'total_vendido': total_vendido})
+    empresa = request.user.empresa
+    hoje = timezone.localdate()
+    # Padrão: mês corrente (período em aberto). Meses fechados vêm prontos do FechamentoComissao.
+    data_ini = parse_date(request.GET.get('data_ini') or '') or hoje.replace(day=1)
+    data_fim = parse_date(request.GET.get('data_fim') or '') or hoje
+    inicio = timezone.make_aware(datetime.combine(data_ini, datetime.min.time()))
+    fim = timezone.make_aware(datetime.combine(data_fim + timedelta(days=1), datetime.min.time()))
+
+    if request.user.cargo == 'VENDEDOR':
+        vendedor_id = request.user.id
+    else:
+        vendedor_id = request.GET.get('vendedor', '')
+        vendedor_id = int(vendedor_id) if vendedor_id.isdigit() else None
+
+    totais = FechamentoComissao.totais(empresa.id, inicio, fim, vendedor_id)
+    itens = (
+        FechamentoComissao.itens_do_periodo(empresa.id, inicio, fim, vendedor_id)
+        .select_related('venda__vendedor', 'produto').order_by('-venda__data_venda', '-id')
+    )
+    pagina = Paginator(itens, 50).get_page(request.GET.get('page'))
+
+    fechamentos = FechamentoComissao.objects.filter(empresa=empresa).select_related('vendedor').order_by('-competencia', 'vendedor__username')
+    if vendedor_id:
+        fechamentos = fechamentos.filter(vendedor_id=vendedor_id)
+
+    filtros = request.GET.copy()
+    filtros.pop('page', None)
+    return render(request, 'core/minhas_comissoes.html', {
+        'itens': pagina,
+        'total_comissao': totais['total_comissao'],
+        'total_vendido': totais['total_vendido'],
+        'data_ini': data_ini.isoformat(),
+        'data_fim': data_fim.isoformat(),
+        'vendedor_id': vendedor_id,
+        'vendedores': Usuario.objects.filter(empresa=empresa).order_by('username') if request.user.cargo != 'VENDEDOR' else [],
+        'fechamentos': fechamentos[:24],
+        'filtros': filtros.urlencode(),
+    })
 
 @staff_member_required
 def saas_painel(request):
@@ -722,31 +1075,54 @@ def responder_chamado(request, chamado_id):
 def gerar_contrato_pdf(request, empresa_id):
     empresa = get_object_or_404(Empresa, id=empresa_id)
     contexto = {'empresa': empresa, 'data_atual': timezone.now(), 'contratada': 'NEXUM ERP LTDA', 'cnpj_contratada': '00.000.000/0001-00'}
-    html_string = render_to_string('core/contrato_saas.html', contexto)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="Contrato_{empresa.nome_fantasia}.pdf"'
-    HTML(string=html_string).write_pdf(response)
-    return response
+    return resposta_pdf(request, 'core/contrato_saas', contexto, f"Contrato_{empresa.nome_fantasia}.pdf")
 
 @login_required
 def gerar_orcamento_pdf(request, venda_id):
-    venda = get_object_or_404(Venda, id=venda_id)
-    total = sum(item.subtotal for item in venda.itens.all())
-    html_string = render_to_string('core/orcamento_pdf.html', {'venda': venda, 'total_calculado': total})
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="orcamento_{venda.id}.pdf"'
-    HTML(string=html_string).write_pdf(response)
-    return response
+    venda = get_object_or_404(Venda.objects.select_related('empresa', 'cliente', 'vendedor'), id=venda_id, empresa=request.user.empresa_id)
+    itens = list(venda.itens.select_related('produto'))
+    contexto = {'venda': venda, 'itens': itens, 'total_calculado': venda.subtotal}
+    return resposta_pdf(request, 'core/orcamento_pdf', contexto, f"orcamento_{venda.id}.pdf")
 
 @login_required
 def imprimir_cupom(request, venda_id):
-    venda = get_object_or_404(Venda, id=venda_id, empresa=request.user.empresa)
-    return render(request, 'core/cupom.html', {'venda': venda})
+    venda = get_object_or_404(Venda.objects.select_related('empresa', 'cliente', 'vendedor', 'forma_pagamento'), id=venda_id, empresa=request.user.empresa)
+    return render(request, 'core/cupom.html', {'venda': venda, 'itens': list(venda.itens.select_related('produto'))})
 
 @login_required
 def catalogo_qr(request):
     return render(request, 'core/catalogo_qr.html', {'produtos': Produto.objects.filter(empresa=request.user.empresa)})
 
+@login_required
+def etiquetas_produtos(request):
+    # Folha de etiquetas para imprimir: ?tipo=qr|ean13, ?categoria=<id> e/ou ?p=<id>&p=<id>...
+    tipo = 'ean13' if request.GET.get('tipo') == 'ean13' else 'qr'
+    produtos = Produto.objects.filter(empresa=request.user.empresa_id, ativo=True)
+    categoria = request.GET.get('categoria', '')
+    if categoria.isdigit():
+        produtos = produtos.filter(categoria_id=categoria)
+    selecionados = [p for p in request.GET.getlist('p') if p.isdigit()]
+    if selecionados:
+        produtos = produtos.filter(id__in=selecionados)
+    produtos = produtos.only('id', 'nome', 'preco_venda', 'codigo_barras').order_by('nome', 'id')
+    return StreamingHttpResponse(folha_de_etiquetas(produtos.iterator(chunk_size=2000), tipo), content_type='text/html; charset=utf-8')
+
+@login_required
+def qrcode_produto(request, produto_id):
+    produto = get_object_or_404(
+        Produto.objects.only('id', 'nome', 'preco_venda', 'empresa_id'), id=produto_id, empresa=request.user.empresa_id
+    )
+    hash_conteudo, caminho = obter_qrcode(produto)
+    etag = f'"{hash_conteudo}"'
+    if request.headers.get('If-None-Match') == etag:
+        resposta = HttpResponseNotModified()
+    else:
+        resposta = FileResponse(default_storage.open(caminho, 'rb'), content_type='image/png')
+    # O navegador revalida pelo ETag: se nome e preço não mudaram, volta 304 sem imagem
+    resposta['ETag'] = etag
+    resposta['Cache-Control'] = 'private, no-cache'
+    return resposta
+
 # Adicione este import no topo
 from django.contrib.auth.views import LoginView
 
@@ -866,7 +1242,8 @@ def saas_painel(request):
         'total_lojas': empresas.count(),
         'lojas_ativas': empresas.filter(ativa=True).count(),
         'chamados': chamados,
-        'chamados_abertos': chamados.filter(status='ABERTO').count()
+        'chamados_abertos': chamados.filter(status='ABERTO').count(),
+        'cache_relatorios': estatisticas_cache_relatorios(),
     }
     return render(request, 'core/saas_painel.html', context)
 
@@ -877,13 +1254,6 @@ def alternar_status_loja(request, empresa_id):
     empresa.save()
     return redirect('saas_painel')
 
-@staff_member_required
-def gerar_contrato_pdf(request, empresa_id):
-    # Requer instalação de bibliotecas PDF (weasyprint), 
-    # se não tiver, comente o miolo e retorne um HttpResponse simples por enquanto.
-    empresa = get_object_or_404(Empresa, id=empresa_id)
-    return HttpResponse("Funcionalidade de PDF em manutenção.")
-
 @staff_member_required
 def responder_chamado(request, chamado_id):
     from .models import Chamado
@@ -904,51 +1274,27 @@ def responder_chamado(request, chamado_id):
 def importar_produtos(request):
     if request.user.cargo == 'VENDEDOR': return HttpResponseForbidden()
 
-    if request.method == 'POST' and request.FILES['arquivo_excel']:
-        excel_file = request.FILES['arquivo_excel']
-        fs = FileSystemStorage()
-        filename = fs.save(excel_file.name, excel_file)
-        uploaded_file_url = fs.path(filename)
-
+    if request.method == 'POST' and request.FILES.get('arquivo_excel'):
         try:
-            # Ler o Excel usando Pandas
-            df = pd.read_excel(uploaded_file_url)
-
-            # Iterar sobre as linhas
-            contador = 0
-            for index, row in df.iterrows():
-                # Verifica se o produto já existe pelo código de barras (para não duplicar)
-                codigo = str(row.get('Codigo', '')).strip()
-                if codigo and Produto.objects.filter(empresa=request.user.empresa, codigo_barras=codigo).exists():
-                    continue
-
-                # Tenta pegar ou criar a Categoria
-                nome_categoria = str(row.get('Categoria', 'Geral')).strip()
-                categoria_obj, _ = Categoria.objects.get_or_create(
-                    empresa=request.user.empresa, 
-                    nome=nome_categoria
-                )
-
-                # Cria o Produto
-                Produto.objects.create(
-                    empresa=request.user.empresa,
-                    nome=str(row.get('Nome', 'Produto Sem Nome')),
-                    tamanho=str(row.get('Tamanho', '')),
-                    cor=str(row.get('Cor', '')),
-                    codigo_barras=codigo,
-                    preco_custo=float(str(row.get('Custo', 0)).replace(',', '.')),
-                    preco_venda=float(str(row.get('Venda', 0)).replace(',', '.')),
-                    estoque_atual=int(row.get('Estoque', 0)),
-                    categoria=categoria_obj
-                )
-                contador += 1
-
-            messages.success(request, f"{contador} produtos importados com sucesso!")
+            # Lida direto do upload, em blocos; nada é salvo em media/
+            resultado = importar_planilha(
+                request.user.empresa, request.FILES['arquivo_excel'],
+                atualizar_existentes=request.POST.get('atualizar_existentes') == 'on',
+            )
         except Exception as e:
             messages.error(request, f"Erro ao processar arquivo: {str(e)}")
-        finally:
-            fs.delete(filename) # Limpa o arquivo temporário
-
+            return redirect('importar_produtos')
+
+        resumo = f"{resultado['criados']} produtos importados com sucesso!"
+        if resultado['atualizados']:
+            resumo += f" {resultado['atualizados']} atualizados."
+        if resultado['ignorados']:
+            resumo += f" {resultado['ignorados']} ignorados (código repetido ou já cadastrado)."
+        messages.success(request, resumo)
+        if resultado['erros']:
+            linhas = ', '.join(f"linha {linha}: {motivo}" for linha, motivo in resultado['erros'][:10])
+            extra = len(resultado['erros']) - 10
+            messages.warning(request, f"{len(resultado['erros'])} linhas com erro não foram importadas ({linhas}{f' e mais {extra}' if extra > 0 else ''}).")
         return redirect('lista_produtos')
 
     return render(request, 'core/importar_produtos.html')
\ No newline at end of file